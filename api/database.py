@@ -1,50 +1,234 @@
 import os
+import threading
+import time
+from collections import deque
 from mysql.connector import connect, Error
+from mysql.connector.errors import PoolError
 from dotenv import load_dotenv
+from flask import g
 from loguru import logger
 
 load_dotenv()
 
-# establish database connection using environment variables
+class PooledConnection:
+    """Connection checked out from the pool, close() hands it back instead of disconnecting"""
+
+    def __init__(self, pool, connection):
+        self._pool = pool
+        self._connection = connection
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+    def close(self):
+        # returning twice would put the same socket in the pool twice
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.release(connection)
+
+    def discard(self):
+        """Disconnect instead of returning to the pool, for connections left with a half-read result"""
+        if self._connection is not None:
+            connection, self._connection = self._connection, None
+            self._pool.remove(connection)
+
+class ConnectionPool:
+    """Thread-safe pool of mysql connections with overflow and idle validation"""
+
+    def __init__(self, connection_params, pool_size=5, max_overflow=10,
+                 validate_after=30, checkout_timeout=5):
+        self.connection_params = connection_params
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.validate_after = validate_after
+        self.checkout_timeout = checkout_timeout
+        self.pid = os.getpid()
+
+        self._idle = deque()
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._opened = 0
+        self._in_use = 0
+        self._waits = 0
+        self._wait_time = 0.0
+        self._validations = 0
+
+    def acquire(self):
+        started = time.monotonic()
+        deadline = started + self.checkout_timeout
+        waited = False
+
+        with self._available:
+            while True:
+                # reuse the most recently returned connection first, it is the least likely to be stale
+                if self._idle:
+                    connection, returned_at = self._idle.pop()
+                    break
+                if self._opened < self.pool_size + self.max_overflow:
+                    connection, returned_at = None, None
+                    self._opened += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._waits += 1
+                    self._wait_time += time.monotonic() - started
+                    raise PoolError('Timed out waiting for a database connection')
+                waited = True
+                self._available.wait(remaining)
+
+            self._in_use += 1
+            if waited:
+                self._waits += 1
+                self._wait_time += time.monotonic() - started
+
+        try:
+            if connection is None:
+                connection = connect(**self.connection_params)
+            elif time.monotonic() - returned_at > self.validate_after:
+                connection = self._validate(connection)
+        except Exception:
+            with self._available:
+                self._in_use -= 1
+                self._opened -= 1
+                self._available.notify()
+            raise
+
+        return PooledConnection(self, connection)
+
+    def _validate(self, connection):
+        # only connections idle past the threshold pay for a round-trip
+        with self._lock:
+            self._validations += 1
+        try:
+            connection.ping(reconnect=False)
+            return connection
+        except Error:
+            self._discard(connection)
+            return connect(**self.connection_params)
+
+    def release(self, connection):
+        reusable = True
+        try:
+            # leave no open transaction or pending result behind for the next borrower
+            if connection.unread_result:
+                connection.consume_results()
+            if connection.in_transaction:
+                connection.rollback()
+        except Error:
+            reusable = False
+
+        with self._available:
+            self._in_use -= 1
+            if reusable and len(self._idle) < self.pool_size:
+                self._idle.append((connection, time.monotonic()))
+                connection = None
+            else:
+                self._opened -= 1
+            self._available.notify()
+
+        if connection is not None:
+            self._discard(connection)
+
+    def remove(self, connection):
+        # draining a large unread result can take longer than opening a new connection
+        with self._available:
+            self._in_use -= 1
+            self._opened -= 1
+            self._available.notify()
+        self._discard(connection)
+
+    def _discard(self, connection):
+        try:
+            connection.close()
+        except Error:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'opened': self._opened,
+                'in_use': self._in_use,
+                'idle': len(self._idle),
+                'waits': self._waits,
+                'wait_time_total': round(self._wait_time, 6),
+                'wait_time_avg': round(self._wait_time / self._waits, 6) if self._waits else 0,
+                'validations': self._validations
+            }
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def _reset_pool_after_fork():
+    # sockets inherited from the parent must not be shared, the child builds its own pool
+    global _pool, _pool_lock
+    _pool = None
+    _pool_lock = threading.Lock()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_pool_after_fork)
+
+def _create_pool():
+    connection_params = {
+        'host': os.getenv('MYSQL_HOST', 'localhost'),
+        'user': os.getenv('MYSQL_USER', 'root'),
+        'password': os.getenv('MYSQL_PASSWORD', ''),
+        'database': os.getenv('MYSQL_DATABASE', 'aegis'),
+        'port': int(os.getenv('MYSQL_PORT', 3306)),
+        'ssl_disabled': True,
+        'auth_plugin': 'mysql_native_password',
+        'connection_timeout': 5
+    }
+
+    # adjust connection pool settings based on environment
+    if os.getenv('FLASK_ENV') == 'testing':
+        pool_size, max_overflow = 1, 4
+    else:
+        pool_size = int(os.getenv('MYSQL_POOL_SIZE', 5))
+        max_overflow = int(os.getenv('MYSQL_POOL_MAX_OVERFLOW', 10))
+
+    return ConnectionPool(
+        connection_params,
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        validate_after=float(os.getenv('MYSQL_POOL_VALIDATE_AFTER', 30)),
+        checkout_timeout=float(os.getenv('MYSQL_POOL_TIMEOUT', 5))
+    )
+
+def get_pool():
+    """Return the process-wide pool, creating it on first use"""
+    global _pool
+    pool = _pool
+    if pool is None or pool.pid != os.getpid():
+        with _pool_lock:
+            if _pool is None or _pool.pid != os.getpid():
+                _pool = _create_pool()
+            pool = _pool
+    return pool
+
+def get_pool_stats():
+    return get_pool().stats()
+
+# check out a database connection from the process-wide pool
 def get_db():
     try:
-        connection_params = {
-            'host': os.getenv('MYSQL_HOST', 'localhost'),
-            'user': os.getenv('MYSQL_USER', 'root'),
-            'password': os.getenv('MYSQL_PASSWORD', ''),
-            'database': os.getenv('MYSQL_DATABASE', 'aegis'),
-            'port': int(os.getenv('MYSQL_PORT', 3306)),
-            'ssl_disabled': True,
-            'auth_plugin': 'mysql_native_password'
-        }
-        
-        # adjust connection pool settings based on environment
-        if os.getenv('FLASK_ENV') == 'testing':
-            connection_params.update({
-                'pool_size': 1
-            })
-        else:
-            connection_params.update({
-                'connection_timeout': 5,
-                'pool_size': 5,
-                'pool_name': 'aegis_pool',
-                'pool_reset_session': True
-            })
-            
-        # establish database connection
-        connection = connect(**connection_params)
-        
-        # verify database connection is valid
-        cursor = connection.cursor(dictionary=True)
-        cursor.execute("SELECT DATABASE()")
-        db_name = cursor.fetchone()['DATABASE()']
-        cursor.close()
-        
-        if not db_name:
-            logger.error("No database selected")
-            return None
-            
-        return connection
+        return get_pool().acquire()
     except Error as e:
         logger.error(f"Database connection error: {e}")
-        return None 
\ No newline at end of file
+        return None
+
+def get_request_db():
+    """Return the connection bound to the current request, checking it out on first use"""
+    if 'db' not in g:
+        g.db = get_db()
+    return g.db
+
+def close_request_db(exception=None):
+    # hand the request connection back to the pool once the request is torn down
+    db = g.pop('db', None)
+    if db is not None:
+        db.close()
+
+def init_app(app):
+    app.teardown_appcontext(close_request_db)
@@ -1,6 +1,8 @@
 from flask_restx import Api, Resource, fields, Namespace
 from flask import Blueprint, request, jsonify, url_for
-from api.database import get_db
+from api.database import get_request_db
+from api.utils.bot_registry import invalidate_bot
+from api.utils.streaming import stream_requested, stream_json_list
 from loguru import logger
 import jwt
 import os
@@ -158,6 +160,26 @@ position_response = api.model('PositionResponse', {
     'sell_log': fields.Boolean(description='Sell log')
 })
 
+position_bulk_model = api.model('PositionBulk', {
+    'positions': fields.List(fields.Nested(position_model), required=True, description='Positions to open (at most 500)')
+})
+
+position_bulk_item = api.model('PositionBulkItem', {
+    'index': fields.Integer(description='Index of the position in the request'),
+    'position_id': fields.Integer(description='Position ID')
+})
+
+position_bulk_error = api.model('PositionBulkError', {
+    'index': fields.Integer(description='Index of the position in the request'),
+    'message': fields.String(description='Why the position was not created')
+})
+
+position_bulk_response = api.model('PositionBulkResponse', {
+    'message': fields.String(description='Response message'),
+    'positions': fields.List(fields.Nested(position_bulk_item)),
+    'errors': fields.List(fields.Nested(position_bulk_error))
+})
+
 position_update_model = api.model('PositionUpdate', {
     'sell_order_id': fields.String(required=True, description='Sell order ID'),
     'sell_price': fields.Float(required=True, description='Sell price'),
@@ -168,6 +190,21 @@ position_update_model = api.model('PositionUpdate', {
     'sell_log': fields.Boolean(required=False, description='Sell log')
 })
 
+position_bulk_sell_item = api.inherit('PositionBulkSellItem', position_update_model, {
+    'position_id': fields.Integer(required=True, description='Position ID')
+})
+
+position_bulk_sell_model = api.model('PositionBulkSell', {
+    'positions': fields.List(fields.Nested(position_bulk_sell_item), required=True, description='Positions to close (at most 500)')
+})
+
+position_bulk_sell_response = api.model('PositionBulkSellResponse', {
+    'message': fields.String(description='Response message'),
+    'updated': fields.List(fields.Integer, description='Updated position IDs'),
+    'not_found': fields.List(fields.Integer, description='Position IDs that do not exist'),
+    'errors': fields.List(fields.Nested(position_bulk_error))
+})
+
 fund_model = api.model('Fund', {
     'bot_name': fields.String(required=True, description='Bot name'),
     'funds': fields.Float(required=True, description='Fund amount')
@@ -180,6 +217,18 @@ fund_response = api.model('FundResponse', {
     'funds': fields.Float(description='Fund amount')
 })
 
+fund_history_point_model = api.model('FundHistoryPoint', {
+    'date': fields.String(description='Bucket start'),
+    'funds': fields.Float(description='Last, lowest or highest funds of the bucket')
+})
+
+fund_history_response = api.model('FundHistory', {
+    'bot_name': fields.String(description='Bot name'),
+    'agg': fields.String(description='Aggregation applied per bucket (last/min/max)'),
+    'bucket_seconds': fields.Integer(description='Bucket length actually used, widened to fit max_points'),
+    'data': fields.List(fields.Nested(fund_history_point_model))
+})
+
 # Add dashboard namespace
 dashboard_ns = api.namespace('dashboard', description='Dashboard operations')
 
@@ -213,18 +262,53 @@ overview_response = api.model('Overview', {
     'win_rate': fields.Nested(win_rate_model)
 })
 
+portfolio_bot_model = api.inherit('PortfolioBot', overview_response, {
+    'bot_id': fields.Integer(description='Bot ID'),
+    'bot_name': fields.String(description='Bot name')
+})
+
+portfolio_response = api.model('Portfolio', {
+    'bots': fields.List(fields.Nested(portfolio_bot_model)),
+    'total': fields.Nested(overview_response)
+})
+
 performance_data_model = api.model('PerformanceData', {
     'date': fields.String(description='Period date'),
     'profit': fields.Float(description='Period profit'),
-    'balance': fields.Float(description='Running balance'),
+    'balance': fields.Float(description='Running balance, including trades sold before from'),
     'trades': fields.Integer(description='Number of trades in period')
 })
 
 performance_response = api.model('Performance', {
-    'interval': fields.String(description='Data interval (daily/weekly/monthly)'),
+    'interval': fields.String(description='Data interval (hourly/4h/daily/weekly/monthly or <seconds>s)'),
     'data': fields.List(fields.Nested(performance_data_model))
 })
 
+drawdown_model = api.model('Drawdown', {
+    'amount': fields.Float(description='Largest peak-to-trough drop in USDC'),
+    'percentage': fields.Float(description='Largest drop relative to the peak equity')
+})
+
+rolling_win_rate_model = api.model('RollingWinRate', {
+    'window': fields.Integer(description='Number of consecutive trades per window'),
+    'current': fields.Float(description='Win rate of the latest window'),
+    'min': fields.Float(description='Lowest win rate over all windows'),
+    'max': fields.Float(description='Highest win rate over all windows')
+})
+
+risk_response = api.model('Risk', {
+    'trades': fields.Integer(description='Number of closed trades'),
+    'max_drawdown': fields.Nested(drawdown_model),
+    'sharpe_ratio': fields.Float(description='Annualized Sharpe ratio of daily returns'),
+    'sortino_ratio': fields.Float(description='Annualized Sortino ratio of daily returns'),
+    'profit_factor': fields.Float(description='Gross profit divided by gross loss'),
+    'expectancy': fields.Float(description='Average profit per trade'),
+    'average_win': fields.Float(description='Average profit of winning trades'),
+    'average_loss': fields.Float(description='Average profit of losing trades'),
+    'average_holding_seconds': fields.Float(description='Average time between buy and sell'),
+    'rolling_win_rate': fields.Nested(rolling_win_rate_model)
+})
+
 trade_model = api.model('Trade', {
     'position_id': fields.Integer(description='Position ID'),
     'pair': fields.String(description='Trading pair'),
@@ -241,7 +325,9 @@ pagination_model = api.model('Pagination', {
     'total': fields.Integer(description='Total number of records'),
     'page': fields.Integer(description='Current page number'),
     'limit': fields.Integer(description='Records per page'),
-    'pages': fields.Integer(description='Total number of pages')
+    'pages': fields.Integer(description='Total number of pages'),
+    'next_cursor': fields.String(description='Token of the next page (cursor mode)'),
+    'prev_cursor': fields.String(description='Token of the previous page (cursor mode)')
 })
 
 trades_response = api.model('Trades', {
@@ -273,6 +359,15 @@ trade_detail_model = api.model('TradeDetail', {
     'fund_slot': fields.Integer(description='Fund slot')
 })
 
+trade_batch_request = api.model('TradeBatchRequest', {
+    'position_ids': fields.List(fields.Integer, required=True, description='Position IDs to look up (at most 500)')
+})
+
+trade_batch_response = api.model('TradeBatch', {
+    'trades': fields.List(fields.Nested(trade_detail_model)),
+    'not_found': fields.List(fields.Integer, description='Requested position IDs without a trade')
+})
+
 bot_model = api.model('Bot', {
     'name': fields.String(required=True, description='Bot name'),
     'strategy': fields.String(required=True, description='Trading strategy'),
@@ -365,7 +460,7 @@ class UserInfo(Resource):
             except jwt.InvalidTokenError:
                 return {'error': 'Invalid token'}, 401
 
-            db = get_db()
+            db = get_request_db()
             if not db:
                 return {'error': 'Database connection error'}, 500
 
@@ -389,7 +484,6 @@ class UserInfo(Resource):
 
             finally:
                 cursor.close()
-                db.close()
 
         except Exception as e:
             logger.error(f"Error in user info: {e}")
@@ -416,7 +510,7 @@ class AuthCheck(Resource):
             except jwt.InvalidTokenError:
                 return {'authenticated': False}, 401
 
-            db = get_db()
+            db = get_request_db()
             if not db:
                 return {'error': 'Database connection error'}, 500
 
@@ -441,7 +535,6 @@ class AuthCheck(Resource):
 
             finally:
                 cursor.close()
-                db.close()
 
         except Exception as e:
             logger.error(f"Error in auth check: {e}")
@@ -487,7 +580,7 @@ class WalletAccess(Resource):
         if not data or not data.get('client_user') or not data.get('wallet_name'):
             return {'message': 'Missing required fields'}, 400
             
-        db = get_db()
+        db = get_request_db()
         if not db:
             return {'message': 'Database connection error'}, 500
             
@@ -518,7 +611,6 @@ class WalletAccess(Resource):
             return {'message': f'Error granting access: {str(e)}'}, 500
         finally:
             cursor.close()
-            db.close()
 
 @wallets_ns.route('/access/<client_user>/<wallet_name>')
 class WalletAccessRevoke(Resource):
@@ -552,7 +644,7 @@ class PositionList(Resource):
         if not data:
             return {'message': 'No input data provided'}, 400
             
-        db = get_db()
+        db = get_request_db()
         if not db:
             return {'message': 'Database connection error'}, 500
             
@@ -588,15 +680,26 @@ class PositionList(Resource):
             return {'message': f'Error creating position: {str(e)}'}, 500
         finally:
             cursor.close()
-            db.close()
 
     @positions_ns.doc(security='Bearer')
-    @positions_ns.response(200, 'Success', [position_response])
+    @positions_ns.param('bot_name', 'Only positions of this bot', _in='query')
+    @positions_ns.param('status', 'Only open or closed positions', _in='query', enum=['open', 'closed'])
+    @positions_ns.param('pair', 'Only positions on this pair', _in='query')
+    @positions_ns.param('exchange', 'Only positions on this exchange', _in='query')
+    @positions_ns.param('from', 'Only positions opened at or after this ISO date/time', _in='query')
+    @positions_ns.param('to', 'Only positions opened before this ISO date/time', _in='query')
+    @positions_ns.param('fields', 'Comma separated columns to return, e.g. position_id,pair,buy_price', _in='query')
+    @positions_ns.param('limit', 'Page size (max 1000), enables pagination', _in='query', type=int)
+    @positions_ns.param('cursor', 'Page token from next_cursor/prev_cursor, enables pagination', _in='query')
+    @positions_ns.param('stream', 'Stream the list while it is read from the database, ignored when paginating', _in='query', type=bool, default=False)
+    @positions_ns.param('include_archived', 'Also read trades moved to the archive', _in='query', type=bool, default=False)
+    @positions_ns.response(200, 'Success, with a pagination block when limit or cursor is given', [position_response])
+    @positions_ns.response(400, 'Invalid filter, fields or cursor')
     @positions_ns.response(401, 'Unauthorized')
     @positions_ns.response(500, 'Server error')
     def get(self):
         """Get all positions"""
-        db = get_db()
+        db = get_request_db()
         if not db:
             return {'message': 'Database connection error'}, 500
             
@@ -615,7 +718,52 @@ class PositionList(Resource):
             return {'message': f'Error fetching positions: {str(e)}'}, 500
         finally:
             cursor.close()
-            db.close()
+
+@positions_ns.route('/export')
+class PositionExport(Resource):
+    @positions_ns.doc(security='Bearer')
+    @positions_ns.produces(['application/x-ndjson', 'text/csv'])
+    @positions_ns.param('format', 'Export format', _in='query', enum=['ndjson', 'csv'], default='ndjson')
+    @positions_ns.param('bot_name', 'Only positions of this bot', _in='query')
+    @positions_ns.param('status', 'Only open or closed positions', _in='query', enum=['open', 'closed'])
+    @positions_ns.param('pair', 'Only positions on this pair', _in='query')
+    @positions_ns.param('exchange', 'Only positions on this exchange', _in='query')
+    @positions_ns.param('from', 'Only positions opened at or after this ISO date/time', _in='query')
+    @positions_ns.param('to', 'Only positions opened before this ISO date/time', _in='query')
+    @positions_ns.param('fields', 'Comma separated columns to export, every column by default', _in='query')
+    @positions_ns.param('include_archived', 'Also read trades moved to the archive', _in='query', type=bool, default=False)
+    @positions_ns.response(200, 'Positions streamed in position_id order')
+    @positions_ns.response(400, 'Invalid format, filter or fields')
+    @positions_ns.response(401, 'Unauthorized')
+    @positions_ns.response(500, 'Server error')
+    def get(self):
+        """Stream every matching position as NDJSON or CSV"""
+        pass
+
+@positions_ns.route('/bulk')
+class PositionBulk(Resource):
+    @positions_ns.doc(security='Bearer')
+    @positions_ns.expect(position_bulk_model)
+    @positions_ns.response(201, 'Positions created, invalid items listed in errors', position_bulk_response)
+    @positions_ns.response(400, 'Invalid data or no valid position')
+    @positions_ns.response(401, 'Unauthorized')
+    @positions_ns.response(500, 'Server error, no position created')
+    def post(self):
+        """Create several positions in one transaction"""
+        pass
+
+@positions_ns.route('/bulk/sell')
+class PositionBulkSell(Resource):
+    @positions_ns.doc(security='Bearer')
+    @positions_ns.expect(position_bulk_sell_model)
+    @positions_ns.response(200, 'Positions updated, missing and invalid items listed', position_bulk_sell_response)
+    @positions_ns.response(400, 'Invalid data or no valid position')
+    @positions_ns.response(401, 'Unauthorized')
+    @positions_ns.response(404, 'No position found')
+    @positions_ns.response(500, 'Server error, no position updated')
+    def put(self):
+        """Close several positions in one transaction"""
+        pass
 
 @positions_ns.route('/<int:position_id>/sell')
 class PositionSell(Resource):
@@ -631,7 +779,7 @@ class PositionSell(Resource):
         if not data:
             return {'message': 'No input data provided'}, 400
             
-        db = get_db()
+        db = get_request_db()
         if not db:
             return {'message': 'Database connection error'}, 500
             
@@ -673,7 +821,6 @@ class PositionSell(Resource):
             return {'message': f'Error updating position: {str(e)}'}, 500
         finally:
             cursor.close()
-            db.close()
 
 # funds routes
 @funds_ns.route('/')
@@ -688,7 +835,7 @@ class FundList(Resource):
         if not data:
             return {'message': 'No input data provided'}, 400
             
-        db = get_db()
+        db = get_request_db()
         if not db:
             return {'message': 'Database connection error'}, 500
             
@@ -706,12 +853,12 @@ class FundList(Resource):
             return {'message': f'Error creating fund: {str(e)}'}, 500
         finally:
             cursor.close()
-            db.close()
 
+    @funds_ns.param('stream', 'Stream the list while it is read from the database', _in='query', type=bool, default=False)
     @funds_ns.response(200, 'Success', [fund_response])
     def get(self):
         """Get all funds"""
-        db = get_db()
+        db = get_request_db()
         if not db:
             return {'message': 'Database connection error'}, 500
             
@@ -734,7 +881,6 @@ class FundList(Resource):
             return {'message': f'Error fetching funds: {str(e)}'}, 500
         finally:
             cursor.close()
-            db.close()
 
 @funds_ns.route('/<bot_name>')
 class Fund(Resource):
@@ -742,7 +888,7 @@ class Fund(Resource):
     @funds_ns.response(404, 'Fund not found')
     def get(self, bot_name):
         """Get fund for specific bot"""
-        db = get_db()
+        db = get_request_db()
         if not db:
             return {'message': 'Database connection error'}, 500
             
@@ -766,7 +912,24 @@ class Fund(Resource):
             return {'message': f'Error fetching fund: {str(e)}'}, 500
         finally:
             cursor.close()
-            db.close()
+
+@funds_ns.route('/<bot_name>/history')
+@funds_ns.param('bot_name', 'Name of the bot to get the funds history for')
+class FundHistory(Resource):
+    @funds_ns.doc(security='Bearer')
+    @funds_ns.param('agg', 'Value kept per bucket', _in='query', enum=['last', 'min', 'max'], default='last')
+    @funds_ns.param('bucket_seconds', 'Bucket length in seconds (min 60)', _in='query', type=int)
+    @funds_ns.param('max_points', 'Maximum number of buckets (2-5000), widens the bucket when needed', _in='query', type=int, default=1000)
+    @funds_ns.param('from', 'Only snapshots taken at or after this ISO date/time', _in='query')
+    @funds_ns.param('to', 'Only snapshots taken before this ISO date/time', _in='query')
+    @funds_ns.response(200, 'Success', fund_history_response)
+    @funds_ns.response(400, 'Invalid agg, bucket, max_points or date range')
+    @funds_ns.response(401, 'Unauthorized')
+    @funds_ns.response(404, 'Bot not found')
+    @funds_ns.response(500, 'Server error')
+    def get(self, bot_name):
+        """Get a bot's funds over time, one value per bucket"""
+        pass
 
 # Dashboard routes
 @dashboard_ns.route('/overview/<bot_name>')
@@ -780,25 +943,58 @@ class DashboardOverview(Resource):
         """Get dashboard overview including total balance, profit, and win rates for a specific bot"""
         pass
 
+@dashboard_ns.route('/portfolio')
+class DashboardPortfolio(Resource):
+    @dashboard_ns.doc(security='Bearer')
+    @dashboard_ns.response(200, 'Success', portfolio_response)
+    @dashboard_ns.response(401, 'Unauthorized')
+    @dashboard_ns.response(500, 'Server error')
+    def get(self):
+        """Get overview metrics of every bot owned by the current user plus their combined total"""
+        pass
+
 @dashboard_ns.route('/performance/<bot_name>')
 @dashboard_ns.param('bot_name', 'Name of the bot to get performance for')
 class DashboardPerformance(Resource):
     @dashboard_ns.doc(security='Bearer')
-    @dashboard_ns.param('interval', 'Data interval (daily/weekly/monthly)', _in='query', default='daily')
+    @dashboard_ns.param('interval', 'Data interval (hourly/4h/daily/weekly/monthly)', _in='query', default='daily')
+    @dashboard_ns.param('bucket_seconds', 'Custom bucket length in seconds, replaces interval', _in='query', type=int)
+    @dashboard_ns.param('from', 'Only trades sold at or after this ISO date/time', _in='query')
+    @dashboard_ns.param('to', 'Only trades sold before this ISO date/time', _in='query')
+    @dashboard_ns.param('max_points', 'Downsample the balance curve to at most this many points (LTTB)', _in='query', type=int)
+    @dashboard_ns.param('include_archived', 'Also read trades moved to the archive', _in='query', type=bool, default=False)
     @dashboard_ns.response(200, 'Success', performance_response)
-    @dashboard_ns.response(400, 'Invalid interval')
+    @dashboard_ns.response(400, 'Invalid interval, bucket, date range or max_points')
     @dashboard_ns.response(401, 'Unauthorized')
     @dashboard_ns.response(500, 'Server error')
     def get(self, bot_name):
         """Get performance data for graphing for a specific bot"""
         pass
 
+@dashboard_ns.route('/risk/<bot_name>')
+@dashboard_ns.param('bot_name', 'Name of the bot to get risk metrics for')
+class DashboardRisk(Resource):
+    @dashboard_ns.doc(security='Bearer')
+    @dashboard_ns.param('window', 'Number of trades per rolling win rate window', _in='query', type=int, default=20)
+    @dashboard_ns.param('include_archived', 'Also read trades moved to the archive', _in='query', type=bool, default=False)
+    @dashboard_ns.response(200, 'Success', risk_response)
+    @dashboard_ns.response(400, 'Invalid window')
+    @dashboard_ns.response(401, 'Unauthorized')
+    @dashboard_ns.response(500, 'Server error')
+    def get(self, bot_name):
+        """Get drawdown, Sharpe/Sortino ratios and trade statistics of a bot's closed trades"""
+        pass
+
 @dashboard_ns.route('/recent-trades/<bot_name>')
 @dashboard_ns.param('bot_name', 'Name of the bot to get trades for')
 class RecentTrades(Resource):
     @dashboard_ns.doc(security='Bearer')
     @dashboard_ns.param('page', 'Page number', _in='query', type=int, default=1)
     @dashboard_ns.param('limit', 'Records per page', _in='query', type=int, default=10)
+    @dashboard_ns.param('cursor', 'Page token from next_cursor/prev_cursor, replaces page', _in='query')
+    @dashboard_ns.param('total', 'Total count mode (exact/approx/none)', _in='query')
+    @dashboard_ns.param('include_archived', 'Also read trades moved to the archive', _in='query', type=bool, default=False)
+    @dashboard_ns.response(400, 'Invalid cursor or total mode')
     @dashboard_ns.response(200, 'Success', trades_response)
     @dashboard_ns.response(401, 'Unauthorized')
     @dashboard_ns.response(500, 'Server error')
@@ -806,9 +1002,23 @@ class RecentTrades(Resource):
         """Get list of recent trades for a specific bot"""
         pass
 
+@dashboard_ns.route('/stream/<bot_name>')
+@dashboard_ns.param('bot_name', 'Name of the bot to stream events for')
+class DashboardStream(Resource):
+    @dashboard_ns.doc(security='Bearer')
+    @dashboard_ns.produces(['text/event-stream'])
+    @dashboard_ns.response(200, 'Server-sent events: position-opened, position-closed, overview-delta (changes to the all-time totals) and dropped')
+    @dashboard_ns.response(401, 'Unauthorized')
+    @dashboard_ns.response(404, 'Bot not found')
+    @dashboard_ns.response(503, 'Too many open streams')
+    def get(self, bot_name):
+        """Stream live trades and overview changes of a specific bot"""
+        pass
+
 @dashboard_ns.route('/trades/<int:position_id>')
 class TradeDetails(Resource):
     @dashboard_ns.doc(security='Bearer')
+    @dashboard_ns.param('include_archived', 'Also read trades moved to the archive', _in='query', type=bool, default=False)
     @dashboard_ns.response(200, 'Success', trade_detail_model)
     @dashboard_ns.response(401, 'Unauthorized')
     @dashboard_ns.response(404, 'Trade not found')
@@ -817,6 +1027,19 @@ class TradeDetails(Resource):
         """Get detailed information about a specific trade"""
         pass
 
+@dashboard_ns.route('/trades/batch')
+class TradeDetailsBatch(Resource):
+    @dashboard_ns.doc(security='Bearer')
+    @dashboard_ns.param('include_archived', 'Also read trades moved to the archive', _in='query', type=bool, default=False)
+    @dashboard_ns.expect(trade_batch_request)
+    @dashboard_ns.response(200, 'Success', trade_batch_response)
+    @dashboard_ns.response(400, 'Invalid or too many position IDs')
+    @dashboard_ns.response(401, 'Unauthorized')
+    @dashboard_ns.response(500, 'Server error')
+    def post(self):
+        """Get detailed information about several trades in one request"""
+        pass
+
 @bots_ns.route('/')
 class BotList(Resource):
     @bots_ns.doc(security='Bearer')
@@ -846,7 +1069,7 @@ class BotList(Resource):
             if not data or not data.get(field):
                 return {'message': f'Missing required field: {field}'}, 400
             
-        db = get_db()
+        db = get_request_db()
         if not db:
             return {'message': 'Database connection error'}, 500
             
@@ -859,12 +1082,13 @@ class BotList(Resource):
 
             cursor.execute('''
                 INSERT INTO bots (
-                    bot_name, strategy, exchange_name, pairs,
+                    bot_name, client_user, strategy, exchange_name, pairs,
                     reinvest_gains, position_percent_invest, invest_capital,
                     adjust_with_profits_if_loss, timeframe, simulation, status
-                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
             ''', (
                 data['name'],
+                username,
                 data['strategy'],
                 data['exchange_name'],
                 data['pairs'],
@@ -877,6 +1101,7 @@ class BotList(Resource):
                 data.get('status', False)
             ))
             db.commit()
+            invalidate_bot(data['name'])
             
             bot_id = cursor.lastrowid
             
@@ -901,9 +1126,9 @@ class BotList(Resource):
             return {'message': f'Error creating bot: {str(e)}'}, 500
         finally:
             cursor.close()
-            db.close()
 
     @bots_ns.doc(security='Bearer')
+    @bots_ns.param('stream', 'Stream the list while it is read from the database', _in='query', type=bool, default=False)
     @bots_ns.response(200, 'Success', [bot_response])
     @bots_ns.response(401, 'Unauthorized')
     @bots_ns.response(500, 'Server error')
@@ -920,14 +1145,14 @@ class BotList(Resource):
         except jwt.InvalidTokenError:
             return {'error': 'Invalid token'}, 401
 
-        db = get_db()
+        db = get_request_db()
         if not db:
             return {'message': 'Database connection error'}, 500
             
         cursor = db.cursor(dictionary=True)
         
         try:
-            cursor.execute('''
+            query = '''
                 SELECT 
                     b.bot_id as id,
                     b.bot_name as name,
@@ -944,19 +1169,18 @@ class BotList(Resource):
                     f.funds as current_funds,
                     COUNT(DISTINCT p.position_id) as total_positions
                 FROM bots b
-                LEFT JOIN (
-                    SELECT bot_id, funds
-                    FROM funds f1
-                    WHERE id = (
-                        SELECT MAX(id)
-                        FROM funds f2
-                        WHERE f1.bot_id = f2.bot_id
-                    )
-                ) f ON b.bot_id = f.bot_id
+                LEFT JOIN funds_current f ON b.bot_id = f.bot_id
                 LEFT JOIN cex_market p ON b.bot_id = p.bot_id
                 GROUP BY b.bot_id, f.funds
                 ORDER BY b.bot_id DESC
-            ''')
+            '''
+            if stream_requested():
+                response = stream_json_list(query, (), 'bots')
+                if response is None:
+                    return {'message': 'Database connection error'}, 500
+                return response
+
+            cursor.execute(query)
             bots = cursor.fetchall()
             
             return {'bots': bots}, 200
@@ -966,7 +1190,6 @@ class BotList(Resource):
             return {'message': f'Error fetching bots: {str(e)}'}, 500
         finally:
             cursor.close()
-            db.close()
 
 @bots_ns.route('/<bot_name>')
 class Bot(Resource):
@@ -988,7 +1211,7 @@ class Bot(Resource):
         except jwt.InvalidTokenError:
             return {'error': 'Invalid token'}, 401
 
-        db = get_db()
+        db = get_request_db()
         if not db:
             return {'message': 'Database connection error'}, 500
             
@@ -1019,10 +1242,8 @@ class Bot(Resource):
 
             cursor.execute('''
                 SELECT funds
-                FROM funds
+                FROM funds_current
                 WHERE bot_id = %s
-                ORDER BY id DESC
-                LIMIT 1
             ''', (bot['id'],))
             
             funds_row = cursor.fetchone()
@@ -1044,4 +1265,3 @@ class Bot(Resource):
             return {'message': f'Error fetching bot: {str(e)}'}, 500
         finally:
             cursor.close()
-            db.close() 
\ No newline at end of file
@@ -0,0 +1,169 @@
+import click
+from loguru import logger
+from api.database import get_db
+from api.utils.pnl_rollup import ROLLUP_TABLE_DDL, rebuild
+from api.utils.archive import ARCHIVE_TABLES_DDL
+from api.utils.current_funds import CURRENT_FUNDS_TABLE_DDL, NUMERIC_FUNDS_PATTERN, backfill_current_funds
+from api.utils.versioning import VERSION_TABLE_DDL
+
+MIGRATIONS_TABLE_DDL = '''
+    CREATE TABLE IF NOT EXISTS schema_migrations (
+        version INTEGER PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+'''
+
+def _has_column(cursor, table, column):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.columns
+        WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s
+    ''', (table, column))
+    return cursor.fetchone() is not None
+
+def _has_index(cursor, table, index):
+    cursor.execute('''
+        SELECT 1 FROM information_schema.statistics
+        WHERE table_schema = DATABASE() AND table_name = %s AND index_name = %s
+        LIMIT 1
+    ''', (table, index))
+    return cursor.fetchone() is not None
+
+def _add_column(cursor, table, column, definition):
+    if not _has_column(cursor, table, column):
+        cursor.execute(f'ALTER TABLE {table} ADD COLUMN {column} {definition}')
+
+def _add_index(cursor, table, index, columns):
+    if not _has_index(cursor, table, index):
+        cursor.execute(f'CREATE INDEX {index} ON {table} ({columns})')
+
+def _create_derived_tables(cursor):
+    cursor.execute(ROLLUP_TABLE_DDL)
+    cursor.execute(VERSION_TABLE_DDL)
+    # dashboards read the rollup as soon as it exists, it starts with every trade already closed
+    cursor.execute('SELECT bot_id FROM bots')
+    for bot_id, in cursor.fetchall():
+        rebuild(cursor, bot_id)
+
+def _add_activity_date(cursor):
+    # the recent trades listing sorts on COALESCE(sell_date, buy_date), stored so it can be indexed
+    _add_column(cursor, 'cex_market', 'activity_date', 'TIMESTAMP AS (COALESCE(sell_date, buy_date)) STORED')
+
+def _add_hot_query_indexes(cursor):
+    # closed trades of a bot: profit aggregates, risk metrics and performance series read only this index
+    _add_index(
+        cursor, 'cex_market', 'idx_cex_market_bot_sell',
+        'bot_id, sell_date, buy_value_usdc, sell_value_usdc, buy_fees, sell_fees'
+    )
+    # open positions and position listings by opening date
+    _add_index(cursor, 'cex_market', 'idx_cex_market_bot_buy', 'bot_id, buy_date')
+    # recent trades, keyset pages walk (activity_date, position_id) within a bot
+    _add_index(cursor, 'cex_market', 'idx_cex_market_bot_activity', 'bot_id, activity_date, position_id')
+    # latest funds row per bot, MAX(id) grouped by bot_id becomes an index range scan
+    _add_index(cursor, 'funds', 'idx_funds_bot_id', 'bot_id, id')
+    # the last connections kept per user at login
+    _add_index(cursor, 'connection_logs', 'idx_connection_logs_user_date', 'user, connection_date')
+
+def _create_archive_tables(cursor):
+    # created after the indexes, the archive copies them
+    for statement in ARCHIVE_TABLES_DDL:
+        cursor.execute(statement)
+
+def _create_current_funds(cursor):
+    cursor.execute(CURRENT_FUNDS_TABLE_DDL)
+    backfill_current_funds(cursor)
+
+def _add_fund_history_columns(cursor):
+    # snapshots taken before this migration have no known date, their created_at stays NULL
+    _add_column(cursor, 'funds', 'created_at', 'TIMESTAMP NULL')
+    _add_column(cursor, 'funds', 'amount', 'DECIMAL(24, 8) NULL')
+    # snapshots whose text is not a number keep a NULL amount
+    cursor.execute('''
+        UPDATE funds SET amount = CAST(TRIM(funds) AS DECIMAL(24, 8))
+        WHERE amount IS NULL AND TRIM(funds) REGEXP %s
+    ''', (NUMERIC_FUNDS_PATTERN,))
+    # fund history charts read a bot's time range from the index alone
+    _add_index(cursor, 'funds', 'idx_funds_bot_created', 'bot_id, created_at, amount')
+
+def _add_archived_rollup_columns(cursor):
+    # the rollup tells archived trades apart, dashboards leave them out unless include_archived is set
+    for column, definition in (
+        ('archived_profit', 'DECIMAL(24, 8) NOT NULL DEFAULT 0'),
+        ('archived_fees', 'DECIMAL(24, 8) NOT NULL DEFAULT 0'),
+        ('archived_trades', 'INTEGER NOT NULL DEFAULT 0'),
+        ('archived_wins', 'INTEGER NOT NULL DEFAULT 0')
+    ):
+        _add_column(cursor, 'bot_daily_pnl', column, definition)
+    cursor.execute('SELECT bot_id FROM bots')
+    for bot_id, in cursor.fetchall():
+        rebuild(cursor, bot_id, include_archive=True)
+
+def _add_positions_page_index(cursor):
+    # keyset pages of positions across every bot walk (buy_date, position_id)
+    _add_index(cursor, 'cex_market', 'idx_cex_market_buy_position', 'buy_date, position_id')
+
+# (version, description, apply) in order, applied versions are never run again
+MIGRATIONS = [
+    (1, 'daily pnl rollup and bot data versions tables', _create_derived_tables),
+    (2, 'cex_market.activity_date', _add_activity_date),
+    (3, 'indexes for the hot dashboard, positions, funds and login queries', _add_hot_query_indexes),
+    (4, 'cex_market and app archive tables', _create_archive_tables),
+    (5, 'funds_current, the latest funds of every bot', _create_current_funds),
+    (6, 'funds.created_at and numeric funds.amount', _add_fund_history_columns),
+    (7, 'archived trade totals in bot_daily_pnl', _add_archived_rollup_columns),
+    (8, 'index for positions pages across bots', _add_positions_page_index),
+]
+
+def applied_versions(cursor):
+    """Versions already applied, read through a tuple cursor"""
+    cursor.execute(MIGRATIONS_TABLE_DDL)
+    cursor.execute('SELECT version FROM schema_migrations')
+    return {version for version, in cursor.fetchall()}
+
+def migrate(db):
+    """Apply the pending migrations on a connection, return the versions applied
+
+    Every step checks the schema before changing it, a database already
+    holding some of the tables, columns or indexes is brought up to date
+    without errors.
+    """
+    # buffered, the existence checks read a single row of their result
+    cursor = db.cursor(buffered=True)
+    try:
+        done = applied_versions(cursor)
+        applied = []
+        for version, description, apply in MIGRATIONS:
+            if version in done:
+                continue
+            apply(cursor)
+            cursor.execute(
+                'INSERT INTO schema_migrations (version, description) VALUES (%s, %s)',
+                (version, description)
+            )
+            # DDL commits implicitly, the version is recorded right after its changes
+            db.commit()
+            applied.append(version)
+            logger.info(f"Applied migration {version}: {description}")
+        return applied
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+
+@click.command('db-migrate')
+def migrate_command():
+    """Create the missing tables, columns and indexes."""
+    db = get_db()
+    if not db:
+        raise click.ClickException('Database connection error')
+
+    try:
+        applied = migrate(db)
+    finally:
+        db.close()
+
+    if applied:
+        click.echo(f'Applied migration(s) {", ".join(str(version) for version in applied)}')
+    else:
+        click.echo('Database schema is up to date')
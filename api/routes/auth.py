@@ -1,6 +1,6 @@
 import os
 from flask import Blueprint, request, jsonify
-from api.database import get_db
+from api.database import get_request_db
 from api.utils.crypt_password import encrypt_password, check_password
 from api.utils.auth import generate_token, rate_limit, verify_token
 from loguru import logger
@@ -22,7 +22,7 @@ def register():
     if len(data['password']) < 8:
         return jsonify({'message': 'Password must be at least 8 characters'}), 400
         
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
@@ -56,7 +56,6 @@ def register():
         return jsonify({'message': f'Error creating user: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/login', methods=['POST'])
 @rate_limit(max_requests=20, window=60)
@@ -66,7 +65,7 @@ def login():
     if not data or not data.get('user') or not data.get('password'):
         return jsonify({'message': 'Missing required fields'}), 400
         
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
@@ -145,7 +144,6 @@ def login():
         return jsonify({'message': f'Error during login: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/logout', methods=['POST'])
 def logout():
@@ -163,7 +161,7 @@ def get_user():
         if not payload:
             return jsonify({'message': 'Invalid token'}), 401
             
-        db = get_db()
+        db = get_request_db()
         if not db:
             return jsonify({'message': 'Database connection error'}), 500
             
@@ -183,7 +181,6 @@ def get_user():
             return jsonify({'message': 'Error fetching user data'}), 500
         finally:
             cursor.close()
-            db.close()
             
     except Exception as e:
         logger.error(f"Token verification error: {e}")
@@ -1,5 +1,7 @@
 from flask import Blueprint, request, jsonify
-from api.database import get_db
+from api.database import get_request_db
+from api.utils.bot_registry import invalidate_bot
+from api.utils.streaming import stream_requested, stream_json_list
 from loguru import logger
 
 bp = Blueprint('bots', __name__, url_prefix='/api/bots')
@@ -11,7 +13,7 @@ def create_bot():
     if not data or not data.get('name') or not data.get('strategy'):
         return jsonify({'message': 'Missing required fields'}), 400
         
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
@@ -27,6 +29,7 @@ def create_bot():
             VALUES (%s, %s, %s)
         ''', (data['name'], data['strategy'], data.get('status', 'inactive')))
         db.commit()
+        invalidate_bot(data['name'])
         
         bot_id = cursor.lastrowid
         
@@ -43,22 +46,28 @@ def create_bot():
         return jsonify({'message': f'Error creating bot: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/', methods=['GET'])
 def get_bots():
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('''
+        query = '''
             SELECT bot_id as id, bot_name as name, strategy, status, created_at
             FROM bots
             ORDER BY created_at DESC
-        ''')
+        '''
+        if stream_requested():
+            response = stream_json_list(query, (), 'bots')
+            if response is None:
+                return jsonify({'message': 'Database connection error'}), 500
+            return response
+
+        cursor.execute(query)
         bots = cursor.fetchall()
         
         return jsonify({'bots': bots}), 200
@@ -68,11 +77,10 @@ def get_bots():
         return jsonify({'message': f'Error fetching bots: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/<bot_name>', methods=['GET'])
 def get_bot(bot_name):
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
@@ -89,12 +97,10 @@ def get_bot(bot_name):
                 f.funds as current_funds,
                 COUNT(DISTINCT p.position_id) as total_positions
             FROM bots b
-            LEFT JOIN funds f ON b.bot_id = f.bot_id
+            LEFT JOIN funds_current f ON b.bot_id = f.bot_id
             LEFT JOIN cex_market p ON b.bot_id = p.bot_id
             WHERE b.bot_name = %s
             GROUP BY b.bot_id, f.funds
-            ORDER BY f.id DESC
-            LIMIT 1
         ''', (bot_name,))
         bot = cursor.fetchone()
         
@@ -108,4 +114,3 @@ def get_bot(bot_name):
         return jsonify({'message': f'Error fetching bot: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close() 
\ No newline at end of file
@@ -1,331 +1,815 @@
-from flask import Blueprint, request, jsonify
-from api.database import get_db
+from flask import Blueprint, Response, request, jsonify
+from api.database import get_request_db
 from api.utils.auth import token_required
-from datetime import datetime, timedelta
+from api.utils.bot_registry import resolve_bot_id
+from api.utils.pnl_rollup import PNL_ROLLUP_ENABLED, PROFIT_SQL, rollup_column
+from api.utils.pagination import encode_cursor, decode_cursor, keyset_condition
+from api.utils.cache import dashboard_cache
+from api.utils.versioning import etag_by_bot_version, request_bot_version
+from api.utils.analytics import load_closed_trades, risk_metrics, lttb
+from api.utils.events import event_hub, SSE_HEARTBEAT
+from api.utils.filters import parse_bound
+from api.utils.archive import archived_requested, positions_source
+from api.utils.buckets import BUCKET_ORIGIN, bucket_sql, bucket_number, bucket_label
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from itertools import accumulate
 from loguru import logger
+import queue
+import numpy as np
 
 bp = Blueprint('dashboard', __name__, url_prefix='/api/dashboard')
 
+def _empty_overview():
+    return {
+        'total_balance': {
+            'amount': 0,
+            'week_change_percentage': 0,
+            'month_change_percentage': 0
+        },
+        'total_profit': {
+            'all_time': 0,
+            'week': {'amount': 0, 'percentage': 0},
+            'month': {'amount': 0, 'percentage': 0}
+        },
+        'win_rate': {
+            'all_time': 0,
+            'week': 0,
+            'month': 0
+        }
+    }
+
+def _build_overview(stats):
+    # stats holds profit, trade and win totals for the all-time, week and month windows
+    total_profit = stats['total_profit']
+    week_profit = stats['week_profit']
+    month_profit = stats['month_profit']
+
+    week_change = (week_profit / (total_profit - week_profit) * 100) if total_profit != week_profit else 0
+    month_change = (month_profit / (total_profit - month_profit) * 100) if total_profit != month_profit else 0
+
+    total_win_rate = (stats['total_wins'] / stats['total_trades'] * 100) if stats['total_trades'] > 0 else 0
+    week_win_rate = (stats['week_wins'] / stats['week_trades'] * 100) if stats['week_trades'] > 0 else 0
+    month_win_rate = (stats['month_wins'] / stats['month_trades'] * 100) if stats['month_trades'] > 0 else 0
+
+    return {
+        'total_balance': {
+            'amount': total_profit,
+            'week_change_percentage': week_change,
+            'month_change_percentage': month_change
+        },
+        'total_profit': {
+            'all_time': total_profit,
+            'week': {
+                'amount': week_profit,
+                'percentage': week_change
+            },
+            'month': {
+                'amount': month_profit,
+                'percentage': month_change
+            }
+        },
+        'win_rate': {
+            'all_time': total_win_rate,
+            'week': week_win_rate,
+            'month': month_win_rate
+        }
+    }
+
+_OVERVIEW_STATS = (
+    'total_profit', 'total_trades', 'total_wins',
+    'week_profit', 'week_trades', 'week_wins',
+    'month_profit', 'month_trades', 'month_wins'
+)
+
+def _overview_stats(cursor, bot_ids, week_ago, month_ago):
+    """Aggregate profit, trade and win totals of each bot for the all-time, week and month windows"""
+    placeholders = ', '.join(['%s'] * len(bot_ids))
+
+    # every source row carries flags telling which windows it counts towards
+    if PNL_ROLLUP_ENABLED:
+        week_day_end = datetime.combine(week_ago.date() + timedelta(days=1), time.min)
+        month_day_end = datetime.combine(month_ago.date() + timedelta(days=1), time.min)
+
+        # whole days come from the rollup, the partly covered first day of
+        # each window is read from trades and only counted for that window.
+        # Archived trades are left out, as cex_market alone would
+        source = f'''
+            SELECT
+                r.bot_id,
+                {rollup_column('profit', False)} as profit,
+                {rollup_column('trades', False)} as trades,
+                {rollup_column('wins', False)} as wins,
+                1 as in_total,
+                r.day > %s as in_week,
+                r.day > %s as in_month
+            FROM bot_daily_pnl r
+            WHERE r.bot_id IN ({placeholders})
+            UNION ALL
+            SELECT
+                cm.bot_id,
+                ({PROFIT_SQL}),
+                1,
+                ({PROFIT_SQL}) > 0,
+                0,
+                cm.sell_date >= %s AND cm.sell_date < %s,
+                cm.sell_date >= %s AND cm.sell_date < %s
+            FROM cex_market cm
+            WHERE cm.bot_id IN ({placeholders})
+            AND (
+                (cm.sell_date >= %s AND cm.sell_date < %s)
+                OR (cm.sell_date >= %s AND cm.sell_date < %s)
+            )
+        '''
+        params = (
+            week_ago.date(), month_ago.date(), *bot_ids,
+            week_ago, week_day_end, month_ago, month_day_end, *bot_ids,
+            week_ago, week_day_end, month_ago, month_day_end
+        )
+    else:
+        source = f'''
+            SELECT
+                cm.bot_id,
+                ({PROFIT_SQL}) as profit,
+                1 as trades,
+                ({PROFIT_SQL}) > 0 as wins,
+                1 as in_total,
+                cm.sell_date >= %s as in_week,
+                cm.sell_date >= %s as in_month
+            FROM cex_market cm
+            WHERE cm.bot_id IN ({placeholders})
+            AND cm.sell_date IS NOT NULL
+        '''
+        params = (week_ago, month_ago, *bot_ids)
+
+    cursor.execute(f'''
+        SELECT
+            t.bot_id,
+            COALESCE(SUM(CASE WHEN t.in_total THEN t.profit END), 0) as total_profit,
+            COALESCE(SUM(CASE WHEN t.in_total THEN t.trades END), 0) as total_trades,
+            COALESCE(SUM(CASE WHEN t.in_total THEN t.wins END), 0) as total_wins,
+            COALESCE(SUM(CASE WHEN t.in_week THEN t.profit END), 0) as week_profit,
+            COALESCE(SUM(CASE WHEN t.in_week THEN t.trades END), 0) as week_trades,
+            COALESCE(SUM(CASE WHEN t.in_week THEN t.wins END), 0) as week_wins,
+            COALESCE(SUM(CASE WHEN t.in_month THEN t.profit END), 0) as month_profit,
+            COALESCE(SUM(CASE WHEN t.in_month THEN t.trades END), 0) as month_trades,
+            COALESCE(SUM(CASE WHEN t.in_month THEN t.wins END), 0) as month_wins
+        FROM ({source}) t
+        GROUP BY t.bot_id
+    ''', params)
+
+    stats = {bot_id: dict.fromkeys(_OVERVIEW_STATS, 0) for bot_id in bot_ids}
+    for row in cursor.fetchall():
+        bot_stats = stats[row.pop('bot_id')]
+        # SUM over integer columns comes back as Decimal, win rates are expected as floats
+        for key, value in row.items():
+            bot_stats[key] = int(value) if key.endswith(('_trades', '_wins')) else value
+
+    return stats
+
+def _compute_overview(db, bot_id):
+    cursor = db.cursor(dictionary=True)
+    try:
+        now = datetime.now()
+        week_ago = now - timedelta(days=7)
+        month_ago = now - timedelta(days=30)
+
+        stats = _overview_stats(cursor, [bot_id], week_ago, month_ago)[bot_id]
+
+        if not stats['total_trades']:
+            return _empty_overview()
+
+        return _build_overview(stats)
+    finally:
+        cursor.close()
+
 @bp.route('/overview/<bot_name>', methods=['GET'])
 @token_required
+@etag_by_bot_version(time_dependent=True)
 def get_overview(current_user, bot_name):
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', (bot_name,))
-        bot = cursor.fetchone()
-        if not bot:
+        bot_id = resolve_bot_id(cursor, bot_name)
+        if not bot_id:
             return jsonify({
                 'message': 'Bot not found'
             }), 404
 
+        overview = dashboard_cache.get_or_compute(
+            'overview', bot_id, (), lambda db: _compute_overview(db, bot_id), db,
+            version=request_bot_version(bot_id)
+        )
+        return jsonify(overview), 200
+        
+    except Exception as e:
+        logger.error(f"Error fetching overview data: {e}")
+        return jsonify({'message': f'Error fetching overview data: {str(e)}'}), 500
+    finally:
+        cursor.close()
+
+@bp.route('/portfolio', methods=['GET'])
+@token_required
+def get_portfolio(current_user):
+    db = get_request_db()
+    if not db:
+        return jsonify({'message': 'Database connection error'}), 500
+        
+    cursor = db.cursor(dictionary=True)
+    
+    try:
+        cursor.execute('''
+            SELECT bot_id, bot_name
+            FROM bots
+            WHERE client_user = %s
+            ORDER BY bot_name
+        ''', (current_user,))
+        bots = cursor.fetchall()
+
+        if not bots:
+            return jsonify({'bots': [], 'total': _empty_overview()}), 200
+
         now = datetime.now()
         week_ago = now - timedelta(days=7)
         month_ago = now - timedelta(days=30)
-        
-        cursor.execute('''
-            SELECT 
-                cm.position_id,
-                cm.buy_value_usdc,
-                cm.sell_value_usdc,
-                cm.buy_fees,
-                cm.sell_fees,
-                cm.sell_date,
-                (cm.sell_value_usdc - cm.buy_value_usdc - cm.buy_fees - cm.sell_fees) as profit
-            FROM cex_market cm
-            JOIN bots b ON cm.bot_id = b.bot_id
-            WHERE cm.sell_date IS NOT NULL
-            AND b.bot_name = %s
-            ORDER BY cm.sell_date ASC
-        ''', (bot_name,))
-        positions = cursor.fetchall()
-        
-        if not positions:
-            return jsonify({
-                'total_balance': {
-                    'amount': 0,
-                    'week_change_percentage': 0,
-                    'month_change_percentage': 0
-                },
-                'total_profit': {
-                    'all_time': 0,
-                    'week': {'amount': 0, 'percentage': 0},
-                    'month': {'amount': 0, 'percentage': 0}
-                },
-                'win_rate': {
-                    'all_time': 0,
-                    'week': 0,
-                    'month': 0
-                }
-            }), 200
-        
-        total_balance = 0
-        week_balance = 0
-        month_balance = 0
-        total_profit = 0
-        week_profit = 0
-        month_profit = 0
-        total_trades = 0
-        winning_trades = 0
-        week_trades = 0
-        week_wins = 0
-        month_trades = 0
-        month_wins = 0
-        
-        for pos in positions:
-            sell_date = pos['sell_date']
-            profit = pos['profit']
-            
-            total_balance += profit
-            total_profit += profit
-            total_trades += 1
-            if profit > 0:
-                winning_trades += 1
-                
-            if sell_date >= week_ago:
-                week_balance += profit
-                week_profit += profit
-                week_trades += 1
-                if profit > 0:
-                    week_wins += 1
-                    
-            if sell_date >= month_ago:
-                month_balance += profit
-                month_profit += profit
-                month_trades += 1
-                if profit > 0:
-                    month_wins += 1
-        
-        week_change = (week_balance / (total_balance - week_balance) * 100) if total_balance != week_balance else 0
-        month_change = (month_balance / (total_balance - month_balance) * 100) if total_balance != month_balance else 0
-        
-        total_win_rate = (winning_trades / total_trades * 100) if total_trades > 0 else 0
-        week_win_rate = (week_wins / week_trades * 100) if week_trades > 0 else 0
-        month_win_rate = (month_wins / month_trades * 100) if month_trades > 0 else 0
-        
+
+        # one grouped statement covers every bot instead of one overview request per bot
+        stats = _overview_stats(cursor, [bot['bot_id'] for bot in bots], week_ago, month_ago)
+
+        combined = dict.fromkeys(_OVERVIEW_STATS, 0)
+        result = []
+        for bot in bots:
+            bot_stats = stats[bot['bot_id']]
+            for key in _OVERVIEW_STATS:
+                combined[key] += bot_stats[key]
+            result.append({
+                'bot_id': bot['bot_id'],
+                'bot_name': bot['bot_name'],
+                **(_build_overview(bot_stats) if bot_stats['total_trades'] else _empty_overview())
+            })
+
         return jsonify({
-            'total_balance': {
-                'amount': total_balance,
-                'week_change_percentage': week_change,
-                'month_change_percentage': month_change
-            },
-            'total_profit': {
-                'all_time': total_profit,
-                'week': {
-                    'amount': week_profit,
-                    'percentage': week_change
-                },
-                'month': {
-                    'amount': month_profit,
-                    'percentage': month_change
-                }
-            },
-            'win_rate': {
-                'all_time': total_win_rate,
-                'week': week_win_rate,
-                'month': month_win_rate
-            }
+            'bots': result,
+            'total': _build_overview(combined) if combined['total_trades'] else _empty_overview()
         }), 200
         
     except Exception as e:
-        logger.error(f"Error fetching overview data: {e}")
-        return jsonify({'message': f'Error fetching overview data: {str(e)}'}), 500
+        logger.error(f"Error fetching portfolio data: {e}")
+        return jsonify({'message': f'Error fetching portfolio data: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
+
+# calendar intervals: label format and SQL expression of the period's first day, given a DATE expression
+_CALENDAR_INTERVALS = {
+    'daily': ('%Y-%m-%d', '{0}'),
+    'weekly': ('%Y-%U', 'DATE_SUB({0}, INTERVAL DAYOFWEEK({0}) - 1 DAY)'),
+    'monthly': ('%Y-%m', 'DATE_SUB({0}, INTERVAL DAYOFMONTH({0}) - 1 DAY)')
+}
+# sub-day intervals are fixed-length buckets, in seconds
+_SECOND_INTERVALS = {
+    'hourly': 3600,
+    '4h': 14400
+}
+MIN_BUCKET_SECONDS = 60
+MAX_PERFORMANCE_BUCKETS = 10000
+
+def _whole_day(bound):
+    return bound is None or bound.time() == time.min
+
+def _period_start(day, interval):
+    if interval == 'weekly':
+        # weeks start on sunday like MySQL's %U
+        return day - timedelta(days=(day.weekday() + 1) % 7)
+    if interval == 'monthly':
+        return day.replace(day=1)
+    return day
+
+def _next_period(day, interval):
+    if interval == 'weekly':
+        return day + timedelta(days=7)
+    if interval == 'monthly':
+        return (day + timedelta(days=32)).replace(day=1)
+    return day + timedelta(days=1)
+
+def _bucket_keys(first, last, interval, bucket_seconds):
+    """Every bucket from first to last, so that periods without trades are reported too"""
+    keys = []
+    key = first
+    while key <= last:
+        if len(keys) >= MAX_PERFORMANCE_BUCKETS:
+            raise ValueError('Too many buckets, narrow the date range or use a larger interval')
+        keys.append(key)
+        key = key + 1 if bucket_seconds else _next_period(key, interval)
+    return keys
+
+def _balance_before(cursor, bot_id, start, include_archived):
+    """Profit of the trades sold before start, the balance a bounded chart opens with"""
+    source = positions_source(include_archived)
+    if not PNL_ROLLUP_ENABLED:
+        cursor.execute(f'''
+            SELECT COALESCE(SUM({PROFIT_SQL}), 0) as balance
+            FROM {source} cm
+            WHERE cm.bot_id = %s
+            AND cm.sell_date < %s
+        ''', (bot_id, start))
+        return cursor.fetchone()['balance']
+
+    # whole days come from the rollup, only the start of the first day is read from trades
+    cursor.execute(f'''
+        SELECT
+            (
+                SELECT COALESCE(SUM({rollup_column('profit', include_archived)}), 0)
+                FROM bot_daily_pnl r
+                WHERE r.bot_id = %s AND r.day < %s
+            )
+            + (
+                SELECT COALESCE(SUM({PROFIT_SQL}), 0)
+                FROM {source} cm
+                WHERE cm.bot_id = %s
+                AND cm.sell_date >= %s AND cm.sell_date < %s
+            ) as balance
+    ''', (bot_id, start.date(), bot_id, datetime.combine(start.date(), time.min), start))
+    return cursor.fetchone()['balance']
+
+def _compute_performance(db, bot_id, interval, bucket_seconds=None, start=None, end=None, include_archived=False):
+    cursor = db.cursor(dictionary=True)
+    try:
+        bounds = []
+        # the rollup holds whole days, finer buckets or bounds are read from the trades themselves
+        if PNL_ROLLUP_ENABLED and not bucket_seconds and _whole_day(start) and _whole_day(end):
+            day_trades = rollup_column('trades', include_archived)
+            if start:
+                bounds.append(('r.day >= %s', start.date()))
+            if end:
+                bounds.append(('r.day < %s', end.date()))
+            cursor.execute(f'''
+                SELECT 
+                    {_CALENDAR_INTERVALS[interval][1].format('r.day')} as bucket,
+                    SUM({rollup_column('profit', include_archived)}) as profit,
+                    SUM({day_trades}) as trades
+                FROM bot_daily_pnl r
+                WHERE r.bot_id = %s
+                AND {day_trades} > 0
+                {''.join(f' AND {condition}' for condition, _ in bounds)}
+                GROUP BY bucket
+                ORDER BY bucket ASC
+            ''', (bot_id, *[value for _, value in bounds]))
+        else:
+            if bucket_seconds:
+                bucket = bucket_sql('cm.sell_date', bucket_seconds)
+                bucket_params = (BUCKET_ORIGIN,)
+            else:
+                bucket = _CALENDAR_INTERVALS[interval][1].format('DATE(cm.sell_date)')
+                bucket_params = ()
+            if start:
+                bounds.append(('cm.sell_date >= %s', start))
+            if end:
+                bounds.append(('cm.sell_date < %s', end))
+            cursor.execute(f'''
+                SELECT 
+                    {bucket} as bucket,
+                    SUM({PROFIT_SQL}) as profit,
+                    COUNT(*) as trades
+                FROM {positions_source(include_archived)} cm
+                WHERE cm.bot_id = %s
+                AND cm.sell_date IS NOT NULL
+                {''.join(f' AND {condition}' for condition, _ in bounds)}
+                GROUP BY bucket
+                ORDER BY bucket ASC
+            ''', (*bucket_params, bot_id, *[value for _, value in bounds]))
+
+        periods = {
+            int(row['bucket']) if bucket_seconds else row['bucket']: (row['profit'], int(row['trades']))
+            for row in cursor.fetchall()
+        }
+        balance = _balance_before(cursor, bot_id, start, include_archived) if start else Decimal(0)
+    finally:
+        cursor.close()
+
+    if bucket_seconds:
+        def bucket_of(moment):
+            return bucket_number(moment, bucket_seconds)
+
+        def label(key):
+            return bucket_label(key, bucket_seconds)
+    else:
+        def bucket_of(moment):
+            return _period_start(moment.date(), interval)
+
+        def label(key):
+            return key.strftime(_CALENDAR_INTERVALS[interval][0])
+
+    # open-ended ranges start and stop at the first and last traded bucket
+    keys = []
+    if periods or (start and end):
+        first = bucket_of(start) if start else min(periods)
+        last = bucket_of(end - timedelta(microseconds=1)) if end else max(periods)
+        if not start and not end:
+            # a full history in small buckets shows its most recent MAX_PERFORMANCE_BUCKETS,
+            # the periods left out still count in the opening balance
+            if bucket_seconds:
+                first = max(first, last - MAX_PERFORMANCE_BUCKETS + 1)
+            else:
+                first = max(first, _period_start(last - timedelta(days=MAX_PERFORMANCE_BUCKETS - 1), interval))
+            balance += sum((profit for key, (profit, _) in periods.items() if key < first), Decimal(0))
+        keys = _bucket_keys(first, last, interval, bucket_seconds)
+
+    result = []
+    for key in keys:
+        profit, trades = periods.get(key, (Decimal(0), 0))
+        balance += profit
+        result.append({
+            'date': label(key),
+            'profit': profit,
+            'balance': balance,
+            'trades': trades
+        })
+
+    return {
+        'interval': interval,
+        'data': result
+    }
+
+def _downsample_performance(performance, max_points):
+    """Keep max_points periods chosen by LTTB on the balance curve, skipped periods are folded into the next kept one"""
+    data = performance['data']
+    if len(data) <= max_points:
+        return performance
+
+    # gap filling makes periods evenly spaced, so their index serves as x
+    balance = np.array([float(period['balance']) for period in data])
+    kept = lttb(np.arange(balance.size, dtype=np.float64), balance, max_points)
+    trades = list(accumulate(period['trades'] for period in data))
+
+    result = []
+    previous = None
+    for index in kept:
+        period = data[index]
+        result.append({
+            'date': period['date'],
+            'profit': period['profit'] if previous is None else period['balance'] - data[previous]['balance'],
+            'balance': period['balance'],
+            'trades': trades[index] - (trades[previous] if previous is not None else 0)
+        })
+        previous = index
+
+    # the cached payload is shared, the thinned series is a new one
+    return {**performance, 'data': result}
 
 @bp.route('/performance/<bot_name>', methods=['GET'])
 @token_required
+@etag_by_bot_version(time_dependent=False)
 def get_performance(current_user, bot_name):
     interval = request.args.get('interval', 'daily')
-    db = get_db()
+    bucket_seconds = request.args.get('bucket_seconds', type=int)
+    if bucket_seconds is not None:
+        if bucket_seconds < MIN_BUCKET_SECONDS:
+            return jsonify({'message': f'bucket_seconds must be at least {MIN_BUCKET_SECONDS}'}), 400
+        interval = f'{bucket_seconds}s'
+    elif interval in _SECOND_INTERVALS:
+        bucket_seconds = _SECOND_INTERVALS[interval]
+    elif interval not in _CALENDAR_INTERVALS:
+        return jsonify({'message': 'Invalid interval'}), 400
+
+    try:
+        start = parse_bound(request.args.get('from'))
+        end = parse_bound(request.args.get('to'))
+    except ValueError:
+        return jsonify({'message': 'Invalid from/to date'}), 400
+    if start and end and start >= end:
+        return jsonify({'message': 'from must be before to'}), 400
+
+    max_points = request.args.get('max_points', type=int)
+    if max_points is not None and max_points < 3:
+        return jsonify({'message': 'max_points must be at least 3'}), 400
+    include_archived = archived_requested()
+
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', (bot_name,))
-        bot = cursor.fetchone()
-        if not bot:
+        bot_id = resolve_bot_id(cursor, bot_name)
+        if not bot_id:
             return jsonify({
                 'message': 'Bot not found'
             }), 404
 
-        if interval == 'daily':
-            date_format = '%Y-%m-%d'
-            group_by = 'DATE(cm.sell_date)'
-        elif interval == 'weekly':
-            date_format = '%Y-%U'
-            group_by = 'YEARWEEK(cm.sell_date)'
-        elif interval == 'monthly':
-            date_format = '%Y-%m'
-            group_by = 'DATE_FORMAT(cm.sell_date, "%Y-%m")'
-        else:
-            return jsonify({'message': 'Invalid interval'}), 400
-            
-        cursor.execute(f'''
-            SELECT 
-                {group_by} as date_group,
-                DATE_FORMAT(MIN(cm.sell_date), %s) as period,
-                SUM(cm.sell_value_usdc - cm.buy_value_usdc - cm.buy_fees - cm.sell_fees) as profit,
-                COUNT(*) as trades
-            FROM cex_market cm
-            JOIN bots b ON cm.bot_id = b.bot_id
-            WHERE cm.sell_date IS NOT NULL
-            AND b.bot_name = %s
-            GROUP BY date_group
-            ORDER BY date_group ASC
-        ''', (date_format, bot_name))
-        
-        performance_data = cursor.fetchall()
-        
-        running_balance = 0
-        result = []
-        
-        for period in performance_data:
-            running_balance += period['profit']
-            result.append({
-                'date': period['period'],
-                'profit': period['profit'],
-                'balance': running_balance,
-                'trades': period['trades']
-            })
-            
-        return jsonify({
-            'interval': interval,
-            'data': result
-        }), 200
-        
+        performance = dashboard_cache.get_or_compute(
+            'performance', bot_id, (interval, start, end, include_archived),
+            lambda db: _compute_performance(db, bot_id, interval, bucket_seconds, start, end, include_archived), db,
+            version=request_bot_version(bot_id)
+        )
+        if max_points:
+            performance = _downsample_performance(performance, max_points)
+        return jsonify(performance), 200
+
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching performance data: {e}")
         return jsonify({'message': f'Error fetching performance data: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
+
+def _compute_risk(db, bot_id, window, include_archived=False):
+    # plain tuple rows are converted to arrays without building a dict per trade
+    cursor = db.cursor()
+    try:
+        cursor.execute('SELECT invest_capital FROM bots WHERE bot_id = %s', (bot_id,))
+        row = cursor.fetchone()
+        capital = float(row[0]) if row and row[0] is not None else 0.0
+
+        buy_ts, sell_ts, profit = load_closed_trades(cursor, bot_id, positions_source(include_archived))
+    finally:
+        cursor.close()
+
+    return risk_metrics(buy_ts, sell_ts, profit, capital=capital, window=window)
+
+@bp.route('/risk/<bot_name>', methods=['GET'])
+@token_required
+@etag_by_bot_version(time_dependent=False)
+def get_risk(current_user, bot_name):
+    window = request.args.get('window', 20, type=int)
+    if window < 1:
+        return jsonify({'message': 'Invalid window'}), 400
+    include_archived = archived_requested()
+
+    db = get_request_db()
+    if not db:
+        return jsonify({'message': 'Database connection error'}), 500
+        
+    cursor = db.cursor(dictionary=True)
+    
+    try:
+        bot_id = resolve_bot_id(cursor, bot_name)
+        if not bot_id:
+            return jsonify({
+                'message': 'Bot not found'
+            }), 404
+
+        risk = dashboard_cache.get_or_compute(
+            'risk', bot_id, (window, include_archived),
+            lambda db: _compute_risk(db, bot_id, window, include_archived), db,
+            version=request_bot_version(bot_id)
+        )
+        return jsonify(risk), 200
+        
+    except Exception as e:
+        logger.error(f"Error fetching risk metrics: {e}")
+        return jsonify({'message': f'Error fetching risk metrics: {str(e)}'}), 500
+    finally:
+        cursor.close()
+
+_RECENT_TRADE_COLUMNS = '''
+    cm.position_id,
+    cm.pair,
+    cm.buy_price as entry_price,
+    CASE 
+        WHEN cm.sell_date IS NOT NULL THEN cm.sell_value_usdc - cm.buy_value_usdc - COALESCE(cm.buy_fees, 0) - COALESCE(cm.sell_fees, 0)
+        ELSE NULL
+    END as profit_loss,
+    CASE 
+        WHEN cm.sell_date IS NOT NULL THEN ((cm.sell_value_usdc - cm.buy_value_usdc - COALESCE(cm.buy_fees, 0) - COALESCE(cm.sell_fees, 0)) / cm.buy_value_usdc * 100)
+        ELSE NULL
+    END as profit_loss_percentage,
+    CASE 
+        WHEN cm.sell_date IS NOT NULL THEN TIMESTAMPDIFF(DAY, cm.buy_date, cm.sell_date)
+        ELSE TIMESTAMPDIFF(DAY, cm.buy_date, NOW())
+    END as duration_days,
+    cm.buy_date,
+    cm.sell_date,
+    cm.exchange,
+    cm.buy_value_usdc,
+    cm.sell_value_usdc,
+    cm.buy_fees,
+    cm.sell_fees,
+    CASE 
+        WHEN cm.sell_date IS NULL THEN 'OPEN'
+        ELSE 'CLOSED'
+    END as status
+'''
+
+def _count_trades(cursor, bot_id, mode, include_archived):
+    if mode == 'approx' and PNL_ROLLUP_ENABLED:
+        # closed trades are already counted per day in the rollup, only open ones are counted live, they are never archived
+        cursor.execute(f'''
+            SELECT
+                (
+                    SELECT COALESCE(SUM({rollup_column('trades', include_archived)}), 0)
+                    FROM bot_daily_pnl r
+                    WHERE r.bot_id = %s
+                )
+                + (SELECT COUNT(*) FROM cex_market cm WHERE cm.bot_id = %s AND cm.sell_date IS NULL) as total
+        ''', (bot_id, bot_id))
+    else:
+        cursor.execute(f'''
+            SELECT COUNT(*) as total
+            FROM {positions_source(include_archived)} cm
+            WHERE cm.bot_id = %s
+        ''', (bot_id,))
+    return int(cursor.fetchone()['total'])
+
+def _trade_cursor(trade, direction):
+    # activity_date is the stored COALESCE(sell_date, buy_date) the listing is sorted on
+    return encode_cursor(trade['sell_date'] or trade['buy_date'], trade['position_id'], direction)
+
+def _compute_recent_trades(db, bot_id, page, limit, page_cursor, total_mode, include_archived=False):
+    cursor = db.cursor(dictionary=True)
+    try:
+        total = _count_trades(cursor, bot_id, total_mode, include_archived) if total_mode != 'none' else None
+
+        query = f'''
+            SELECT {_RECENT_TRADE_COLUMNS}
+            FROM {positions_source(include_archived)} cm
+            WHERE cm.bot_id = %s
+        '''
+        params = [bot_id]
+
+        direction = 'next'
+        if page_cursor:
+            sort_value, position_id, direction = decode_cursor(page_cursor)
+            condition, condition_params = keyset_condition(
+                'cm.activity_date', 'cm.position_id', sort_value, position_id, direction
+            )
+            query += f' AND {condition}'
+            params += condition_params
+            order = 'DESC' if direction == 'next' else 'ASC'
+            query += f' ORDER BY cm.activity_date {order}, cm.position_id {order} LIMIT %s'
+            params.append(limit + 1)
+        else:
+            query += ' ORDER BY cm.activity_date DESC, cm.position_id DESC LIMIT %s OFFSET %s'
+            params += [limit + 1, (page - 1) * limit]
+
+        cursor.execute(query, params)
+        trades = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    has_more = len(trades) > limit
+    trades = trades[:limit]
+    if direction == 'prev':
+        trades.reverse()
+
+    next_cursor = prev_cursor = None
+    if trades:
+        # walking backwards always leaves a page ahead, walking forwards always leaves one behind
+        if has_more or direction == 'prev':
+            next_cursor = _trade_cursor(trades[-1], 'next')
+        if (page_cursor and direction == 'next') or (has_more and direction == 'prev') or (not page_cursor and page > 1):
+            prev_cursor = _trade_cursor(trades[0], 'prev')
+
+    return {
+        'trades': trades,
+        'pagination': {
+            'total': total,
+            'page': None if page_cursor else page,
+            'limit': limit,
+            'pages': (total + limit - 1) // limit if total is not None else None,
+            'next_cursor': next_cursor,
+            'prev_cursor': prev_cursor
+        }
+    }
 
 @bp.route('/recent-trades/<bot_name>', methods=['GET'])
 @token_required
+@etag_by_bot_version(time_dependent=True)
 def get_recent_trades(current_user, bot_name):
     page = int(request.args.get('page', 1))
-    limit = int(request.args.get('limit', 10))
-    offset = (page - 1) * limit
+    limit = max(1, min(int(request.args.get('limit', 10)), 500))
+
+    # cursor tokens make deep pages cost the same as the first one
+    page_cursor = request.args.get('cursor')
+    total_mode = request.args.get('total', 'none' if page_cursor else 'exact')
+    if total_mode not in ('exact', 'approx', 'none'):
+        return jsonify({'message': 'Invalid total mode'}), 400
+    include_archived = archived_requested()
+
+    if page_cursor:
+        try:
+            decode_cursor(page_cursor)
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
     
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', (bot_name,))
-        bot = cursor.fetchone()
-        if not bot:
+        bot_id = resolve_bot_id(cursor, bot_name)
+        if not bot_id:
             return jsonify({
                 'message': 'Bot not found'
             }), 404
 
-        cursor.execute('''
-            SELECT COUNT(*) as total
-            FROM cex_market cm
-            JOIN bots b ON cm.bot_id = b.bot_id
-            WHERE b.bot_name = %s
-        ''', (bot_name,))
-        total = cursor.fetchone()['total']
-        
-        cursor.execute('''
-            SELECT 
-                cm.position_id,
-                cm.pair,
-                cm.buy_price as entry_price,
-                CASE 
-                    WHEN cm.sell_date IS NOT NULL THEN cm.sell_value_usdc - cm.buy_value_usdc - COALESCE(cm.buy_fees, 0) - COALESCE(cm.sell_fees, 0)
-                    ELSE NULL
-                END as profit_loss,
-                CASE 
-                    WHEN cm.sell_date IS NOT NULL THEN ((cm.sell_value_usdc - cm.buy_value_usdc - COALESCE(cm.buy_fees, 0) - COALESCE(cm.sell_fees, 0)) / cm.buy_value_usdc * 100)
-                    ELSE NULL
-                END as profit_loss_percentage,
-                CASE 
-                    WHEN cm.sell_date IS NOT NULL THEN TIMESTAMPDIFF(DAY, cm.buy_date, cm.sell_date)
-                    ELSE TIMESTAMPDIFF(DAY, cm.buy_date, NOW())
-                END as duration_days,
-                cm.buy_date,
-                cm.sell_date,
-                cm.exchange,
-                cm.buy_value_usdc,
-                cm.sell_value_usdc,
-                cm.buy_fees,
-                cm.sell_fees,
-                CASE 
-                    WHEN cm.sell_date IS NULL THEN 'OPEN'
-                    ELSE 'CLOSED'
-                END as status
-            FROM cex_market cm
-            JOIN bots b ON cm.bot_id = b.bot_id
-            WHERE b.bot_name = %s
-            ORDER BY COALESCE(cm.sell_date, cm.buy_date) DESC
-            LIMIT %s OFFSET %s
-        ''', (bot_name, limit, offset))
-        
-        trades = cursor.fetchall()
-        
-        return jsonify({
-            'trades': trades,
-            'pagination': {
-                'total': total,
-                'page': page,
-                'limit': limit,
-                'pages': (total + limit - 1) // limit
-            }
-        }), 200
+        recent_trades = dashboard_cache.get_or_compute(
+            'recent-trades', bot_id, (page, limit, page_cursor, total_mode, include_archived),
+            lambda db: _compute_recent_trades(db, bot_id, page, limit, page_cursor, total_mode, include_archived), db,
+            version=request_bot_version(bot_id)
+        )
+        return jsonify(recent_trades), 200
         
     except Exception as e:
         logger.error(f"Error fetching recent trades: {e}")
         return jsonify({'message': f'Error fetching recent trades: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
+
+@bp.route('/stream/<bot_name>', methods=['GET'])
+@token_required
+def stream_events(current_user, bot_name):
+    db = get_request_db()
+    if not db:
+        return jsonify({'message': 'Database connection error'}), 500
+        
+    cursor = db.cursor(dictionary=True)
+    
+    try:
+        bot_id = resolve_bot_id(cursor, bot_name)
+        if not bot_id:
+            return jsonify({
+                'message': 'Bot not found'
+            }), 404
+    except Exception as e:
+        logger.error(f"Error opening event stream: {e}")
+        return jsonify({'message': f'Error opening event stream: {str(e)}'}), 500
+    finally:
+        cursor.close()
+
+    subscription = event_hub.subscribe(bot_id)
+    if not subscription:
+        return jsonify({'message': 'Too many open streams'}), 503
+
+    # not wrapped in stream_with_context, so the request connection goes back to the pool before streaming
+    def generate():
+        try:
+            yield 'retry: 5000\n\n'
+            while True:
+                try:
+                    message = subscription.get(timeout=SSE_HEARTBEAT)
+                except queue.Empty:
+                    yield ': heartbeat\n\n'
+                    continue
+                if message is None:
+                    # dropped for falling behind, the client reconnects and reloads
+                    yield 'event: dropped\ndata: {}\n\n'
+                    return
+                yield message
+        finally:
+            event_hub.unsubscribe(subscription)
+
+    return Response(generate(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'
+    })
+
+_TRADE_DETAIL_COLUMNS = '''
+    cm.position_id,
+    cm.pair,
+    cm.exchange,
+    cm.buy_order_id,
+    cm.buy_price,
+    cm.buy_quantity,
+    cm.buy_fees,
+    cm.buy_value_usdc,
+    cm.buy_date,
+    cm.buy_signals,
+    cm.sell_order_id,
+    cm.sell_price,
+    cm.sell_quantity,
+    cm.sell_fees,
+    cm.sell_value_usdc,
+    cm.sell_date,
+    cm.sell_signals,
+    cm.ratio,
+    cm.position_duration,
+    cm.fund_slot,
+    b.bot_name,
+    b.bot_id
+'''
+MAX_BATCH_TRADES = 500
 
 @bp.route('/trades/<int:position_id>', methods=['GET'])
 @token_required
 def get_trade_details(current_user, position_id):
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('''
-            SELECT 
-                cm.position_id,
-                cm.pair,
-                cm.exchange,
-                cm.buy_order_id,
-                cm.buy_price,
-                cm.buy_quantity,
-                cm.buy_fees,
-                cm.buy_value_usdc,
-                cm.buy_date,
-                cm.buy_signals,
-                cm.sell_order_id,
-                cm.sell_price,
-                cm.sell_quantity,
-                cm.sell_fees,
-                cm.sell_value_usdc,
-                cm.sell_date,
-                cm.sell_signals,
-                cm.ratio,
-                cm.position_duration,
-                cm.fund_slot,
-                b.bot_name,
-                b.bot_id
-            FROM cex_market cm
+        cursor.execute(f'''
+            SELECT {_TRADE_DETAIL_COLUMNS}
+            FROM {positions_source(archived_requested())} cm
             JOIN bots b ON cm.bot_id = b.bot_id
             WHERE cm.position_id = %s
         ''', (position_id,))
@@ -342,4 +826,49 @@ def get_trade_details(current_user, position_id):
         return jsonify({'message': f'Error fetching trade details: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
\ No newline at end of file
+
+@bp.route('/trades/batch', methods=['POST'])
+@token_required
+def get_trade_details_batch(current_user):
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('position_ids'), list):
+        return jsonify({'message': 'position_ids must be a list'}), 400
+
+    position_ids = data['position_ids']
+    if not all(isinstance(position_id, int) and not isinstance(position_id, bool) for position_id in position_ids):
+        return jsonify({'message': 'position_ids must be integers'}), 400
+    # duplicates are looked up once, the order of first appearance is kept
+    position_ids = list(dict.fromkeys(position_ids))
+    if len(position_ids) > MAX_BATCH_TRADES:
+        return jsonify({'message': f'At most {MAX_BATCH_TRADES} position_ids per request'}), 400
+    if not position_ids:
+        return jsonify({'trades': [], 'not_found': []}), 200
+
+    db = get_request_db()
+    if not db:
+        return jsonify({'message': 'Database connection error'}), 500
+        
+    cursor = db.cursor(dictionary=True)
+    
+    try:
+        placeholders = ', '.join(['%s'] * len(position_ids))
+        cursor.execute(f'''
+            SELECT {_TRADE_DETAIL_COLUMNS}
+            FROM {positions_source(archived_requested())} cm
+            JOIN bots b ON cm.bot_id = b.bot_id
+            WHERE cm.position_id IN ({placeholders})
+        ''', position_ids)
+        
+        trades = {trade['position_id']: trade for trade in cursor.fetchall()}
+            
+        return jsonify({
+            'trades': [trades[position_id] for position_id in position_ids if position_id in trades],
+            'not_found': [position_id for position_id in position_ids if position_id not in trades]
+        }), 200
+        
+    except Exception as e:
+        logger.error(f"Error fetching trade details: {e}")
+        return jsonify({'message': f'Error fetching trade details: {str(e)}'}), 500
+    finally:
+        cursor.close()
@@ -1,7 +1,15 @@
 from flask import Blueprint, request, jsonify
-from api.database import get_db
+from api.database import get_request_db
 from api.utils.auth import token_required
+from api.utils.bot_registry import resolve_bot_id
+from api.utils.cache import dashboard_cache
+from api.utils.versioning import bump_bot_versions, etag_by_bot_version, request_bot_version
+from api.utils.streaming import stream_requested, stream_json_list
+from api.utils.current_funds import record_funds
+from api.utils.filters import parse_bound
+from api.utils.buckets import BUCKET_ORIGIN, bucket_sql, bucket_label
 from loguru import logger
+import math
 
 bp = Blueprint('funds', __name__, url_prefix='/api/funds')
 
@@ -16,34 +24,31 @@ def create_fund(current_user):
     if not isinstance(data['funds'], (int, float)) or data['funds'] <= 0:
         return jsonify({'message': 'Invalid funds amount'}), 400
         
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', (data['bot_name'],))
-        bot = cursor.fetchone()
-        if not bot:
+        bot_id = resolve_bot_id(cursor, data['bot_name'])
+        if not bot_id:
             return jsonify({'message': 'Bot not found'}), 404
 
         cursor.execute('''
             SELECT position_id 
             FROM cex_market cm
-            JOIN bots b ON cm.bot_id = b.bot_id
-            WHERE b.bot_name = %s 
+            WHERE cm.bot_id = %s 
             ORDER BY position_id DESC 
             LIMIT 1
-        ''', (data['bot_name'],))
+        ''', (bot_id,))
         result = cursor.fetchone()
         last_position_id = result['position_id'] if result else 0
 
-        cursor.execute('''
-            INSERT INTO funds (bot_id, last_position_id, funds)
-            VALUES (%s, %s, %s)
-        ''', (bot['bot_id'], last_position_id, str(data['funds'])))
+        record_funds(cursor, bot_id, last_position_id, data['funds'])
+        bump_bot_versions(cursor, [bot_id])
         db.commit()
+        dashboard_cache.invalidate_bot(bot_id)
         
         return jsonify({
             'bot_name': data['bot_name'],
@@ -57,31 +62,33 @@ def create_fund(current_user):
         return jsonify({'message': f'Error creating fund: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/<bot_name>', methods=['GET'])
 @token_required
+@etag_by_bot_version()
 def get_fund(current_user, bot_name):
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
+        bot_id = resolve_bot_id(cursor, bot_name)
+        if not bot_id:
+            return jsonify({'message': 'Fund not found'}), 404
+
         cursor.execute('''
-            SELECT f.id, b.bot_name, f.last_position_id, f.funds
-            FROM funds f
-            JOIN bots b ON f.bot_id = b.bot_id
-            WHERE b.bot_name = %s
-            ORDER BY f.id DESC 
-            LIMIT 1
-        ''', (bot_name,))
+            SELECT fc.fund_id as id, fc.last_position_id, fc.funds
+            FROM funds_current fc
+            WHERE fc.bot_id = %s
+        ''', (bot_id,))
         fund = cursor.fetchone()
         
         if not fund:
             return jsonify({'message': 'Fund not found'}), 404
             
+        fund['bot_name'] = bot_name
         return jsonify(fund), 200
         
     except Exception as e:
@@ -89,29 +96,30 @@ def get_fund(current_user, bot_name):
         return jsonify({'message': f'Error fetching fund: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/', methods=['GET'])
 @token_required
 def get_funds(current_user):
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('''
-            SELECT f1.id, b.bot_name, f1.last_position_id, f1.funds
-            FROM funds f1
-            JOIN bots b ON f1.bot_id = b.bot_id
-            INNER JOIN (
-                SELECT bot_id, MAX(id) as max_id
-                FROM funds
-                GROUP BY bot_id
-            ) f2 ON f1.bot_id = f2.bot_id AND f1.id = f2.max_id
+        query = '''
+            SELECT fc.fund_id as id, b.bot_name, fc.last_position_id, fc.funds
+            FROM funds_current fc
+            JOIN bots b ON fc.bot_id = b.bot_id
             ORDER BY b.bot_name
-        ''')
+        '''
+        if stream_requested():
+            response = stream_json_list(query, (), 'funds')
+            if response is None:
+                return jsonify({'message': 'Database connection error'}), 500
+            return response
+
+        cursor.execute(query)
         funds = cursor.fetchall()
         
         return jsonify({'funds': funds}), 200
@@ -121,4 +129,124 @@ def get_funds(current_user):
         return jsonify({'message': f'Error fetching funds: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close() 
\ No newline at end of file
+
+_HISTORY_AGGREGATES = ('last', 'min', 'max')
+MIN_HISTORY_BUCKET_SECONDS = 60
+MAX_HISTORY_POINTS = 5000
+
+def _compute_fund_history(db, bot_id, agg, bucket_seconds, max_points, start, end):
+    cursor = db.cursor(dictionary=True)
+    try:
+        # snapshots recorded before created_at existed cannot be placed in time
+        conditions = ['f.bot_id = %s', 'f.created_at IS NOT NULL']
+        params = [bot_id]
+        if start:
+            conditions.append('f.created_at >= %s')
+            params.append(start)
+        if end:
+            conditions.append('f.created_at < %s')
+            params.append(end)
+        where = ' AND '.join(conditions)
+
+        first, last = start, end
+        if not (start and end):
+            cursor.execute(f'''
+                SELECT MIN(f.created_at) as first, MAX(f.created_at) as last
+                FROM funds f
+                WHERE {where}
+            ''', params)
+            bounds = cursor.fetchone()
+            if bounds['first'] is None:
+                return {'agg': agg, 'bucket_seconds': bucket_seconds, 'data': []}
+            first, last = start or bounds['first'], end or bounds['last']
+
+        # the bucket is widened until the range fits in max_points buckets, whatever their alignment
+        span = (last - first).total_seconds()
+        bucket_seconds = max(
+            bucket_seconds or MIN_HISTORY_BUCKET_SECONDS,
+            math.ceil(span / (max_points - 1))
+        )
+        bucket = bucket_sql('f.created_at', bucket_seconds)
+
+        if agg == 'last':
+            cursor.execute(f'''
+                SELECT bucket, funds
+                FROM (
+                    SELECT
+                        {bucket} as bucket,
+                        f.amount as funds,
+                        ROW_NUMBER() OVER (PARTITION BY {bucket} ORDER BY f.created_at DESC, f.id DESC) as latest
+                    FROM funds f
+                    WHERE {where}
+                ) snapshots
+                WHERE latest = 1
+                ORDER BY bucket ASC
+            ''', (BUCKET_ORIGIN, BUCKET_ORIGIN, *params))
+        else:
+            cursor.execute(f'''
+                SELECT {bucket} as bucket, {agg.upper()}(f.amount) as funds
+                FROM funds f
+                WHERE {where}
+                GROUP BY bucket
+                ORDER BY bucket ASC
+            ''', (BUCKET_ORIGIN, *params))
+        rows = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    return {
+        'agg': agg,
+        'bucket_seconds': bucket_seconds,
+        'data': [{
+            'date': bucket_label(row['bucket'], bucket_seconds),
+            'funds': row['funds']
+        } for row in rows]
+    }
+
+@bp.route('/<bot_name>/history', methods=['GET'])
+@token_required
+@etag_by_bot_version()
+def get_fund_history(current_user, bot_name):
+    agg = request.args.get('agg', 'last')
+    if agg not in _HISTORY_AGGREGATES:
+        return jsonify({'message': 'Invalid agg, expected last, min or max'}), 400
+
+    bucket_seconds = request.args.get('bucket_seconds', type=int)
+    if bucket_seconds is not None and bucket_seconds < MIN_HISTORY_BUCKET_SECONDS:
+        return jsonify({'message': f'bucket_seconds must be at least {MIN_HISTORY_BUCKET_SECONDS}'}), 400
+
+    max_points = request.args.get('max_points', 1000, type=int)
+    if not 2 <= max_points <= MAX_HISTORY_POINTS:
+        return jsonify({'message': f'max_points must be between 2 and {MAX_HISTORY_POINTS}'}), 400
+
+    try:
+        start = parse_bound(request.args.get('from'))
+        end = parse_bound(request.args.get('to'))
+    except ValueError:
+        return jsonify({'message': 'Invalid from/to date'}), 400
+    if start and end and start >= end:
+        return jsonify({'message': 'from must be before to'}), 400
+
+    db = get_request_db()
+    if not db:
+        return jsonify({'message': 'Database connection error'}), 500
+        
+    cursor = db.cursor(dictionary=True)
+    
+    try:
+        bot_id = resolve_bot_id(cursor, bot_name)
+        if not bot_id:
+            return jsonify({'message': 'Bot not found'}), 404
+
+        history = dashboard_cache.get_or_compute(
+            'fund-history', bot_id, (agg, bucket_seconds, max_points, start, end),
+            lambda db: _compute_fund_history(db, bot_id, agg, bucket_seconds, max_points, start, end), db,
+            version=request_bot_version(bot_id)
+        )
+        return jsonify({'bot_name': bot_name, **history}), 200
+        
+    except Exception as e:
+        logger.error(f"Error fetching fund history: {e}")
+        return jsonify({'message': f'Error fetching fund history: {str(e)}'}), 500
+    finally:
+        cursor.close()
@@ -1,5 +1,8 @@
 from flask import Blueprint, jsonify
-from api.database import get_db
+from api.database import get_request_db, get_pool_stats
+from api.utils.cache import dashboard_cache
+from api.utils.events import event_hub
+from api.routes.positions import position_writer
 from loguru import logger
 import datetime
 
@@ -8,7 +11,7 @@ bp = Blueprint('health', __name__, url_prefix='/api/health')
 @bp.route('/', methods=['GET'])
 def health_check():
     try:
-        db = get_db()
+        db = get_request_db()
         if not db:
             return jsonify({
                 'status': 'error',
@@ -27,6 +30,10 @@ def health_check():
                     'status': 'healthy',
                     'message': 'Database connection successful',
                     'database': 'connected',
+                    'pool': get_pool_stats(),
+                    'dashboard_cache': dashboard_cache.stats(),
+                    'event_streams': event_hub.stats(),
+                    'write_behind': position_writer.stats(),
                     'timestamp': datetime.datetime.utcnow().isoformat()
                 }), 200
             else:
@@ -45,7 +52,6 @@ def health_check():
             }), 500
         finally:
             cursor.close()
-            db.close()
             
     except Exception as e:
         logger.error(f"Health check error: {e}")
@@ -1,10 +1,122 @@
-from flask import Blueprint, request, jsonify
-from api.database import get_db
+from flask import Blueprint, Response, current_app, request, jsonify
+from api.database import get_db, get_request_db, close_request_db
 from api.utils.auth import token_required
+from api.utils.bot_registry import resolve_bot_id
+from api.utils.pnl_rollup import PROFIT_SQL, record_sells, retract_sells
+from api.utils.cache import dashboard_cache
+from api.utils.versioning import bump_bot_versions
+from api.utils.events import event_hub
+from api.utils.filters import POSITION_FIELDS, parse_fields, position_filters
+from api.utils.pagination import encode_cursor, decode_cursor, keyset_condition
+from api.utils.archive import archived_requested, positions_source, app_source
+from api.utils.streaming import RowStream, ndjson_chunks, csv_chunks, stream_requested, stream_json_list
+from api.utils.write_behind import (
+    GroupCommitWriter, POSITION_WRITE_BEHIND, WRITE_BEHIND_MAX_BATCH,
+    WRITE_BEHIND_MAX_DELAY, WRITE_BEHIND_QUEUE_SIZE, WRITE_BEHIND_TIMEOUT,
+    WriteCancelled, WritePending
+)
+from decimal import Decimal
+import queue
 from loguru import logger
 
 bp = Blueprint('positions', __name__, url_prefix='/api/positions')
 
+_INSERT_POSITION = '''
+    INSERT INTO cex_market (
+        buy_order_id, buy_price, buy_quantity, buy_fees, 
+        buy_value_usdc, exchange, pair, bot_id, buy_date,
+        buy_signals, fund_slot
+    ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s)
+'''
+
+def _read_back_ids(cursor, first_id, keys):
+    """Ids of rows just inserted from first_id on, one per (bot_id, buy_order_id) key in order
+
+    The ids of one INSERT grow in row order but are not consecutive under
+    innodb_autoinc_lock_mode 2, they are read back instead of computed.
+    """
+    unique_keys = list(dict.fromkeys(keys))
+    placeholders = ', '.join(['(%s, %s)'] * len(unique_keys))
+    cursor.execute(f'''
+        SELECT position_id, bot_id, buy_order_id
+        FROM cex_market
+        WHERE position_id >= %s
+        AND (bot_id, buy_order_id) IN ({placeholders})
+        ORDER BY position_id
+    ''', (first_id, *[value for key in unique_keys for value in key]))
+    found = {}
+    for row in cursor.fetchall():
+        found.setdefault((row['bot_id'], row['buy_order_id']), []).append(row['position_id'])
+
+    # a key sent twice takes its ids in row order
+    position_ids = []
+    for bot_id, buy_order_id in keys:
+        ids = found.get((bot_id, buy_order_id))
+        if not ids:
+            raise RuntimeError(f'Inserted position {buy_order_id} of bot {bot_id} not found')
+        position_ids.append(ids.pop(0))
+    return position_ids
+
+def _insert_positions(cursor, positions):
+    """Insert (bot_id, data) positions and their app rows, return the new position ids in order"""
+    rows = [(
+        data['buy_order_id'], data['buy_price'], data['buy_quantity'],
+        data['buy_fees'], data['buy_value_usdc'], data['exchange'],
+        data['pair'], bot_id, data.get('buy_signals'),
+        data.get('fund_slot', 0)
+    ) for bot_id, data in positions]
+
+    # executemany sends one multi-row INSERT, lastrowid is the id of its first row
+    cursor.executemany(_INSERT_POSITION, rows)
+    first_id = cursor.lastrowid
+    if len(rows) == 1:
+        position_ids = [first_id]
+    else:
+        keys = [(bot_id, int(data['buy_order_id'])) for bot_id, data in positions]
+        position_ids = _read_back_ids(cursor, first_id, keys)
+
+    cursor.executemany(
+        'INSERT INTO app (position_id) VALUES (%s)',
+        [(position_id,) for position_id in position_ids]
+    )
+    bump_bot_versions(cursor, {bot_id for bot_id, _ in positions})
+    return position_ids
+
+def _publish_open(bot_id, position_id, data):
+    """Notify event streams of a committed position"""
+    event_hub.publish(bot_id, 'position-opened', {
+        'position_id': position_id,
+        'pair': data['pair'],
+        'exchange': data['exchange'],
+        'buy_price': data['buy_price'],
+        'buy_quantity': data['buy_quantity'],
+        'buy_value_usdc': data['buy_value_usdc']
+    })
+
+def _position_opened(bot_id, position_id, data):
+    dashboard_cache.invalidate_bot(bot_id)
+    _publish_open(bot_id, position_id, data)
+
+def _committed(future, on_commit):
+    if future.cancelled() or future.exception() is not None:
+        return
+    try:
+        on_commit(future.result())
+    except Exception as e:
+        logger.error(f"Error announcing a queued position write: {e}")
+
+def _write_behind(kind, item, on_commit):
+    """Hand a write to the group commit writer and wait until its batch committed
+
+    on_commit(result) runs once the write committed, also when the request
+    stopped waiting for it, so caches and event streams never miss it.
+    """
+    # the request connection would sit idle while the write waits, give it back to the pool first
+    close_request_db()
+    future = position_writer.submit(kind, item)
+    future.add_done_callback(lambda done: _committed(done, on_commit))
+    return position_writer.wait(future, WRITE_BEHIND_TIMEOUT)
+
 @bp.route('/', methods=['POST'])
 @token_required
 def create_position(current_user):
@@ -19,89 +131,452 @@ def create_position(current_user):
         if field not in data:
             return jsonify({'message': f'Missing required field: {field}'}), 400
             
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', (data['bot_name'],))
-        bot = cursor.fetchone()
-        if not bot:
+        bot_id = resolve_bot_id(cursor, data['bot_name'])
+        if not bot_id:
             return jsonify({'message': f'Bot {data["bot_name"]} not found'}), 404
+
+        if not POSITION_WRITE_BEHIND:
+            position_id = _insert_positions(cursor, [(bot_id, data)])[0]
+            db.commit()
+        
+    except Exception as e:
+        logger.error(f"Error creating position: {e}")
+        db.rollback()
+        return jsonify({'message': f'Error creating position: {str(e)}'}), 500
+    finally:
+        cursor.close()
+
+    if POSITION_WRITE_BEHIND:
+        try:
+            position_id = _write_behind(
+                'create', (bot_id, data), lambda position_id: _position_opened(bot_id, position_id, data)
+            )
+        except queue.Full:
+            return jsonify({'message': 'Too many pending writes, retry later'}), 503
+        except WriteCancelled:
+            return jsonify({'message': 'Position was not created in time, retry later'}), 503
+        except WritePending:
+            # retrying would create the position twice
+            return jsonify({'message': 'Position creation is still pending', 'status': 'pending'}), 202
+        except Exception as e:
+            logger.error(f"Error creating position: {e}")
+            return jsonify({'message': f'Error creating position: {str(e)}'}), 500
+    else:
+        _position_opened(bot_id, position_id, data)
+    
+    return jsonify({
+        'message': 'Position created successfully',
+        'position_id': position_id
+    }), 201
+
+MAX_BULK_POSITIONS = 500
+
+_BULK_NUMERIC_FIELDS = ['buy_price', 'buy_quantity', 'buy_fees', 'buy_value_usdc']
+_BULK_TEXT_FIELDS = {'exchange': 20, 'pair': 20, 'bot_name': 50}
+
+def _is_number(value):
+    if isinstance(value, bool):
+        return False
+    try:
+        return Decimal(str(value)).is_finite()
+    except ArithmeticError:
+        return False
+
+def _bulk_position_error(position):
+    """Why a bulk position would be rejected by the insert, None when it is valid"""
+    if isinstance(position['buy_order_id'], bool) or not str(position['buy_order_id']).isdigit():
+        return 'buy_order_id must be a non-negative integer'
+    for field in _BULK_NUMERIC_FIELDS:
+        # fees may be unknown, readers count them as 0
+        if field == 'buy_fees' and position[field] is None:
+            continue
+        if not _is_number(position[field]):
+            return f'{field} must be a number'
+    for field, length in _BULK_TEXT_FIELDS.items():
+        if not isinstance(position[field], str) or not position[field] or len(position[field]) > length:
+            return f'{field} must be a non-empty string of at most {length} characters'
+    fund_slot = position.get('fund_slot', 0)
+    if isinstance(fund_slot, bool) or not isinstance(fund_slot, int):
+        return 'fund_slot must be an integer'
+    if position.get('buy_signals') is not None and not isinstance(position['buy_signals'], str):
+        return 'buy_signals must be a string'
+    return None
+
+@bp.route('/bulk', methods=['POST'])
+@token_required
+def create_positions_bulk(current_user):
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('positions'), list) or not data['positions']:
+        return jsonify({'message': 'positions must be a non-empty list'}), 400
+    if len(data['positions']) > MAX_BULK_POSITIONS:
+        return jsonify({'message': f'At most {MAX_BULK_POSITIONS} positions per request'}), 400
+
+    required_fields = ['buy_order_id', 'buy_price', 'buy_quantity', 'buy_fees',
+                      'buy_value_usdc', 'exchange', 'pair', 'bot_name']
+    errors = []
+    valid = []
+    for index, position in enumerate(data['positions']):
+        if not isinstance(position, dict):
+            errors.append({'index': index, 'message': 'Position must be an object'})
+            continue
+        missing = next((field for field in required_fields if field not in position), None)
+        if missing:
+            errors.append({'index': index, 'message': f'Missing required field: {missing}'})
+            continue
+        # a bad value would fail the insert of every position, it is reported on its own
+        error = _bulk_position_error(position)
+        if error:
+            errors.append({'index': index, 'message': error})
+            continue
+        valid.append((index, position))
             
-        cursor.execute('''
-            INSERT INTO cex_market (
-                buy_order_id, buy_price, buy_quantity, buy_fees, 
-                buy_value_usdc, exchange, pair, bot_id, buy_date,
-                buy_signals, fund_slot
-            ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, NOW(), %s, %s)
-        ''', (
-            data['buy_order_id'], data['buy_price'], data['buy_quantity'],
-            data['buy_fees'], data['buy_value_usdc'], data['exchange'],
-            data['pair'], bot['bot_id'], data.get('buy_signals'),
-            data.get('fund_slot', 0)
-        ))
-        position_id = cursor.lastrowid
+    db = get_request_db()
+    if not db:
+        return jsonify({'message': 'Database connection error'}), 500
         
-        cursor.execute(
-            'INSERT INTO app (position_id) VALUES (%s)',
-            (position_id,)
-        )
+    cursor = db.cursor(dictionary=True)
+    
+    try:
+        # each bot is resolved once however many of its positions are sent
+        bot_ids = {}
+        for bot_name in {position['bot_name'] for _, position in valid}:
+            bot_ids[bot_name] = resolve_bot_id(cursor, bot_name)
+
+        rows = []
+        for index, position in valid:
+            if not bot_ids[position['bot_name']]:
+                errors.append({'index': index, 'message': f'Bot {position["bot_name"]} not found'})
+            else:
+                rows.append((index, position))
+
+        if not rows:
+            return jsonify({'message': 'No valid positions', 'errors': errors}), 400
+
+        position_ids = _insert_positions(cursor, [(bot_ids[position['bot_name']], position) for _, position in rows])
         db.commit()
+
+        for bot_id in {bot_ids[position['bot_name']] for _, position in rows}:
+            dashboard_cache.invalidate_bot(bot_id)
+        for (_, position), position_id in zip(rows, position_ids):
+            _publish_open(bot_ids[position['bot_name']], position_id, position)
         
         return jsonify({
-            'message': 'Position created successfully',
-            'position_id': position_id
+            'message': f'{len(rows)} positions created successfully',
+            'positions': [
+                {'index': index, 'position_id': position_id}
+                for (index, _), position_id in zip(rows, position_ids)
+            ],
+            'errors': sorted(errors, key=lambda error: error['index'])
         }), 201
         
     except Exception as e:
-        logger.error(f"Error creating position: {e}")
+        logger.error(f"Error creating positions: {e}")
         db.rollback()
-        return jsonify({'message': f'Error creating position: {str(e)}'}), 500
+        return jsonify({'message': f'Error creating positions: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
+
+MAX_POSITIONS_PAGE = 1000
+
+def _position_cursor(position, direction):
+    return encode_cursor(position['buy_date'], position['position_id'], direction)
 
 @bp.route('/', methods=['GET'])
 @token_required
 def get_positions(current_user):
-    bot_name = request.args.get('bot_name')
-    db = get_db()
+    try:
+        fields = parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    # pages are opt-in, without limit or cursor every matching position is returned as before
+    page_cursor = request.args.get('cursor')
+    limit = request.args.get('limit', type=int)
+    paginate = page_cursor is not None or limit is not None
+    if paginate:
+        limit = max(1, min(limit or 100, MAX_POSITIONS_PAGE))
+
+    direction = 'next'
+    if page_cursor:
+        try:
+            sort_value, cursor_id, direction = decode_cursor(page_cursor)
+        except ValueError:
+            return jsonify({'message': 'Invalid cursor'}), 400
+
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
-        query = '''
-            SELECT cm.*, a.buy_log, a.sell_log
-            FROM cex_market cm
-            LEFT JOIN app a ON cm.position_id = a.position_id
-        '''
-        params = []
-        
-        if bot_name:
-            query += '''
-                JOIN bots b ON cm.bot_id = b.bot_id
-                WHERE b.bot_name = %s
-            '''
-            params.append(bot_name)
-            
-        query += ' ORDER BY cm.buy_date DESC'
+        filters = position_filters(cursor, request.args)
+        if filters is None:
+            if paginate:
+                return jsonify({'positions': [], 'pagination': {
+                    'limit': limit, 'next_cursor': None, 'prev_cursor': None
+                }}), 200
+            return jsonify({'positions': []}), 200
+        conditions, params = filters
+
+        hidden = []
+        if fields:
+            # the page cursor is built from buy_date and position_id even when they were not asked for
+            if paginate:
+                hidden = [field for field in ('position_id', 'buy_date') if field not in fields]
+            columns = ', '.join(f'{POSITION_FIELDS[field]} as {field}' for field in fields + hidden)
+            join_app = 'buy_log' in fields or 'sell_log' in fields
+        else:
+            columns = 'cm.*, a.buy_log, a.sell_log'
+            join_app = True
+
+        include_archived = archived_requested()
+        query = f'SELECT {columns} FROM {positions_source(include_archived)} cm'
+        if join_app:
+            query += f' LEFT JOIN {app_source(include_archived)} a ON cm.position_id = a.position_id'
+
+        if page_cursor:
+            condition, condition_params = keyset_condition(
+                'cm.buy_date', 'cm.position_id', sort_value, cursor_id, direction
+            )
+            conditions.append(condition)
+            params += condition_params
+
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+
+        if paginate:
+            order = 'DESC' if direction == 'next' else 'ASC'
+            query += f' ORDER BY cm.buy_date {order}, cm.position_id {order} LIMIT %s'
+            params.append(limit + 1)
+        else:
+            query += ' ORDER BY cm.buy_date DESC'
+
+        if not paginate and stream_requested():
+            response = stream_json_list(query, params, 'positions')
+            if response is None:
+                return jsonify({'message': 'Database connection error'}), 500
+            return response
         
         cursor.execute(query, params)
         positions = cursor.fetchall()
+
+        if not paginate:
+            return jsonify({'positions': positions}), 200
+
+        has_more = len(positions) > limit
+        positions = positions[:limit]
+        if direction == 'prev':
+            positions.reverse()
+
+        next_cursor = prev_cursor = None
+        if positions:
+            if has_more or direction == 'prev':
+                next_cursor = _position_cursor(positions[-1], 'next')
+            if (page_cursor and direction == 'next') or (has_more and direction == 'prev'):
+                prev_cursor = _position_cursor(positions[0], 'prev')
+
+        for position in positions:
+            for field in hidden:
+                del position[field]
         
-        return jsonify({'positions': positions}), 200
-        
+        return jsonify({
+            'positions': positions,
+            'pagination': {
+                'limit': limit,
+                'next_cursor': next_cursor,
+                'prev_cursor': prev_cursor
+            }
+        }), 200
+
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
     except Exception as e:
         logger.error(f"Error fetching positions: {e}")
         return jsonify({'message': f'Error fetching positions: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
+
+_EXPORT_FORMATS = {
+    'ndjson': ('application/x-ndjson', 'positions.ndjson'),
+    'csv': ('text/csv', 'positions.csv')
+}
+
+@bp.route('/export', methods=['GET'])
+@token_required
+def export_positions(current_user):
+    export_format = request.args.get('format', 'ndjson')
+    if export_format not in _EXPORT_FORMATS:
+        return jsonify({'message': 'Invalid format, expected ndjson or csv'}), 400
+
+    try:
+        fields = parse_fields(request.args.get('fields')) or list(POSITION_FIELDS)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+
+    db = get_request_db()
+    if not db:
+        return jsonify({'message': 'Database connection error'}), 500
+        
+    cursor = db.cursor(dictionary=True)
+    
+    try:
+        filters = position_filters(cursor, request.args)
+    except ValueError as e:
+        return jsonify({'message': str(e)}), 400
+    finally:
+        cursor.close()
+
+    include_archived = archived_requested()
+    columns = ', '.join(f'{POSITION_FIELDS[field]} as {field}' for field in fields)
+    query = f'SELECT {columns} FROM {positions_source(include_archived)} cm'
+    if 'buy_log' in fields or 'sell_log' in fields:
+        query += f' LEFT JOIN {app_source(include_archived)} a ON cm.position_id = a.position_id'
+    params = []
+    if filters is None:
+        # unknown bot, still answer with an empty export
+        query += ' WHERE FALSE'
+    elif filters[0]:
+        query += ' WHERE ' + ' AND '.join(filters[0])
+        params = filters[1]
+    query += ' ORDER BY cm.position_id'
+
+    # the export outlives the request, it reads through a connection of its own
+    export_db = get_db()
+    if not export_db:
+        return jsonify({'message': 'Database connection error'}), 500
+
+    try:
+        stream = RowStream(export_db, query, params)
+    except Exception as e:
+        logger.error(f"Error exporting positions: {e}")
+        return jsonify({'message': f'Error exporting positions: {str(e)}'}), 500
+
+    mimetype, filename = _EXPORT_FORMATS[export_format]
+    if export_format == 'csv':
+        chunks = csv_chunks(stream)
+    else:
+        chunks = ndjson_chunks(stream, current_app.json.dumps)
+
+    response = Response(chunks, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename={filename}',
+        'X-Accel-Buffering': 'no'
+    })
+    # a response closed before its generator started would otherwise never hand the connection back
+    response.call_on_close(stream.close)
+    return response
+
+# what a sell needs to know about a position before overwriting it
+_SELL_LOCK_COLUMNS = f'cm.position_id, cm.bot_id, cm.pair, cm.buy_value_usdc, cm.buy_fees, cm.sell_date, {PROFIT_SQL} as profit'
+
+def _sell_profit(position, data):
+    return (
+        Decimal(str(data['sell_value_usdc'])) - position['buy_value_usdc']
+        - (position['buy_fees'] or 0) - Decimal(str(data['sell_fees'] or 0))
+    )
+
+def _apply_sells(cursor, sells):
+    """Sell positions given as {position_id: data}
+
+    Returns the positions found as they were before the sell, each with the
+    new profit in sold_profit. Nothing is written when none is found.
+    """
+    # rows are locked in primary key order so concurrent batches do not deadlock
+    position_ids = sorted(sells)
+    placeholders = ', '.join(['%s'] * len(position_ids))
+    cursor.execute(f'''
+        SELECT {_SELL_LOCK_COLUMNS}
+        FROM cex_market cm
+        WHERE cm.position_id IN ({placeholders})
+        ORDER BY cm.position_id
+        FOR UPDATE
+    ''', position_ids)
+    positions = {position['position_id']: position for position in cursor.fetchall()}
+    found = [position_id for position_id in position_ids if position_id in positions]
+    if not found:
+        return positions
+
+    # positions sold again must not be counted twice in the daily rollup
+    retract_sells(cursor, [position_id for position_id in found if positions[position_id]['sell_date'] is not None])
+
+    # every sell of the batch is joined in as a derived table, one UPDATE for all rows
+    values = ' UNION ALL '.join(
+        ['''SELECT %s as position_id, %s as sell_order_id, %s as sell_price, %s as sell_quantity,
+            %s as sell_fees, %s as sell_value_usdc, %s as sell_signals''']
+        + ['SELECT %s, %s, %s, %s, %s, %s, %s'] * (len(found) - 1)
+    )
+    params = []
+    for position_id in found:
+        sell = sells[position_id]
+        params.extend((
+            position_id, sell['sell_order_id'], sell['sell_price'], sell['sell_quantity'],
+            sell['sell_fees'], sell['sell_value_usdc'], sell.get('sell_signals')
+        ))
+    # the assignment order of a multi-table UPDATE is not defined, ratio reads the new value from s
+    cursor.execute(f'''
+        UPDATE cex_market cm
+        JOIN ({values}) s ON s.position_id = cm.position_id
+        SET
+            cm.sell_order_id = s.sell_order_id,
+            cm.sell_price = s.sell_price,
+            cm.sell_quantity = s.sell_quantity,
+            cm.sell_fees = s.sell_fees,
+            cm.sell_value_usdc = s.sell_value_usdc,
+            cm.sell_date = NOW(),
+            cm.sell_signals = s.sell_signals,
+            cm.ratio = (s.sell_value_usdc - cm.buy_value_usdc) / cm.buy_value_usdc,
+            cm.position_duration = TIMESTAMPDIFF(SECOND, cm.buy_date, NOW())
+    ''', params)
+    record_sells(cursor, found)
+
+    # sell logs are flags, one UPDATE per distinct value
+    sell_logs = {}
+    for position_id in found:
+        if 'sell_log' in sells[position_id]:
+            sell_logs.setdefault(sells[position_id]['sell_log'], []).append(position_id)
+    for sell_log, log_ids in sell_logs.items():
+        cursor.execute(
+            f'UPDATE app SET sell_log = %s WHERE position_id IN ({", ".join(["%s"] * len(log_ids))})',
+            (sell_log, *log_ids)
+        )
+
+    # computed before the commit, a bad value rolls the sell back
+    for position_id in found:
+        positions[position_id]['sold_profit'] = _sell_profit(positions[position_id], sells[position_id])
+    bump_bot_versions(cursor, {positions[position_id]['bot_id'] for position_id in found})
+    return positions
+
+def _publish_sell(position_id, position, data):
+    """Notify event streams of a committed sell"""
+    profit = position['sold_profit']
+    resold = position['sell_date'] is not None
+    event_hub.publish(position['bot_id'], 'position-closed', {
+        'position_id': position_id,
+        'pair': position['pair'],
+        'sell_price': data['sell_price'],
+        'sell_value_usdc': data['sell_value_usdc'],
+        'profit': profit
+    })
+    # changes to the all-time overview totals, a sale replacing an earlier one swaps its profit
+    event_hub.publish(position['bot_id'], 'overview-delta', {
+        'profit': profit - position['profit'] if resold else profit,
+        'trades': 0 if resold else 1,
+        'wins': (profit > 0) - (position['profit'] > 0) if resold else int(profit > 0)
+    })
+
+def _position_sold(position_id, position, data):
+    # nothing was written for an unknown position
+    if position:
+        dashboard_cache.invalidate_bot(position['bot_id'])
+        _publish_sell(position_id, position, data)
 
 @bp.route('/<int:position_id>/sell', methods=['PUT'])
 @token_required
@@ -116,48 +591,160 @@ def update_position(current_user, position_id):
     for field in required_fields:
         if field not in data:
             return jsonify({'message': f'Missing required field: {field}'}), 400
+
+    if POSITION_WRITE_BEHIND:
+        try:
+            position = _write_behind(
+                'sell', (position_id, data), lambda position: _position_sold(position_id, position, data)
+            )
+        except queue.Full:
+            return jsonify({'message': 'Too many pending writes, retry later'}), 503
+        except WriteCancelled:
+            return jsonify({'message': 'Position was not updated in time, retry later'}), 503
+        except WritePending:
+            # retrying would apply the sell twice
+            return jsonify({'message': 'Position update is still pending', 'status': 'pending'}), 202
+        except Exception as e:
+            logger.error(f"Error updating position: {e}")
+            return jsonify({'message': f'Error updating position: {str(e)}'}), 500
+    else:
+        db = get_request_db()
+        if not db:
+            return jsonify({'message': 'Database connection error'}), 500
+            
+        cursor = db.cursor(dictionary=True)
+        
+        try:
+            position = _apply_sells(cursor, {position_id: data}).get(position_id)
+            if position:
+                db.commit()
+            
+        except Exception as e:
+            logger.error(f"Error updating position: {e}")
+            db.rollback()
+            return jsonify({'message': f'Error updating position: {str(e)}'}), 500
+        finally:
+            cursor.close()
+
+        _position_sold(position_id, position, data)
+
+    if not position:
+        return jsonify({'message': 'Position not found'}), 404
+
+    return jsonify({'message': 'Position updated successfully'}), 200
+
+MAX_BULK_SELLS = 500
+
+_BULK_SELL_NUMERIC_FIELDS = ['sell_price', 'sell_quantity', 'sell_fees', 'sell_value_usdc']
+
+def _bulk_sell_error(sell):
+    """Why a bulk sell would be rejected by the update, None when it is valid"""
+    if isinstance(sell['sell_order_id'], bool) or not str(sell['sell_order_id']).isdigit():
+        return 'sell_order_id must be a non-negative integer'
+    for field in _BULK_SELL_NUMERIC_FIELDS:
+        # fees may be unknown, readers count them as 0
+        if field == 'sell_fees' and sell[field] is None:
+            continue
+        if not _is_number(sell[field]):
+            return f'{field} must be a number'
+    if sell.get('sell_signals') is not None and not isinstance(sell['sell_signals'], str):
+        return 'sell_signals must be a string'
+    return None
+
+@bp.route('/bulk/sell', methods=['PUT'])
+@token_required
+def update_positions_bulk(current_user):
+    data = request.get_json()
+    
+    if not data or not isinstance(data.get('positions'), list) or not data['positions']:
+        return jsonify({'message': 'positions must be a non-empty list'}), 400
+    if len(data['positions']) > MAX_BULK_SELLS:
+        return jsonify({'message': f'At most {MAX_BULK_SELLS} positions per request'}), 400
+
+    required_fields = ['position_id', 'sell_order_id', 'sell_price', 'sell_quantity',
+                      'sell_fees', 'sell_value_usdc']
+    errors = []
+    sells = {}
+    for index, sell in enumerate(data['positions']):
+        if not isinstance(sell, dict):
+            errors.append({'index': index, 'message': 'Position must be an object'})
+            continue
+        missing = next((field for field in required_fields if field not in sell), None)
+        # a bad value would fail the update of every position, it is reported on its own
+        error = None if missing else _bulk_sell_error(sell)
+        if missing:
+            errors.append({'index': index, 'message': f'Missing required field: {missing}'})
+        elif not isinstance(sell['position_id'], int) or isinstance(sell['position_id'], bool):
+            errors.append({'index': index, 'message': 'position_id must be an integer'})
+        elif error:
+            errors.append({'index': index, 'message': error})
+        elif sell['position_id'] in sells:
+            errors.append({'index': index, 'message': f'Duplicate position_id: {sell["position_id"]}'})
+        else:
+            sells[sell['position_id']] = sell
+
+    if not sells:
+        return jsonify({'message': 'No valid positions', 'errors': errors}), 400
             
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
     cursor = db.cursor(dictionary=True)
     
     try:
-        cursor.execute('''
-            UPDATE cex_market SET
-                sell_order_id = %s,
-                sell_price = %s,
-                sell_quantity = %s,
-                sell_fees = %s,
-                sell_value_usdc = %s,
-                sell_date = NOW(),
-                sell_signals = %s,
-                ratio = (sell_value_usdc - buy_value_usdc) / buy_value_usdc,
-                position_duration = TIMESTAMPDIFF(SECOND, buy_date, NOW())
-            WHERE position_id = %s
-        ''', (
-            data['sell_order_id'], data['sell_price'], data['sell_quantity'],
-            data['sell_fees'], data['sell_value_usdc'], data.get('sell_signals'),
-            position_id
-        ))
-        
-        if cursor.rowcount == 0:
-            return jsonify({'message': 'Position not found'}), 404
-            
-        if 'sell_log' in data:
-            cursor.execute(
-                'UPDATE app SET sell_log = %s WHERE position_id = %s',
-                (data['sell_log'], position_id)
-            )
-            
+        positions = _apply_sells(cursor, sells)
+        found = sorted(positions)
+        not_found = [position_id for position_id in sorted(sells) if position_id not in positions]
+
+        if not found:
+            return jsonify({'message': 'No position found', 'not_found': not_found, 'errors': errors}), 404
+
         db.commit()
-        return jsonify({'message': 'Position updated successfully'}), 200
+
+        for bot_id in {positions[position_id]['bot_id'] for position_id in found}:
+            dashboard_cache.invalidate_bot(bot_id)
+        for position_id in found:
+            _publish_sell(position_id, positions[position_id], sells[position_id])
+
+        return jsonify({
+            'message': f'{len(found)} positions updated successfully',
+            'updated': found,
+            'not_found': not_found,
+            'errors': errors
+        }), 200
         
     except Exception as e:
-        logger.error(f"Error updating position: {e}")
+        logger.error(f"Error updating positions: {e}")
         db.rollback()
-        return jsonify({'message': f'Error updating position: {str(e)}'}), 500
+        return jsonify({'message': f'Error updating positions: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close() 
\ No newline at end of file
+
+def _flush_creates(cursor, items):
+    return _insert_positions(cursor, items)
+
+def _flush_sells(cursor, items):
+    # the same position may be sold twice within one batch, repeats go to a later round in submission order
+    results = [None] * len(items)
+    pending = list(enumerate(items))
+    while pending:
+        round_sells, later = {}, []
+        for index, (position_id, data) in pending:
+            if position_id in round_sells:
+                later.append((index, (position_id, data)))
+            else:
+                round_sells[position_id] = (index, data)
+        positions = _apply_sells(cursor, {position_id: data for position_id, (_, data) in round_sells.items()})
+        for position_id, (index, _) in round_sells.items():
+            results[index] = positions.get(position_id)
+        pending = later
+    return results
+
+# opt-in, see POSITION_WRITE_BEHIND
+position_writer = GroupCommitWriter(
+    {'create': _flush_creates, 'sell': _flush_sells},
+    max_batch=WRITE_BEHIND_MAX_BATCH,
+    max_delay=WRITE_BEHIND_MAX_DELAY,
+    queue_size=WRITE_BEHIND_QUEUE_SIZE
+)
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
-from api.database import get_db
+from api.database import get_request_db
 from api.utils.crypt_keys import encrypt_keys, decrypt_keys
-from api.utils.auth import token_required, is_wallet_owner, rate_limit
+from api.utils.auth import token_required, wallet_access_required, wallet_access, is_wallet_owner, rate_limit
 from loguru import logger
 
 bp = Blueprint('wallets', __name__, url_prefix='/api/wallets')
@@ -15,7 +15,7 @@ def create_wallet(current_user):
     if not data or not data.get('name') or not data.get('address') or not data.get('keys'):
         return jsonify({'message': 'Missing required fields'}), 400
         
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
@@ -50,21 +50,18 @@ def create_wallet(current_user):
         return jsonify({'message': f'Error creating wallet: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/<wallet_name>', methods=['GET'])
 @token_required
 def get_wallet(current_user, wallet_name):
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
-    if not is_wallet_owner(current_user, wallet_name, db):
-        return jsonify({'message': 'Access denied'}), 403
-        
     cursor = db.cursor(dictionary=True)
     
     try:
+        # the access join doubles as the ownership check
         cursor.execute('''
             SELECT w.* 
             FROM wallets w
@@ -75,7 +72,9 @@ def get_wallet(current_user, wallet_name):
         wallet = cursor.fetchone()
         
         if not wallet:
-            return jsonify({'message': 'Wallet not found'}), 404
+            if wallet_access(current_user, wallet_name, db) is None:
+                return jsonify({'message': 'Wallet not found'}), 404
+            return jsonify({'message': 'Access denied'}), 403
             
         wallet['keys'] = decrypt_keys(wallet['keys'])
             
@@ -86,18 +85,12 @@ def get_wallet(current_user, wallet_name):
         return jsonify({'message': f'Error fetching wallet: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/<wallet_name>', methods=['DELETE'])
 @token_required
+@wallet_access_required
 def delete_wallet(current_user, wallet_name):
-    db = get_db()
-    if not db:
-        return jsonify({'message': 'Database connection error'}), 500
-        
-    if not is_wallet_owner(current_user, wallet_name, db):
-        return jsonify({'message': 'Access denied'}), 403
-        
+    db = get_request_db()
     cursor = db.cursor(dictionary=True)
     
     try:
@@ -114,7 +107,6 @@ def delete_wallet(current_user, wallet_name):
         return jsonify({'message': f'Error deleting wallet: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/access', methods=['POST'])
 @token_required
@@ -124,7 +116,7 @@ def grant_wallet_access(current_user):
     if not data or not data.get('client_user') or not data.get('wallet_name'):
         return jsonify({'message': 'Missing required fields'}), 400
         
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
@@ -156,18 +148,12 @@ def grant_wallet_access(current_user):
         return jsonify({'message': f'Error granting wallet access: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/access/<client_user>/<wallet_name>', methods=['DELETE'])
 @token_required
+@wallet_access_required
 def revoke_wallet_access(current_user, client_user, wallet_name):
-    db = get_db()
-    if not db:
-        return jsonify({'message': 'Database connection error'}), 500
-        
-    if not is_wallet_owner(current_user, wallet_name, db):
-        return jsonify({'message': 'Access denied'}), 403
-        
+    db = get_request_db()
     cursor = db.cursor(dictionary=True)
     
     try:
@@ -188,12 +174,11 @@ def revoke_wallet_access(current_user, client_user, wallet_name):
         return jsonify({'message': f'Error revoking wallet access: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close()
 
 @bp.route('/list', methods=['GET'])
 @token_required
 def list_client_wallets(current_user):
-    db = get_db()
+    db = get_request_db()
     if not db:
         return jsonify({'message': 'Database connection error'}), 500
         
@@ -215,4 +200,3 @@ def list_client_wallets(current_user):
         return jsonify({'message': f'Error fetching wallets: {str(e)}'}), 500
     finally:
         cursor.close()
-        db.close() 
\ No newline at end of file
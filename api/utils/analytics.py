@@ -0,0 +1,150 @@
+import math
+import numpy as np
+from api.utils.pnl_rollup import PROFIT_SQL
+
+SECONDS_PER_DAY = 86400
+# crypto markets trade every day of the year
+PERIODS_PER_YEAR = 365
+
+def load_closed_trades(cursor, bot_id, source='cex_market'):
+    """Fetch a bot's closed trades as columnar arrays (buy time, sell time, profit) ordered by sell date"""
+    # casting in SQL hands floats to numpy instead of one Decimal per value
+    cursor.execute(f'''
+        SELECT
+            CAST(UNIX_TIMESTAMP(cm.buy_date) AS DOUBLE),
+            CAST(UNIX_TIMESTAMP(cm.sell_date) AS DOUBLE),
+            CAST({PROFIT_SQL} AS DOUBLE)
+        FROM {source} cm
+        WHERE cm.bot_id = %s
+        AND cm.sell_date IS NOT NULL
+        ORDER BY cm.sell_date, cm.position_id
+    ''', (bot_id,))
+    trades = np.array(cursor.fetchall(), dtype=np.float64).reshape(-1, 3)
+    trades = trades[~np.isnan(trades).any(axis=1)]
+    return trades[:, 0], trades[:, 1], trades[:, 2]
+
+def _number(value):
+    # numpy scalars and non-finite values are not valid JSON
+    value = float(value)
+    return value if math.isfinite(value) else None
+
+def max_drawdown(profit, capital=0.0):
+    """Largest peak-to-trough drop of the equity curve, in USDC and relative to the peak"""
+    equity = capital + np.concatenate(([0.0], np.cumsum(profit)))
+    peak = np.maximum.accumulate(equity)
+    drawdown = peak - equity
+    amount = drawdown.max()
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        relative = np.where(peak > 0, drawdown / peak, 0.0)
+    percentage = _number(relative.max() * 100) if (peak > 0).any() else None
+    return _number(amount), percentage
+
+def daily_returns(sell_ts, profit, capital=0.0):
+    """Per-day returns including flat days; PnL itself when no starting capital is known"""
+    days = (sell_ts // SECONDS_PER_DAY).astype(np.int64)
+    daily_pnl = np.bincount(days - days.min(), weights=profit)
+    if capital <= 0:
+        # Sharpe/Sortino are scale-free, so daily PnL stands in for returns
+        return daily_pnl
+
+    start_equity = capital + np.concatenate(([0.0], np.cumsum(daily_pnl)[:-1]))
+    valid = start_equity > 0
+    return daily_pnl[valid] / start_equity[valid]
+
+def sharpe_ratio(returns):
+    if returns.size < 2:
+        return None
+    std = returns.std(ddof=1)
+    if std == 0:
+        return None
+    return _number(returns.mean() / std * math.sqrt(PERIODS_PER_YEAR))
+
+def sortino_ratio(returns):
+    if returns.size < 2:
+        return None
+    downside = np.sqrt(np.mean(np.minimum(returns, 0.0) ** 2))
+    if downside == 0:
+        return None
+    return _number(returns.mean() / downside * math.sqrt(PERIODS_PER_YEAR))
+
+def rolling_win_rate(profit, window):
+    """Win rate over each run of `window` consecutive trades"""
+    if profit.size < window:
+        return np.empty(0)
+    wins = np.concatenate(([0], np.cumsum(profit > 0)))
+    return (wins[window:] - wins[:-window]) / window * 100
+
+def risk_metrics(buy_ts, sell_ts, profit, capital=0.0, window=20):
+    """Compute drawdown, risk-adjusted returns and trade statistics of closed trades"""
+    count = int(profit.size)
+    if count == 0:
+        return {
+            'trades': 0,
+            'max_drawdown': {'amount': 0, 'percentage': None},
+            'sharpe_ratio': None,
+            'sortino_ratio': None,
+            'profit_factor': None,
+            'expectancy': None,
+            'average_win': None,
+            'average_loss': None,
+            'average_holding_seconds': None,
+            'rolling_win_rate': {'window': window, 'current': None, 'min': None, 'max': None}
+        }
+
+    wins = profit[profit > 0]
+    losses = profit[profit < 0]
+    gross_loss = -losses.sum()
+
+    drawdown_amount, drawdown_percentage = max_drawdown(profit, capital)
+    returns = daily_returns(sell_ts, profit, capital)
+    rolling = rolling_win_rate(profit, window)
+
+    return {
+        'trades': count,
+        'max_drawdown': {
+            'amount': drawdown_amount,
+            'percentage': drawdown_percentage
+        },
+        'sharpe_ratio': sharpe_ratio(returns),
+        'sortino_ratio': sortino_ratio(returns),
+        'profit_factor': _number(wins.sum() / gross_loss) if gross_loss > 0 else None,
+        'expectancy': _number(profit.mean()),
+        'average_win': _number(wins.mean()) if wins.size else None,
+        'average_loss': _number(losses.mean()) if losses.size else None,
+        'average_holding_seconds': _number((sell_ts - buy_ts).mean()),
+        'rolling_win_rate': {
+            'window': window,
+            'current': _number(rolling[-1]) if rolling.size else None,
+            'min': _number(rolling.min()) if rolling.size else None,
+            'max': _number(rolling.max()) if rolling.size else None
+        }
+    }
+
+def lttb(x, y, threshold):
+    """Indices of the points kept by largest-triangle-three-buckets downsampling of a series"""
+    size = x.size
+    if threshold >= size or threshold < 3:
+        return np.arange(size)
+
+    # first and last points are always kept, the points between are split into threshold - 2 buckets
+    edges = np.linspace(1, size - 1, threshold - 1).astype(np.int64)
+    counts = np.diff(edges)
+    # each bucket's average is the third corner of the triangles of the bucket before it
+    average_x = np.append(np.add.reduceat(x[:size - 1], edges[:-1]) / counts, x[-1])
+    average_y = np.append(np.add.reduceat(y[:size - 1], edges[:-1]) / counts, y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = size - 1
+    previous = 0
+    # each pick depends on the previous one, so only the work inside a bucket is vectorized
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        area = np.abs(
+            (x[previous] - average_x[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y[bucket + 1] - y[previous])
+        )
+        previous = start + int(area.argmax())
+        selected[bucket + 1] = previous
+    return selected
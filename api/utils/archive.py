@@ -0,0 +1,130 @@
+import os
+import click
+from datetime import date
+from flask import request
+from dotenv import load_dotenv
+from loguru import logger
+from api.database import get_db
+from api.utils.filters import POSITION_FIELDS
+from api.utils.pnl_rollup import record_archived
+from api.utils.versioning import bump_bot_versions
+
+load_dotenv()
+
+# closed trades sold before the start of the month this many months back leave cex_market
+ARCHIVE_AFTER_MONTHS = int(os.getenv('ARCHIVE_AFTER_MONTHS', 12))
+ARCHIVE_CHUNK_SIZE = int(os.getenv('ARCHIVE_CHUNK_SIZE', 1000))
+# the dashboard overview reads the last 30 days of trades from cex_market
+MIN_ARCHIVE_MONTHS = 2
+
+ARCHIVE_TABLES_DDL = [
+    'CREATE TABLE IF NOT EXISTS cex_market_archive LIKE cex_market',
+    'CREATE TABLE IF NOT EXISTS app_archive LIKE app'
+]
+
+# stored columns of a position, the generated activity_date is computed again by the archive table
+POSITION_COLUMNS = ', '.join(column[3:] for column in POSITION_FIELDS.values() if column.startswith('cm.'))
+APP_COLUMNS = 'position_id, buy_log, sell_log'
+
+def archived_requested():
+    """Whether the request opted into archived history with ?include_archived=true"""
+    return request.args.get('include_archived', 'false').lower() == 'true'
+
+def positions_source(include_archived):
+    """Table expression of cex_market rows, with the archived ones when asked for"""
+    if not include_archived:
+        return 'cex_market'
+    columns = f'{POSITION_COLUMNS}, activity_date'
+    return f'(SELECT {columns} FROM cex_market UNION ALL SELECT {columns} FROM cex_market_archive)'
+
+def app_source(include_archived):
+    """Table expression of app rows, with the archived ones when asked for"""
+    if not include_archived:
+        return 'app'
+    return f'(SELECT {APP_COLUMNS} FROM app UNION ALL SELECT {APP_COLUMNS} FROM app_archive)'
+
+def archive_cutoff(months, today=None):
+    """First day of the month, months before the current one"""
+    today = today or date.today()
+    month = today.year * 12 + today.month - 1 - months
+    return date(month // 12, month % 12 + 1, 1)
+
+def archive_chunk(cursor, bot_id, cutoff, chunk_size):
+    """Move up to chunk_size closed trades of a bot sold before cutoff to the archive, return how many moved"""
+    # (bot_id, sell_date) is indexed, each chunk reads only the rows it moves
+    cursor.execute('''
+        SELECT position_id
+        FROM cex_market
+        WHERE bot_id = %s
+        AND sell_date < %s
+        ORDER BY sell_date, position_id
+        LIMIT %s
+        FOR UPDATE
+    ''', (bot_id, cutoff, chunk_size))
+    position_ids = [row['position_id'] for row in cursor.fetchall()]
+    if not position_ids:
+        return 0
+
+    # the rollup keeps counting them, apart so the default reads can leave them out
+    record_archived(cursor, position_ids)
+    placeholders = ', '.join(['%s'] * len(position_ids))
+    cursor.execute(f'''
+        INSERT INTO cex_market_archive ({POSITION_COLUMNS})
+        SELECT {POSITION_COLUMNS} FROM cex_market WHERE position_id IN ({placeholders})
+    ''', position_ids)
+    cursor.execute(f'''
+        INSERT INTO app_archive ({APP_COLUMNS})
+        SELECT {APP_COLUMNS} FROM app WHERE position_id IN ({placeholders})
+    ''', position_ids)
+    # app references cex_market, it goes first
+    cursor.execute(f'DELETE FROM app WHERE position_id IN ({placeholders})', position_ids)
+    cursor.execute(f'DELETE FROM cex_market WHERE position_id IN ({placeholders})', position_ids)
+    bump_bot_versions(cursor, [bot_id])
+    return len(position_ids)
+
+@click.command('archive-positions')
+@click.option('--months', default=ARCHIVE_AFTER_MONTHS, show_default=True, help='Archive trades closed before this many months ago.')
+@click.option('--chunk-size', default=ARCHIVE_CHUNK_SIZE, show_default=True, help='Trades moved per transaction.')
+@click.option('--bot', 'bot_name', default=None, help='Only archive the trades of this bot.')
+def archive_command(months, chunk_size, bot_name):
+    """Move old closed trades from cex_market to cex_market_archive."""
+    if months < MIN_ARCHIVE_MONTHS:
+        raise click.ClickException(f'--months must be at least {MIN_ARCHIVE_MONTHS}')
+    if chunk_size < 1:
+        raise click.ClickException('--chunk-size must be positive')
+
+    db = get_db()
+    if not db:
+        raise click.ClickException('Database connection error')
+
+    cursor = db.cursor(dictionary=True)
+
+    try:
+        if bot_name:
+            cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', (bot_name,))
+        else:
+            cursor.execute('SELECT bot_id FROM bots ORDER BY bot_id')
+        bots = cursor.fetchall()
+        if bot_name and not bots:
+            raise click.ClickException(f'Bot {bot_name} not found')
+
+        cutoff = archive_cutoff(months)
+        total = 0
+        # short transactions keep row locks brief while the bots keep trading
+        for bot in bots:
+            while True:
+                moved = archive_chunk(cursor, bot['bot_id'], cutoff, chunk_size)
+                db.commit()
+                if not moved:
+                    break
+                total += moved
+                logger.info(f"Archived {moved} trades of bot {bot['bot_id']}")
+
+        click.echo(f'Archived {total} trade(s) closed before {cutoff.isoformat()}')
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+        db.close()
@@ -6,6 +6,7 @@ from datetime import datetime, timedelta
 from dotenv import load_dotenv
 import time
 from loguru import logger
+from api.database import get_request_db
 
 load_dotenv()
 
@@ -83,8 +84,29 @@ def token_required(f):
 
     return decorated
 
-def is_wallet_owner(user, wallet_name, db):
+def wallet_access_required(f):
+    """Decorator to restrict a wallet route to users with access, must follow token_required."""
+    @wraps(f)
+    def decorated(current_user, *args, **kwargs):
+        db = get_request_db()
+        if not db:
+            return jsonify({'message': 'Database connection error'}), 500
+
+        access = wallet_access(current_user, kwargs['wallet_name'], db)
+        if access is None:
+            return jsonify({'message': 'Wallet not found'}), 404
+        if not access:
+            return jsonify({'message': 'Access denied'}), 403
+
+        return f(current_user, *args, **kwargs)
+
+    return decorated
+
+def is_wallet_owner(user, wallet_name, db=None):
     """Check if user has access to wallet."""
+    # share the request connection with the handler instead of checking out another one
+    if db is None:
+        db = get_request_db()
     cursor = db.cursor(dictionary=True)
     try:
         # check if user has access to the wallet
@@ -97,6 +119,23 @@ def is_wallet_owner(user, wallet_name, db):
     finally:
         cursor.close()
 
+def wallet_access(user, wallet_name, db=None):
+    """Whether user has access to wallet, None when the wallet does not exist."""
+    if db is None:
+        db = get_request_db()
+    cursor = db.cursor(dictionary=True)
+    try:
+        cursor.execute('''
+            SELECT wa.client_user
+            FROM wallets w
+            LEFT JOIN wallets_access wa ON wa.wallet_name = w.name AND wa.client_user = %s
+            WHERE w.name = %s
+        ''', (user, wallet_name))
+        row = cursor.fetchone()
+        return None if row is None else row['client_user'] is not None
+    finally:
+        cursor.close()
+
 def rate_limit(max_requests, window):
     """Rate limiting decorator"""
     def decorator(f):
@@ -0,0 +1,38 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# entries expire so renames done by other workers are eventually picked up
+BOT_REGISTRY_TTL = float(os.getenv('BOT_REGISTRY_TTL', 300))
+
+_bot_ids = {}
+_lock = threading.Lock()
+
+def resolve_bot_id(cursor, bot_name):
+    """Resolve a bot name to its bot_id, querying the database only on a cache miss"""
+    now = time.monotonic()
+    entry = _bot_ids.get(bot_name)
+    if entry and entry[1] > now:
+        return entry[0]
+
+    cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', (bot_name,))
+    bot = cursor.fetchone()
+    # unknown names are not cached so a bot created elsewhere resolves right away
+    if not bot:
+        return None
+
+    bot_id = bot['bot_id'] if isinstance(bot, dict) else bot[0]
+    with _lock:
+        _bot_ids[bot_name] = (bot_id, now + BOT_REGISTRY_TTL)
+    return bot_id
+
+def invalidate_bot(bot_name=None):
+    """Forget a cached bot name, or every name when none is given, after bots are created/renamed/deleted"""
+    with _lock:
+        if bot_name is None:
+            _bot_ids.clear()
+        else:
+            _bot_ids.pop(bot_name, None)
@@ -0,0 +1,17 @@
+from datetime import datetime, timedelta
+
+# fixed-length buckets are counted from this origin so that their boundaries do not move with the range
+# and hours and days line up across series
+BUCKET_ORIGIN = datetime(1970, 1, 1)
+
+def bucket_sql(column, bucket_seconds):
+    """SQL expression numbering the bucket of column, takes BUCKET_ORIGIN as its single parameter"""
+    return f'TIMESTAMPDIFF(SECOND, %s, {column}) DIV {int(bucket_seconds)}'
+
+def bucket_number(moment, bucket_seconds):
+    """Number of the bucket holding moment, as bucket_sql computes it"""
+    return int((moment - BUCKET_ORIGIN).total_seconds() // bucket_seconds)
+
+def bucket_label(key, bucket_seconds):
+    """Start of a bucket formatted for charts"""
+    return (BUCKET_ORIGIN + timedelta(seconds=int(key) * bucket_seconds)).strftime('%Y-%m-%d %H:%M')
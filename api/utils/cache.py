@@ -0,0 +1,121 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from dotenv import load_dotenv
+from loguru import logger
+from api.database import get_db
+
+load_dotenv()
+
+class ResponseCache:
+    """Size-bounded LRU cache of computed payloads keyed by (endpoint, bot_id, params)
+
+    Entries are fresh for `ttl` seconds, then served stale for up to `stale_ttl`
+    more seconds while a background thread recomputes them. Writers call
+    invalidate_bot() after committing so the next read recomputes. That only
+    reaches the writer's process, so entries also record the bot data version
+    they were built at and are recomputed when a request reads another one.
+    """
+
+    def __init__(self, maxsize=1024, ttl=30, stale_ttl=30):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+
+        self._entries = OrderedDict()
+        self._generations = {}
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._stale_hits = 0
+
+    def get_or_compute(self, endpoint, bot_id, params, compute, db, version=None):
+        """Return the cached payload or build it with compute(db)
+
+        version is the bot data version the response is labelled with (its
+        ETag), an entry built at another version is not served.
+        """
+        if self.ttl <= 0:
+            return compute(db)
+
+        key = (endpoint, bot_id, params)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry and version is not None and entry[3] != version:
+                # written by another process, or before this process heard of the write
+                del self._entries[key]
+                entry = None
+            if entry:
+                payload, fresh_until, stale_until, entry_version = entry
+                if now < fresh_until:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    return payload
+                if now < stale_until:
+                    self._entries.move_to_end(key)
+                    self._stale_hits += 1
+                    if key not in self._refreshing:
+                        self._refreshing.add(key)
+                        threading.Thread(
+                            target=self._refresh, args=(key, compute, entry_version), daemon=True
+                        ).start()
+                    return payload
+            self._misses += 1
+            generation = self._generations.get(bot_id, 0)
+
+        payload = compute(db)
+        self._store(key, payload, generation, version)
+        return payload
+
+    def _refresh(self, key, compute, version):
+        generation = self._generations.get(key[1], 0)
+        # the request connection is gone by now, the refresh borrows its own
+        db = get_db()
+        try:
+            if db:
+                self._store(key, compute(db), generation, version)
+        except Exception as e:
+            logger.error(f"Error refreshing cached {key[0]} for bot {key[1]}: {e}")
+        finally:
+            if db:
+                db.close()
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _store(self, key, payload, generation, version=None):
+        now = time.monotonic()
+        with self._lock:
+            # a write committed while this payload was computed, it may already be outdated
+            if self._generations.get(key[1], 0) != generation:
+                return
+            self._entries[key] = (payload, now + self.ttl, now + self.ttl + self.stale_ttl, version)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def invalidate_bot(self, bot_id):
+        """Drop every cached payload of a bot, call after its positions or funds were written"""
+        with self._lock:
+            self._generations[bot_id] = self._generations.get(bot_id, 0) + 1
+            for key in [key for key in self._entries if key[1] == bot_id]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': len(self._entries),
+                'maxsize': self.maxsize,
+                'hits': self._hits,
+                'stale_hits': self._stale_hits,
+                'misses': self._misses
+            }
+
+dashboard_cache = ResponseCache(
+    maxsize=int(os.getenv('DASHBOARD_CACHE_SIZE', 1024)),
+    ttl=float(os.getenv('DASHBOARD_CACHE_TTL', 30)),
+    stale_ttl=float(os.getenv('DASHBOARD_CACHE_STALE_TTL', 30))
+)
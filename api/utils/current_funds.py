@@ -0,0 +1,59 @@
+CURRENT_FUNDS_TABLE_DDL = '''
+    CREATE TABLE IF NOT EXISTS funds_current (
+        bot_id INTEGER PRIMARY KEY,
+        fund_id INTEGER NOT NULL,
+        last_position_id INTEGER,
+        funds DECIMAL(24, 8) NOT NULL,
+        FOREIGN KEY (bot_id) REFERENCES bots(bot_id)
+    )
+'''
+
+# funds.funds is TEXT, strict SQL mode rejects casting anything but a number
+NUMERIC_FUNDS_PATTERN = r'^[-+]?([0-9]+[.]?[0-9]*|[.][0-9]+)([eE][-+]?[0-9]+)?$'
+
+# funds keeps every snapshot, funds_current the latest one per bot. Of two
+# concurrent snapshots the higher id wins, as MAX(id) over funds would pick;
+# assignments run left to right, fund_id is compared before it changes.
+# Columns are qualified, funds also names a column of the backfill SELECT
+_UPSERT_CURRENT = '''
+    ON DUPLICATE KEY UPDATE
+        funds_current.funds = IF(VALUES(fund_id) > funds_current.fund_id, VALUES(funds), funds_current.funds),
+        funds_current.last_position_id = IF(
+            VALUES(fund_id) > funds_current.fund_id, VALUES(last_position_id), funds_current.last_position_id
+        ),
+        funds_current.fund_id = GREATEST(funds_current.fund_id, VALUES(fund_id))
+'''
+
+def record_funds(cursor, bot_id, last_position_id, funds):
+    """Store a funds snapshot and make it the bot's current funds, return the snapshot id
+
+    Call inside the caller's transaction, the history row and the pointer are committed together.
+    """
+    # funds keeps its text form for existing readers, amount is the same value as a number
+    cursor.execute('''
+        INSERT INTO funds (bot_id, last_position_id, funds, amount, created_at)
+        VALUES (%s, %s, %s, %s, NOW())
+    ''', (bot_id, last_position_id, str(funds), funds))
+    fund_id = cursor.lastrowid
+    cursor.execute(f'''
+        INSERT INTO funds_current (bot_id, fund_id, last_position_id, funds)
+        VALUES (%s, %s, %s, %s)
+        {_UPSERT_CURRENT}
+    ''', (bot_id, fund_id, last_position_id, funds))
+    return fund_id
+
+def backfill_current_funds(cursor):
+    """Point every bot at its latest numeric funds snapshot"""
+    cursor.execute(f'''
+        INSERT INTO funds_current (bot_id, fund_id, last_position_id, funds)
+        SELECT f.bot_id, f.id, f.last_position_id, CAST(TRIM(f.funds) AS DECIMAL(24, 8))
+        FROM funds f
+        JOIN (
+            SELECT bot_id, MAX(id) as max_id
+            FROM funds
+            WHERE bot_id IS NOT NULL
+            AND TRIM(funds) REGEXP %s
+            GROUP BY bot_id
+        ) latest ON f.id = latest.max_id
+        {_UPSERT_CURRENT}
+    ''', (NUMERIC_FUNDS_PATTERN,))
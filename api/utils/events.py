@@ -0,0 +1,101 @@
+import itertools
+import json
+import os
+import queue
+import threading
+from dotenv import load_dotenv
+from loguru import logger
+
+load_dotenv()
+
+# idle streams send a comment this often so proxies keep them open and dead clients are noticed
+SSE_HEARTBEAT = float(os.getenv('SSE_HEARTBEAT', 15))
+
+class Subscription:
+    """Bounded queue of formatted server-sent events for one stream of one bot"""
+
+    def __init__(self, bot_id, queue_size):
+        self.bot_id = bot_id
+        self.dropped = False
+        self._queue = queue.Queue(maxsize=queue_size)
+
+    def get(self, timeout):
+        """Next message, None once dropped, raise queue.Empty after timeout"""
+        if self.dropped:
+            return None
+        return self._queue.get(timeout=timeout)
+
+class EventHub:
+    """In-process publish/subscribe of bot events feeding the dashboard streams
+
+    Events are serialized once per publish and shared by every subscriber.
+    A subscriber whose queue is full is dropped instead of blocking the
+    publisher, its client reconnects and reloads the dashboard. Only writes
+    handled by this process are seen.
+    """
+
+    def __init__(self, queue_size=100, max_subscribers=1000):
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+
+        self._subscribers = {}
+        self._count = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._published = 0
+        self._dropped = 0
+
+    def subscribe(self, bot_id):
+        """Register a stream for a bot, None when the subscriber limit is reached"""
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                return None
+            subscription = Subscription(bot_id, self.queue_size)
+            self._subscribers.setdefault(bot_id, set()).add(subscription)
+            self._count += 1
+            return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._remove(subscription)
+
+    def _remove(self, subscription):
+        subscribers = self._subscribers.get(subscription.bot_id)
+        if subscribers and subscription in subscribers:
+            subscribers.discard(subscription)
+            self._count -= 1
+            if not subscribers:
+                del self._subscribers[subscription.bot_id]
+
+    def publish(self, bot_id, event, data):
+        """Send an event to every stream of a bot, call after the write was committed"""
+        with self._lock:
+            subscribers = list(self._subscribers.get(bot_id, ()))
+            if not subscribers:
+                return
+            message = f'id: {next(self._ids)}\nevent: {event}\ndata: {json.dumps(data, default=str)}\n\n'
+            self._published += 1
+
+            for subscription in subscribers:
+                try:
+                    subscription._queue.put_nowait(message)
+                except queue.Full:
+                    # a slow consumer must not hold back the writer or buffer without bound
+                    subscription.dropped = True
+                    self._remove(subscription)
+                    self._dropped += 1
+                    logger.warning(f"Dropped slow event subscriber of bot {bot_id}")
+
+    def stats(self):
+        with self._lock:
+            return {
+                'subscribers': self._count,
+                'max_subscribers': self.max_subscribers,
+                'published': self._published,
+                'dropped': self._dropped
+            }
+
+event_hub = EventHub(
+    queue_size=int(os.getenv('SSE_QUEUE_SIZE', 100)),
+    max_subscribers=int(os.getenv('SSE_MAX_SUBSCRIBERS', 1000))
+)
@@ -0,0 +1,91 @@
+from datetime import datetime
+from api.utils.bot_registry import resolve_bot_id
+
+# columns a position listing can be projected to, mapped to their SQL expression
+POSITION_FIELDS = {
+    'position_id': 'cm.position_id',
+    'bot_id': 'cm.bot_id',
+    'pair': 'cm.pair',
+    'exchange': 'cm.exchange',
+    'buy_order_id': 'cm.buy_order_id',
+    'buy_price': 'cm.buy_price',
+    'buy_quantity': 'cm.buy_quantity',
+    'buy_fees': 'cm.buy_fees',
+    'buy_value_usdc': 'cm.buy_value_usdc',
+    'buy_date': 'cm.buy_date',
+    'buy_signals': 'cm.buy_signals',
+    'sell_order_id': 'cm.sell_order_id',
+    'sell_price': 'cm.sell_price',
+    'sell_quantity': 'cm.sell_quantity',
+    'sell_fees': 'cm.sell_fees',
+    'sell_value_usdc': 'cm.sell_value_usdc',
+    'sell_date': 'cm.sell_date',
+    'sell_signals': 'cm.sell_signals',
+    'ratio': 'cm.ratio',
+    'position_duration': 'cm.position_duration',
+    'fund_slot': 'cm.fund_slot',
+    'buy_log': 'a.buy_log',
+    'sell_log': 'a.sell_log'
+}
+
+def parse_bound(value):
+    """Datetime of an ISO date/time query parameter, raise ValueError when malformed"""
+    if not value:
+        return None
+    bound = datetime.fromisoformat(value)
+    # stored dates are naive local times
+    if bound.tzinfo:
+        bound = bound.astimezone().replace(tzinfo=None)
+    return bound
+
+def parse_fields(value):
+    """Field names of a comma separated fields= parameter, None for every field"""
+    if not value:
+        return None
+    fields = list(dict.fromkeys(field.strip() for field in value.split(',') if field.strip()))
+    unknown = [field for field in fields if field not in POSITION_FIELDS]
+    if unknown:
+        raise ValueError(f'Unknown fields: {", ".join(unknown)}')
+    return fields
+
+def position_filters(cursor, args):
+    """WHERE conditions and params for the position filters of a query string
+
+    Returns None when the requested bot does not exist, raises ValueError on invalid values.
+    """
+    conditions, params = [], []
+
+    if args.get('bot_name'):
+        bot_id = resolve_bot_id(cursor, args['bot_name'])
+        if not bot_id:
+            return None
+        conditions.append('cm.bot_id = %s')
+        params.append(bot_id)
+
+    status = args.get('status')
+    if status == 'open':
+        conditions.append('cm.sell_date IS NULL')
+    elif status == 'closed':
+        conditions.append('cm.sell_date IS NOT NULL')
+    elif status:
+        raise ValueError('Invalid status, expected open or closed')
+
+    for field in ('pair', 'exchange'):
+        if args.get(field):
+            conditions.append(f'cm.{field} = %s')
+            params.append(args[field])
+
+    # the date range applies to the opening date
+    try:
+        start = parse_bound(args.get('from'))
+        end = parse_bound(args.get('to'))
+    except ValueError:
+        raise ValueError('Invalid from/to date')
+    if start:
+        conditions.append('cm.buy_date >= %s')
+        params.append(start)
+    if end:
+        conditions.append('cm.buy_date < %s')
+        params.append(end)
+
+    return conditions, params
@@ -0,0 +1,102 @@
+import os
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from flask.json.provider import DefaultJSONProvider
+from dotenv import load_dotenv
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+load_dotenv()
+
+# 'string' keeps every digit of DECIMAL columns, 'float' returns plain JSON numbers
+JSON_DECIMAL = os.getenv('JSON_DECIMAL', 'string').lower()
+# 'http' keeps flask's RFC 822 dates, 'iso' returns ISO 8601
+JSON_DATETIME = os.getenv('JSON_DATETIME', 'http').lower()
+
+_WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+_MONTHS = ('Jan', 'Feb', 'Mar', 'Apr', 'May', 'Jun', 'Jul', 'Aug', 'Sep', 'Oct', 'Nov', 'Dec')
+
+def _http_datetime(value):
+    # same output as werkzeug's http_date without its per-call timezone and email.utils round trip
+    if value.tzinfo:
+        value = value.astimezone(timezone.utc)
+    return (
+        f'{_WEEKDAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} {value.year:04d} '
+        f'{value.hour:02d}:{value.minute:02d}:{value.second:02d} GMT'
+    )
+
+def _http_date(value):
+    return f'{_WEEKDAYS[value.weekday()]}, {value.day:02d} {_MONTHS[value.month - 1]} {value.year:04d} 00:00:00 GMT'
+
+def _isoformat(value):
+    return value.isoformat()
+
+def make_default(decimal_policy=JSON_DECIMAL, datetime_policy=JSON_DATETIME):
+    """Build the fallback serializer for values json/orjson do not handle natively"""
+    convert_decimal = float if decimal_policy == 'float' else str
+    http = datetime_policy == 'http'
+    # cursor rows hold exact Decimal/datetime/date instances, a type lookup beats an isinstance chain
+    converters = {
+        Decimal: convert_decimal,
+        datetime: _http_datetime if http else _isoformat,
+        date: _http_date if http else _isoformat
+    }
+
+    def default(value):
+        converter = converters.get(type(value))
+        if converter:
+            return converter(value)
+        # analytics hand back numpy scalars, item() gives the matching int, float or bool
+        if numpy is not None and isinstance(value, numpy.generic):
+            return value.item()
+        return DefaultJSONProvider.default(value)
+
+    return default
+
+class FastJSONProvider(DefaultJSONProvider):
+    """JSON provider serializing cursor rows through orjson when installed, the standard json module otherwise"""
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.default = make_default(JSON_DECIMAL, JSON_DATETIME)
+
+    def _orjson_options(self):
+        options = orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            options |= orjson.OPT_SORT_KEYS
+        if JSON_DATETIME == 'http':
+            # orjson writes ISO dates itself, http dates go through default
+            options |= orjson.OPT_PASSTHROUGH_DATETIME
+        return options
+
+    def dumps(self, obj, **kwargs):
+        if orjson is None or kwargs:
+            return super().dumps(obj, **kwargs)
+        return orjson.dumps(obj, default=self.default, option=self._orjson_options()).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        if orjson is None or kwargs:
+            return super().loads(s, **kwargs)
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        if orjson is None:
+            return super().response(*args, **kwargs)
+
+        obj = self._prepare_response_obj(args, kwargs)
+        options = self._orjson_options()
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            options |= orjson.OPT_INDENT_2
+
+        # the body stays bytes, no intermediate str
+        return self._app.response_class(
+            orjson.dumps(obj, default=self.default, option=options) + b'\n', mimetype=self.mimetype
+        )
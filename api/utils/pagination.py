@@ -0,0 +1,29 @@
+import base64
+import json
+from datetime import datetime
+
+def encode_cursor(sort_value, position_id, direction='next'):
+    """Build an opaque page token from the sort key and position_id of a boundary row"""
+    if isinstance(sort_value, datetime):
+        sort_value = sort_value.isoformat()
+    payload = json.dumps([sort_value, position_id, direction], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Return (sort_value, position_id, direction) from a page token, raise ValueError when malformed"""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        sort_value, position_id, direction = json.loads(base64.urlsafe_b64decode(padded))
+        if direction not in ('next', 'prev'):
+            raise ValueError(direction)
+        if sort_value is not None:
+            sort_value = datetime.fromisoformat(sort_value)
+        return sort_value, int(position_id), direction
+    except (TypeError, ValueError, UnicodeDecodeError) as e:
+        raise ValueError(f'Invalid cursor: {token}') from e
+
+def keyset_condition(sort_column, id_column, sort_value, position_id, direction):
+    """SQL condition and params selecting the rows after (next) or before (prev) a cursor on a DESC ordering"""
+    operator = '<' if direction == 'next' else '>'
+    condition = f'({sort_column} {operator} %s OR ({sort_column} = %s AND {id_column} {operator} %s))'
+    return condition, [sort_value, sort_value, position_id]
@@ -0,0 +1,186 @@
+import os
+import click
+from dotenv import load_dotenv
+from loguru import logger
+from api.database import get_db
+
+load_dotenv()
+
+# the rollup is backfilled by db-migrate, rebuild-pnl-rollup recomputes it after manual fixes
+PNL_ROLLUP_ENABLED = os.getenv('PNL_ROLLUP_ENABLED', 'true').lower() == 'true'
+
+ROLLUP_TABLE_DDL = '''
+    CREATE TABLE IF NOT EXISTS bot_daily_pnl (
+        bot_id INTEGER NOT NULL,
+        day DATE NOT NULL,
+        profit DECIMAL(24, 8) NOT NULL DEFAULT 0,
+        fees DECIMAL(24, 8) NOT NULL DEFAULT 0,
+        trades INTEGER NOT NULL DEFAULT 0,
+        wins INTEGER NOT NULL DEFAULT 0,
+        archived_profit DECIMAL(24, 8) NOT NULL DEFAULT 0,
+        archived_fees DECIMAL(24, 8) NOT NULL DEFAULT 0,
+        archived_trades INTEGER NOT NULL DEFAULT 0,
+        archived_wins INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (bot_id, day),
+        FOREIGN KEY (bot_id) REFERENCES bots(bot_id)
+    )
+'''
+
+PROFIT_SQL = 'cm.sell_value_usdc - cm.buy_value_usdc - COALESCE(cm.buy_fees, 0) - COALESCE(cm.sell_fees, 0)'
+FEES_SQL = 'COALESCE(cm.buy_fees, 0) + COALESCE(cm.sell_fees, 0)'
+
+# rollup rows count every trade of their day, the archived_ columns the part moved to cex_market_archive
+def rollup_column(column, include_archived):
+    """Expression of a bot_daily_pnl r column, without the archived trades unless asked for"""
+    if include_archived:
+        return f'r.{column}'
+    return f'(r.{column} - r.archived_{column})'
+
+def _add_closed_trades(cursor, position_ids, sign):
+    placeholders = ', '.join(['%s'] * len(position_ids))
+    cursor.execute(f'''
+        INSERT INTO bot_daily_pnl (bot_id, day, profit, fees, trades, wins)
+        SELECT
+            cm.bot_id,
+            DATE(cm.sell_date),
+            %s * SUM({PROFIT_SQL}),
+            %s * SUM({FEES_SQL}),
+            %s * COUNT(*),
+            %s * SUM(({PROFIT_SQL}) > 0)
+        FROM cex_market cm
+        WHERE cm.position_id IN ({placeholders})
+        AND cm.sell_date IS NOT NULL
+        GROUP BY cm.bot_id, DATE(cm.sell_date)
+        ON DUPLICATE KEY UPDATE
+            profit = profit + VALUES(profit),
+            fees = fees + VALUES(fees),
+            trades = trades + VALUES(trades),
+            wins = wins + VALUES(wins)
+    ''', (sign, sign, sign, sign, *position_ids))
+
+def record_sells(cursor, position_ids):
+    """Add freshly closed positions to the rollup, call in the same transaction as the sell update"""
+    if position_ids:
+        _add_closed_trades(cursor, position_ids, 1)
+
+def retract_sells(cursor, position_ids):
+    """Remove already closed positions from the rollup before their sell data is overwritten"""
+    if position_ids:
+        _add_closed_trades(cursor, position_ids, -1)
+
+def record_archived(cursor, position_ids):
+    """Mark closed positions as archived in the rollup, call before they leave cex_market"""
+    if not position_ids:
+        return
+    placeholders = ', '.join(['%s'] * len(position_ids))
+    cursor.execute(f'''
+        UPDATE bot_daily_pnl r
+        JOIN (
+            SELECT
+                cm.bot_id,
+                DATE(cm.sell_date) as day,
+                SUM({PROFIT_SQL}) as profit,
+                SUM({FEES_SQL}) as fees,
+                COUNT(*) as trades,
+                SUM(({PROFIT_SQL}) > 0) as wins
+            FROM cex_market cm
+            WHERE cm.position_id IN ({placeholders})
+            AND cm.sell_date IS NOT NULL
+            GROUP BY cm.bot_id, DATE(cm.sell_date)
+        ) moved ON moved.bot_id = r.bot_id AND moved.day = r.day
+        SET
+            r.archived_profit = r.archived_profit + moved.profit,
+            r.archived_fees = r.archived_fees + moved.fees,
+            r.archived_trades = r.archived_trades + moved.trades,
+            r.archived_wins = r.archived_wins + moved.wins
+    ''', position_ids)
+
+def rebuild(cursor, bot_id, include_archive=False):
+    """Recompute every rollup row of a bot from its closed trades, the archived ones too with include_archive"""
+    cursor.execute('DELETE FROM bot_daily_pnl WHERE bot_id = %s', (bot_id,))
+    cursor.execute(f'''
+        INSERT INTO bot_daily_pnl (bot_id, day, profit, fees, trades, wins)
+        SELECT
+            cm.bot_id,
+            DATE(cm.sell_date),
+            SUM({PROFIT_SQL}),
+            SUM({FEES_SQL}),
+            COUNT(*),
+            SUM(({PROFIT_SQL}) > 0)
+        FROM cex_market cm
+        WHERE cm.bot_id = %s
+        AND cm.sell_date IS NOT NULL
+        GROUP BY cm.bot_id, DATE(cm.sell_date)
+    ''', (bot_id,))
+    if not include_archive:
+        return
+    # archived trades count in both the totals and the archived_ columns of their day.
+    # Columns are qualified, the SELECT has columns of the same names
+    cursor.execute(f'''
+        INSERT INTO bot_daily_pnl (
+            bot_id, day, profit, fees, trades, wins,
+            archived_profit, archived_fees, archived_trades, archived_wins
+        )
+        SELECT bot_id, day, profit, fees, trades, wins, profit, fees, trades, wins
+        FROM (
+            SELECT
+                cm.bot_id,
+                DATE(cm.sell_date) as day,
+                SUM({PROFIT_SQL}) as profit,
+                SUM({FEES_SQL}) as fees,
+                COUNT(*) as trades,
+                SUM(({PROFIT_SQL}) > 0) as wins
+            FROM cex_market_archive cm
+            WHERE cm.bot_id = %s
+            AND cm.sell_date IS NOT NULL
+            GROUP BY cm.bot_id, DATE(cm.sell_date)
+        ) archived
+        ON DUPLICATE KEY UPDATE
+            bot_daily_pnl.profit = bot_daily_pnl.profit + VALUES(archived_profit),
+            bot_daily_pnl.fees = bot_daily_pnl.fees + VALUES(archived_fees),
+            bot_daily_pnl.trades = bot_daily_pnl.trades + VALUES(archived_trades),
+            bot_daily_pnl.wins = bot_daily_pnl.wins + VALUES(archived_wins),
+            bot_daily_pnl.archived_profit = VALUES(archived_profit),
+            bot_daily_pnl.archived_fees = VALUES(archived_fees),
+            bot_daily_pnl.archived_trades = VALUES(archived_trades),
+            bot_daily_pnl.archived_wins = VALUES(archived_wins)
+    ''', (bot_id,))
+
+@click.command('rebuild-pnl-rollup')
+@click.option('--bot', 'bot_name', default=None, help='Only rebuild the rollup of this bot.')
+def rebuild_command(bot_name):
+    """Backfill the daily PnL rollup from cex_market."""
+    db = get_db()
+    if not db:
+        raise click.ClickException('Database connection error')
+
+    cursor = db.cursor(dictionary=True)
+
+    try:
+        cursor.execute(ROLLUP_TABLE_DDL)
+        # archived trades stay in the rollup, they are read back from the archive
+        cursor.execute("SHOW TABLES LIKE 'cex_market_archive'")
+        include_archive = bool(cursor.fetchall())
+
+        if bot_name:
+            cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', (bot_name,))
+        else:
+            cursor.execute('SELECT bot_id FROM bots ORDER BY bot_id')
+        bots = cursor.fetchall()
+        if bot_name and not bots:
+            raise click.ClickException(f'Bot {bot_name} not found')
+
+        # one transaction per bot keeps lock time short on large histories
+        for bot in bots:
+            rebuild(cursor, bot['bot_id'], include_archive)
+            db.commit()
+            logger.info(f"Rebuilt daily PnL rollup for bot {bot['bot_id']}")
+
+        click.echo(f'Rebuilt daily PnL rollup for {len(bots)} bot(s)')
+
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        cursor.close()
+        db.close()
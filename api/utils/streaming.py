@@ -0,0 +1,105 @@
+import csv
+import io
+import os
+from flask import Response, current_app, request
+from dotenv import load_dotenv
+from api.database import get_db
+
+load_dotenv()
+
+# rows held in memory at once while streaming an export
+EXPORT_FETCH_SIZE = int(os.getenv('EXPORT_FETCH_SIZE', 1000))
+
+class RowStream:
+    """Result of a query read batch by batch from an unbuffered cursor on a dedicated connection
+
+    The connection goes back to the pool once every row was read; a stream
+    abandoned half way (client gone) disconnects it instead of draining the
+    rest of the result.
+    """
+
+    def __init__(self, db, query, params, fetch_size=EXPORT_FETCH_SIZE):
+        self.fetch_size = fetch_size
+        self._db = db
+        self._exhausted = False
+        # tuple rows, unbuffered so the server sends them as they are fetched
+        self._cursor = db.cursor(buffered=False)
+        try:
+            self._cursor.execute(query, params)
+        except Exception:
+            self.close()
+            raise
+        self.columns = self._cursor.column_names
+
+    def batches(self):
+        while True:
+            rows = self._cursor.fetchmany(self.fetch_size)
+            if not rows:
+                self._exhausted = True
+                return
+            yield rows
+
+    def close(self):
+        if self._db is None:
+            return
+        db, self._db = self._db, None
+        if self._exhausted:
+            self._cursor.close()
+            db.close()
+        else:
+            db.discard()
+
+def ndjson_chunks(stream, dumps):
+    """One JSON object per line, a chunk per fetched batch"""
+    try:
+        columns = stream.columns
+        for rows in stream.batches():
+            yield ''.join(dumps(dict(zip(columns, row))) + '\n' for row in rows)
+    finally:
+        stream.close()
+
+def csv_chunks(stream):
+    """CSV with a header line, a chunk per fetched batch"""
+    try:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(stream.columns)
+        for rows in stream.batches():
+            writer.writerows(rows)
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate(0)
+        # a result without rows still gets its header
+        if buffer.tell():
+            yield buffer.getvalue()
+    finally:
+        stream.close()
+
+def json_list_chunks(stream, key, dumps):
+    """The usual {key: [rows]} document, written batch by batch as rows arrive"""
+    try:
+        columns = stream.columns
+        yield '{' + dumps(key) + ':['
+        separator = ''
+        for rows in stream.batches():
+            yield separator + ','.join(dumps(dict(zip(columns, row))) for row in rows)
+            separator = ','
+        yield ']}\n'
+    finally:
+        stream.close()
+
+def stream_requested():
+    return request.args.get('stream', 'false').lower() == 'true'
+
+def stream_json_list(query, params, key):
+    """Response streaming {key: [rows]} of a query, None without a connection, raise when the query fails"""
+    # the body is written after the request ends, it reads through a connection of its own
+    db = get_db()
+    if not db:
+        return None
+    stream = RowStream(db, query, params)
+
+    response = Response(json_list_chunks(stream, key, current_app.json.dumps), mimetype=current_app.json.mimetype)
+    # a response closed before its generator started would otherwise never hand the connection back
+    response.call_on_close(stream.close)
+    return response
@@ -0,0 +1,85 @@
+import os
+import time
+from functools import wraps
+from flask import g, request, make_response
+from dotenv import load_dotenv
+from api.database import get_request_db
+from api.utils.bot_registry import resolve_bot_id
+
+load_dotenv()
+
+# responses depending on NOW() (sliding windows, open trade durations) also change with time
+ETAG_TIME_BUCKET = int(os.getenv('ETAG_TIME_BUCKET', 60))
+
+VERSION_TABLE_DDL = '''
+    CREATE TABLE IF NOT EXISTS bot_data_versions (
+        bot_id INTEGER PRIMARY KEY,
+        version BIGINT NOT NULL DEFAULT 0,
+        FOREIGN KEY (bot_id) REFERENCES bots(bot_id)
+    )
+'''
+
+def bump_bot_versions(cursor, bot_ids):
+    """Increment the data version of bots, call in the same transaction as the cex_market/funds write"""
+    bot_ids = sorted(set(bot_ids))
+    if not bot_ids:
+        return
+    # sorted ids keep concurrent multi-bot writers from locking version rows in opposite orders
+    placeholders = ', '.join(['(%s, 1)'] * len(bot_ids))
+    cursor.execute(f'''
+        INSERT INTO bot_data_versions (bot_id, version)
+        VALUES {placeholders}
+        ON DUPLICATE KEY UPDATE version = version + 1
+    ''', bot_ids)
+
+def get_bot_version(cursor, bot_id):
+    cursor.execute('SELECT version FROM bot_data_versions WHERE bot_id = %s', (bot_id,))
+    row = cursor.fetchone()
+    return row['version'] if row else 0
+
+def request_bot_version(bot_id):
+    """Data version the ETag of the current request was built from, None outside etag_by_bot_version"""
+    versions = g.get('bot_versions')
+    return versions.get(bot_id) if versions else None
+
+def etag_by_bot_version(time_dependent=False):
+    """Decorator answering 304 when the bot's data version matches If-None-Match, must follow token_required.
+
+    The wrapped view is only run, and its JSON only serialized, when the client copy is outdated.
+    """
+    def decorator(f):
+        @wraps(f)
+        def decorated(current_user, bot_name, *args, **kwargs):
+            db = get_request_db()
+            if not db:
+                return f(current_user, bot_name, *args, **kwargs)
+
+            cursor = db.cursor(dictionary=True)
+            try:
+                bot_id = resolve_bot_id(cursor, bot_name)
+                version = get_bot_version(cursor, bot_id) if bot_id else None
+            finally:
+                cursor.close()
+
+            # unknown bots fall through so the view reports them as usual
+            if version is None:
+                return f(current_user, bot_name, *args, **kwargs)
+            # cached payloads are only served when they were built at this version, see request_bot_version
+            g.setdefault('bot_versions', {})[bot_id] = version
+
+            etag = f'{bot_id}-{version}'
+            if time_dependent:
+                etag += f'-{int(time.time() // ETAG_TIME_BUCKET)}'
+
+            if request.if_none_match.contains_weak(etag):
+                response = make_response('', 304)
+                response.set_etag(etag, weak=True)
+                return response
+
+            response = make_response(f(current_user, bot_name, *args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag, weak=True)
+            return response
+
+        return decorated
+    return decorator
@@ -0,0 +1,174 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dotenv import load_dotenv
+from loguru import logger
+from api.database import get_db
+
+load_dotenv()
+
+# position writes are queued and committed in groups instead of one transaction per request
+POSITION_WRITE_BEHIND = os.getenv('POSITION_WRITE_BEHIND', 'false').lower() == 'true'
+# how long the first write of a group may wait for others to join it
+WRITE_BEHIND_MAX_DELAY = float(os.getenv('WRITE_BEHIND_MAX_DELAY_MS', 5)) / 1000
+WRITE_BEHIND_MAX_BATCH = int(os.getenv('WRITE_BEHIND_MAX_BATCH', 500))
+WRITE_BEHIND_QUEUE_SIZE = int(os.getenv('WRITE_BEHIND_QUEUE_SIZE', 10000))
+# how long a request waits for its group to commit
+WRITE_BEHIND_TIMEOUT = float(os.getenv('WRITE_BEHIND_TIMEOUT', 10))
+
+class WriteCancelled(Exception):
+    """A write was still queued when its wait ran out, it was dropped and never applied"""
+
+class WritePending(Exception):
+    """A write outlived its wait while its group was committing, it is still applied"""
+
+class GroupCommitWriter:
+    """Background writer committing many queued writes in one transaction
+
+    handlers maps a kind of write to flush(cursor, items), which applies a
+    list of items and returns one result per item. submit() returns a Future
+    resolved with that result once the transaction holding it has committed,
+    wait() gives up on it. When a group fails, its writes are retried one transaction each so that a
+    single bad write does not fail the others.
+    """
+
+    def __init__(self, handlers, max_batch=500, max_delay=0.005, queue_size=10000):
+        self.handlers = handlers
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.queue_size = queue_size
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._writes = 0
+        self._retries = 0
+
+    def submit(self, kind, item):
+        """Queue a write and return its Future, raise queue.Full when the queue is saturated"""
+        self._ensure_started()
+        future = Future()
+        self._queue.put_nowait((kind, item, future))
+        return future
+
+    def wait(self, future, timeout):
+        """Result of a submitted write, cancelled if it is still queued after timeout seconds
+
+        Raises WriteCancelled when the write was dropped, it can be submitted
+        again. Raises WritePending when its group was already being written,
+        it will still be committed.
+        """
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeoutError:
+            if future.cancel():
+                raise WriteCancelled() from None
+            raise WritePending() from None
+
+    def _ensure_started(self):
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                # threads do not survive a fork, every worker process runs its own writer
+                self._queue = queue.Queue(maxsize=self.queue_size)
+                self._thread = threading.Thread(target=self._run, name='group-commit-writer', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _collect(self):
+        # cancelled writes are dropped, the kept ones are running and can no longer be cancelled
+        batch = []
+        while not batch:
+            batch = [entry for entry in self._take() if entry[2].set_running_or_notify_cancel()]
+        return batch
+
+    def _take(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            try:
+                self._flush(batch)
+            except Exception as e:
+                # the writer must outlive any failure, waiting requests get the error
+                logger.error(f"Error flushing {len(batch)} queued writes: {e}")
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+    def _flush(self, batch):
+        db = get_db()
+        if not db:
+            raise RuntimeError('Database connection error')
+
+        try:
+            try:
+                results = self._write(db, batch)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                if len(batch) == 1:
+                    raise
+                logger.warning(f"Group commit of {len(batch)} writes failed, retrying them one by one: {e}")
+                self._retry(db, batch)
+                return
+
+            with self._lock:
+                self._batches += 1
+                self._writes += len(batch)
+            for (_, _, future), result in zip(batch, results):
+                future.set_result(result)
+        finally:
+            db.close()
+
+    def _retry(self, db, batch):
+        for entry in batch:
+            try:
+                result = self._write(db, [entry])[0]
+                db.commit()
+                entry[2].set_result(result)
+            except Exception as e:
+                db.rollback()
+                entry[2].set_exception(e)
+        with self._lock:
+            self._retries += 1
+
+    def _write(self, db, batch):
+        # writes are grouped by kind in handler order, results come back in batch order
+        cursor = db.cursor(dictionary=True)
+        try:
+            results = [None] * len(batch)
+            for kind, flush in self.handlers.items():
+                indexes = [index for index, entry in enumerate(batch) if entry[0] == kind]
+                if indexes:
+                    for index, result in zip(indexes, flush(cursor, [batch[index][1] for index in indexes])):
+                        results[index] = result
+            return results
+        finally:
+            cursor.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize(),
+                'batches': self._batches,
+                'writes': self._writes,
+                'retried_batches': self._retries,
+                'average_batch': round(self._writes / self._batches, 2) if self._batches else 0
+            }
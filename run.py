@@ -2,6 +2,9 @@ import os
 from flask import Flask, redirect, send_from_directory
 from api.routes import auth, positions, funds, wallets, dashboard, health
 from api.docs import bp as docs_bp
+from api import database, migrations
+from api.utils import pnl_rollup, archive
+from api.utils.json_provider import FastJSONProvider
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -14,6 +17,14 @@ app.config['SECRET_KEY'] = os.getenv('FLASK_SECRET_KEY', 'smartswap')
 app.config['DEBUG'] = os.getenv('FLASK_DEBUG', 'False').lower() == 'true'
 app.config['MYSQL_PORT'] = int(os.getenv('MYSQL_PORT', 3306))
 
+# serialize cursor rows (Decimal, datetime) on a fast path, through orjson when installed
+app.json = FastJSONProvider(app)
+# flask-restx resources serialize with the standard json module, give them the same conversions
+app.config['RESTX_JSON'] = {'default': app.json.default}
+
+# return each request's pooled connection when the request is torn down
+database.init_app(app)
+
 # setup cors with security settings for cross-origin requests
 from flask_cors import CORS
 cors_origins = os.getenv('CORS_ORIGINS', 'http://localhost:5001,https://aegis.smartswap.com').split(',')
@@ -21,8 +32,8 @@ CORS(app,
      resources={r"/api/*": {
          "origins": cors_origins,
          "methods": ["GET", "POST", "PUT", "DELETE", "OPTIONS"],
-         "allow_headers": ["Content-Type", "Authorization"],
-         "expose_headers": ["Content-Range", "X-Content-Range"],
+         "allow_headers": ["Content-Type", "Authorization", "If-None-Match"],
+         "expose_headers": ["Content-Range", "X-Content-Range", "ETag"],
          "supports_credentials": True,
          "max_age": 600,
          "allow_private_network": False
@@ -38,6 +49,11 @@ app.register_blueprint(dashboard.bp)
 app.register_blueprint(health.bp)
 app.register_blueprint(docs_bp)
 
+# register maintenance commands (flask --app run <command>)
+app.cli.add_command(pnl_rollup.rebuild_command)
+app.cli.add_command(migrations.migrate_command)
+app.cli.add_command(archive.archive_command)
+
 # serve static assets
 @app.route('/assets/<path:filename>')
 def serve_assets(filename):
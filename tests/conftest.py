@@ -10,6 +10,7 @@ project_root = str(Path(__file__).parent.parent.absolute())
 sys.path.insert(0, project_root)
 
 from run import app
+from api.migrations import migrate
 
 @pytest.fixture(scope='session', autouse=True)
 def setup_test_env():
@@ -110,9 +111,31 @@ def setup_test_env():
             pair VARCHAR(20),
             buy_signals TEXT,
             sell_signals TEXT,
-            bot_name VARCHAR(50),
+            bot_id INTEGER,
             fund_slot INTEGER DEFAULT 0,
-            FOREIGN KEY (bot_name) REFERENCES bots(bot_name)
+            activity_date TIMESTAMP AS (COALESCE(sell_date, buy_date)) STORED,
+            FOREIGN KEY (bot_id) REFERENCES bots(bot_id)
+        );
+        """)
+        
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bot_daily_pnl (
+            bot_id INTEGER NOT NULL,
+            day DATE NOT NULL,
+            profit DECIMAL(24, 8) NOT NULL DEFAULT 0,
+            fees DECIMAL(24, 8) NOT NULL DEFAULT 0,
+            trades INTEGER NOT NULL DEFAULT 0,
+            wins INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (bot_id, day),
+            FOREIGN KEY (bot_id) REFERENCES bots(bot_id)
+        );
+        """)
+        
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS bot_data_versions (
+            bot_id INTEGER PRIMARY KEY,
+            version BIGINT NOT NULL DEFAULT 0,
+            FOREIGN KEY (bot_id) REFERENCES bots(bot_id)
         );
         """)
         
@@ -125,8 +148,32 @@ def setup_test_env():
         );
         """)
         
+        cursor.execute("""
+        CREATE TABLE IF NOT EXISTS connection_logs (
+            id INTEGER PRIMARY KEY AUTO_INCREMENT,
+            user CHAR(100),
+            ip_address VARCHAR(45),
+            user_agent TEXT,
+            browser VARCHAR(50),
+            browser_version VARCHAR(50),
+            os VARCHAR(50),
+            os_version VARCHAR(50),
+            device_type VARCHAR(50),
+            language VARCHAR(20),
+            is_mobile BOOLEAN,
+            is_tablet BOOLEAN,
+            is_bot BOOLEAN,
+            referrer TEXT,
+            connection_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY (user) REFERENCES clients(user)
+        );
+        """)
+        
         conn.commit()
         
+        # indexes and tracked schema changes come from the migrations, as in production
+        migrate(conn)
+        
     except Error as e:
         print(f"Error setting up test database: {e}")
         raise e
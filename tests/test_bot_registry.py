@@ -0,0 +1,80 @@
+import pytest
+from api.utils import bot_registry
+from api.utils.bot_registry import BOT_REGISTRY_TTL, invalidate_bot, resolve_bot_id
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+class FakeCursor:
+    def __init__(self, bots, dictionary=True):
+        self.bots = bots
+        self.dictionary = dictionary
+        self.queries = 0
+        self._row = None
+
+    def execute(self, query, params):
+        self.queries += 1
+        bot_id = self.bots.get(params[0])
+        if bot_id is None:
+            self._row = None
+        else:
+            self._row = {'bot_id': bot_id} if self.dictionary else (bot_id,)
+
+    def fetchone(self):
+        return self._row
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(bot_registry, 'time', clock)
+    invalidate_bot()
+    yield clock
+    invalidate_bot()
+
+def test_names_are_cached_until_the_ttl(clock):
+    cursor = FakeCursor({'alpha': 1})
+    assert resolve_bot_id(cursor, 'alpha') == 1
+    clock.now += BOT_REGISTRY_TTL - 1
+    assert resolve_bot_id(cursor, 'alpha') == 1
+    assert cursor.queries == 1
+
+    # renamed by another worker, picked up once the entry expires
+    cursor.bots = {'alpha': 2}
+    clock.now += 1
+    assert resolve_bot_id(cursor, 'alpha') == 2
+    assert cursor.queries == 2
+
+def test_unknown_names_are_not_cached(clock):
+    cursor = FakeCursor({})
+    assert resolve_bot_id(cursor, 'beta') is None
+    cursor.bots = {'beta': 3}
+    assert resolve_bot_id(cursor, 'beta') == 3
+    assert cursor.queries == 2
+
+def test_invalidate_one_name(clock):
+    cursor = FakeCursor({'alpha': 1, 'beta': 2})
+    resolve_bot_id(cursor, 'alpha')
+    resolve_bot_id(cursor, 'beta')
+
+    invalidate_bot('alpha')
+    cursor.bots = {}
+    assert resolve_bot_id(cursor, 'alpha') is None
+    assert resolve_bot_id(cursor, 'beta') == 2
+
+def test_invalidate_every_name(clock):
+    cursor = FakeCursor({'alpha': 1, 'beta': 2})
+    resolve_bot_id(cursor, 'alpha')
+    resolve_bot_id(cursor, 'beta')
+
+    invalidate_bot()
+    cursor.bots = {}
+    assert resolve_bot_id(cursor, 'alpha') is None
+    assert resolve_bot_id(cursor, 'beta') is None
+
+def test_tuple_cursors(clock):
+    cursor = FakeCursor({'alpha': 7}, dictionary=False)
+    assert resolve_bot_id(cursor, 'alpha') == 7
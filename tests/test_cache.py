@@ -0,0 +1,121 @@
+import time
+import pytest
+from api.utils import cache
+from api.utils.cache import ResponseCache
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+class FakeDb:
+    def close(self):
+        pass
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(cache, 'time', clock)
+    # background refreshes borrow their own connection
+    monkeypatch.setattr(cache, 'get_db', FakeDb)
+    return clock
+
+def counter():
+    calls = []
+
+    def compute(db):
+        calls.append(db)
+        return len(calls)
+
+    return compute, calls
+
+def wait_for_refreshes(response_cache):
+    deadline = time.monotonic() + 5
+    while response_cache._refreshing and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert not response_cache._refreshing
+
+def test_fresh_entries_are_served(clock):
+    response_cache = ResponseCache(ttl=30, stale_ttl=30)
+    compute, calls = counter()
+    assert response_cache.get_or_compute('overview', 1, (), compute, None) == 1
+    clock.now += 29
+    assert response_cache.get_or_compute('overview', 1, (), compute, None) == 1
+    assert len(calls) == 1
+    # other params and other bots have entries of their own
+    assert response_cache.get_or_compute('overview', 1, ('weekly',), compute, None) == 2
+    assert response_cache.get_or_compute('overview', 2, (), compute, None) == 3
+    assert response_cache.stats()['hits'] == 1
+
+def test_stale_entries_are_served_while_refreshing(clock):
+    response_cache = ResponseCache(ttl=30, stale_ttl=30)
+    compute, calls = counter()
+    response_cache.get_or_compute('overview', 1, (), compute, None)
+
+    clock.now += 45
+    assert response_cache.get_or_compute('overview', 1, (), compute, None) == 1
+    wait_for_refreshes(response_cache)
+    assert len(calls) == 2
+    assert isinstance(calls[1], FakeDb)
+    assert response_cache.get_or_compute('overview', 1, (), compute, None) == 2
+    assert response_cache.stats()['stale_hits'] == 1
+
+def test_expired_entries_are_recomputed(clock):
+    response_cache = ResponseCache(ttl=30, stale_ttl=30)
+    compute, calls = counter()
+    response_cache.get_or_compute('overview', 1, (), compute, None)
+    clock.now += 61
+    assert response_cache.get_or_compute('overview', 1, (), compute, None) == 2
+    assert not response_cache._refreshing
+
+def test_invalidate_bot_evicts_its_entries(clock):
+    response_cache = ResponseCache()
+    compute, calls = counter()
+    response_cache.get_or_compute('overview', 1, (), compute, None)
+    response_cache.get_or_compute('risk', 1, (90,), compute, None)
+    response_cache.get_or_compute('overview', 2, (), compute, None)
+
+    response_cache.invalidate_bot(1)
+    assert response_cache.stats()['size'] == 1
+    assert response_cache.get_or_compute('overview', 1, (), compute, None) == 4
+    assert response_cache.get_or_compute('overview', 2, (), compute, None) == 3
+
+def test_payload_computed_across_a_write_is_not_stored(clock):
+    response_cache = ResponseCache()
+
+    def compute(db):
+        # a write commits while the payload is being built
+        response_cache.invalidate_bot(1)
+        return 'outdated'
+
+    assert response_cache.get_or_compute('overview', 1, (), compute, None) == 'outdated'
+    assert response_cache.stats()['size'] == 0
+
+def test_entries_of_another_version_are_recomputed(clock):
+    response_cache = ResponseCache()
+    compute, calls = counter()
+    assert response_cache.get_or_compute('overview', 1, (), compute, None, version=3) == 1
+    assert response_cache.get_or_compute('overview', 1, (), compute, None, version=3) == 1
+    # written by another process, this one never saw the invalidation
+    assert response_cache.get_or_compute('overview', 1, (), compute, None, version=4) == 2
+    assert response_cache.get_or_compute('overview', 1, (), compute, None, version=4) == 2
+
+def test_least_recently_used_entries_are_evicted(clock):
+    response_cache = ResponseCache(maxsize=2)
+    compute, calls = counter()
+    response_cache.get_or_compute('overview', 1, (), compute, None)
+    response_cache.get_or_compute('overview', 2, (), compute, None)
+    response_cache.get_or_compute('overview', 1, (), compute, None)
+    response_cache.get_or_compute('overview', 3, (), compute, None)
+
+    assert response_cache.get_or_compute('overview', 1, (), compute, None) == 1
+    assert response_cache.get_or_compute('overview', 2, (), compute, None) == 4
+
+def test_disabled_cache_always_computes(clock):
+    response_cache = ResponseCache(ttl=0)
+    compute, calls = counter()
+    response_cache.get_or_compute('overview', 1, (), compute, None)
+    response_cache.get_or_compute('overview', 1, (), compute, None)
+    assert len(calls) == 2
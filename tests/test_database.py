@@ -0,0 +1,133 @@
+import pytest
+from mysql.connector import Error
+from mysql.connector.errors import PoolError
+from api import database
+from api.database import ConnectionPool
+
+class FakeConnection:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = False
+        self.unread_result = False
+        self.in_transaction = False
+        self.rollbacks = 0
+
+    def ping(self, reconnect=False):
+        if not self.alive:
+            raise Error('Lost connection to MySQL server')
+
+    def rollback(self):
+        self.rollbacks += 1
+        self.in_transaction = False
+
+    def close(self):
+        self.closed = True
+
+@pytest.fixture
+def opened(monkeypatch):
+    # every connection the pool opens, in order
+    connections = []
+
+    def connect(**params):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    monkeypatch.setattr(database, 'connect', connect)
+    return connections
+
+def test_released_connections_are_reused(opened):
+    pool = ConnectionPool({}, pool_size=2, max_overflow=0)
+    first = pool.acquire()
+    assert pool.stats()['in_use'] == 1
+    first.close()
+    # closing twice must not return the connection twice
+    first.close()
+    assert pool.stats()['idle'] == 1
+
+    second = pool.acquire()
+    assert second._connection is opened[0]
+    assert len(opened) == 1
+    second.close()
+    assert pool.stats()['opened'] == 1
+
+def test_open_transactions_are_rolled_back_on_release(opened):
+    pool = ConnectionPool({}, pool_size=1, max_overflow=0)
+    connection = pool.acquire()
+    opened[0].in_transaction = True
+    connection.close()
+    assert opened[0].rollbacks == 1
+    assert pool.stats()['idle'] == 1
+
+def test_overflow_connections_are_closed_on_release(opened):
+    pool = ConnectionPool({}, pool_size=1, max_overflow=1)
+    first, second = pool.acquire(), pool.acquire()
+    first.close()
+    second.close()
+    assert not opened[0].closed
+    assert opened[1].closed
+    stats = pool.stats()
+    assert (stats['opened'], stats['idle'], stats['in_use']) == (1, 1, 0)
+
+def test_checkout_times_out_when_exhausted(opened):
+    pool = ConnectionPool({}, pool_size=1, max_overflow=0, checkout_timeout=0.05)
+    connection = pool.acquire()
+    with pytest.raises(PoolError):
+        pool.acquire()
+    assert pool.stats()['waits'] == 1
+    connection.close()
+    pool.acquire().close()
+
+def test_discarded_connections_are_closed_and_replaced(opened):
+    pool = ConnectionPool({}, pool_size=1, max_overflow=0)
+    connection = pool.acquire()
+    connection.discard()
+    assert opened[0].closed
+    assert pool.stats()['opened'] == 0
+    assert pool.stats()['in_use'] == 0
+
+    pool.acquire().close()
+    assert len(opened) == 2
+
+def test_idle_connection_failing_ping_is_replaced(opened):
+    pool = ConnectionPool({}, pool_size=1, max_overflow=0, validate_after=0)
+    pool.acquire().close()
+    opened[0].alive = False
+
+    connection = pool.acquire()
+    assert opened[0].closed
+    assert connection._connection is opened[1]
+    assert pool.stats()['validations'] == 1
+    assert pool.stats()['opened'] == 1
+
+def test_recently_used_connections_are_not_pinged(opened):
+    pool = ConnectionPool({}, pool_size=1, max_overflow=0, validate_after=30)
+    pool.acquire().close()
+    opened[0].alive = False
+    assert pool.acquire()._connection is opened[0]
+    assert pool.stats()['validations'] == 0
+
+def test_failed_connect_frees_its_slot(monkeypatch):
+    def connect(**params):
+        raise Error('Access denied')
+
+    monkeypatch.setattr(database, 'connect', connect)
+    pool = ConnectionPool({}, pool_size=1, max_overflow=0, checkout_timeout=0.05)
+    for _ in range(2):
+        with pytest.raises(Error):
+            pool.acquire()
+    assert pool.stats()['opened'] == 0
+    assert pool.stats()['in_use'] == 0
+
+def test_pool_is_rebuilt_after_fork(monkeypatch):
+    monkeypatch.setattr(database, '_pool', None)
+    monkeypatch.setattr(database, '_pool_lock', database._pool_lock)
+    pool = database.get_pool()
+    assert database.get_pool() is pool
+
+    database._reset_pool_after_fork()
+    child_pool = database.get_pool()
+    assert child_pool is not pool
+
+    # a pool created by another process is never used
+    child_pool.pid = -1
+    assert database.get_pool() is not child_pool
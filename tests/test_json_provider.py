@@ -0,0 +1,62 @@
+import json
+import numpy as np
+import pytest
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+from api.utils import json_provider
+from api.utils.json_provider import FastJSONProvider, make_default
+
+ROW = {
+    'amount': Decimal('1234.56789012'),
+    'negative': Decimal('-0.00000001'),
+    'sold_at': datetime(2024, 3, 9, 7, 5, 3),
+    'opened_at': datetime(2024, 3, 9, 7, 5, 3, tzinfo=timezone(timedelta(hours=2))),
+    'day': date(2024, 12, 31),
+    'pair': 'BTC/USDC',
+    'count': 3,
+    'missing': None
+}
+
+@pytest.fixture(params=['orjson', 'json'])
+def flask_app(request, monkeypatch):
+    # every test runs through orjson when installed and through the standard json module
+    if request.param == 'json':
+        monkeypatch.setattr(json_provider, 'orjson', None)
+    elif json_provider.orjson is None:
+        pytest.skip('orjson is not installed')
+    return Flask(__name__)
+
+def test_default_policies_match_flask(flask_app):
+    fast = FastJSONProvider(flask_app)
+    default = DefaultJSONProvider(flask_app)
+    assert json.loads(fast.dumps(ROW)) == json.loads(default.dumps(ROW))
+    with flask_app.app_context():
+        assert json.loads(fast.response(ROW).get_data()) == json.loads(default.response(ROW).get_data())
+
+def test_decimal_policy(flask_app, monkeypatch):
+    monkeypatch.setattr(json_provider, 'JSON_DECIMAL', 'float')
+    assert json.loads(FastJSONProvider(flask_app).dumps(ROW))['amount'] == 1234.56789012
+    assert json.dumps(Decimal('0.1'), default=make_default('string')) == '"0.1"'
+    assert json.dumps(Decimal('0.1'), default=make_default('float')) == '0.1'
+
+def test_datetime_policy(flask_app, monkeypatch):
+    monkeypatch.setattr(json_provider, 'JSON_DATETIME', 'iso')
+    data = json.loads(FastJSONProvider(flask_app).dumps(ROW))
+    assert data['sold_at'] == '2024-03-09T07:05:03'
+    assert data['opened_at'] == '2024-03-09T07:05:03+02:00'
+    assert data['day'] == '2024-12-31'
+
+    default = make_default(datetime_policy='http')
+    assert default(ROW['opened_at']) == 'Sat, 09 Mar 2024 05:05:03 GMT'
+    assert default(ROW['day']) == 'Tue, 31 Dec 2024 00:00:00 GMT'
+
+def test_numpy_scalars(flask_app):
+    values = {'trades': np.int64(12), 'sharpe': np.float64(1.25), 'positive': np.bool_(True)}
+    assert json.loads(FastJSONProvider(flask_app).dumps(values)) == {'trades': 12, 'sharpe': 1.25, 'positive': True}
+    assert json.dumps(values, default=make_default()) == '{"trades": 12, "sharpe": 1.25, "positive": true}'
+
+def test_unknown_type_still_fails():
+    with pytest.raises(TypeError):
+        make_default()(object())
@@ -0,0 +1,165 @@
+import pytest
+from datetime import datetime, timedelta
+from decimal import Decimal
+from api.database import get_db
+from api.migrations import MIGRATIONS, migrate, _add_fund_history_columns
+from api.utils.current_funds import backfill_current_funds
+from api.utils.pnl_rollup import PROFIT_SQL
+
+BOTS = 50
+POSITIONS_PER_BOT = 40
+
+# the queries every dashboard, listing, funds and login request runs, with the bot or user they look up
+HOT_QUERIES = {
+    'closed_trades_profit': (f'''
+        SELECT SUM({PROFIT_SQL}) FROM cex_market cm
+        WHERE cm.bot_id = %s AND cm.sell_date IS NOT NULL
+    ''', (1,)),
+    'performance_range': (f'''
+        SELECT cm.sell_date, {PROFIT_SQL} FROM cex_market cm
+        WHERE cm.bot_id = %s AND cm.sell_date >= %s AND cm.sell_date < %s
+        ORDER BY cm.sell_date
+    ''', (1, datetime(2024, 1, 1), datetime(2024, 1, 15))),
+    'open_positions': ('''
+        SELECT COUNT(*) FROM cex_market cm
+        WHERE cm.bot_id = %s AND cm.sell_date IS NULL
+    ''', (1,)),
+    'recent_trades': ('''
+        SELECT cm.* FROM cex_market cm
+        WHERE cm.bot_id = %s
+        ORDER BY cm.activity_date DESC, cm.position_id DESC LIMIT 20
+    ''', (1,)),
+    'positions_by_bot': ('''
+        SELECT cm.* FROM cex_market cm
+        WHERE cm.bot_id = %s
+        ORDER BY cm.buy_date DESC, cm.position_id DESC LIMIT 100
+    ''', (1,)),
+    'positions_page': ('''
+        SELECT cm.* FROM cex_market cm
+        WHERE (cm.buy_date < %s OR (cm.buy_date = %s AND cm.position_id < %s))
+        ORDER BY cm.buy_date DESC, cm.position_id DESC LIMIT 101
+    ''', (datetime(2024, 1, 10), datetime(2024, 1, 10), 1000)),
+    'current_funds': ('''
+        SELECT fc.fund_id, fc.last_position_id, fc.funds FROM funds_current fc
+        WHERE fc.bot_id = %s
+    ''', (1,)),
+    'fund_history': ('''
+        SELECT f.created_at, f.amount FROM funds f
+        WHERE f.bot_id = %s AND f.created_at >= %s AND f.created_at < %s
+    ''', (1, datetime(2024, 1, 1), datetime(2024, 1, 5))),
+    'latest_connections': ('''
+        SELECT id FROM connection_logs
+        WHERE user = %s
+        ORDER BY connection_date DESC LIMIT 10
+    ''', ('user1',)),
+}
+
+@pytest.fixture(scope='module')
+def seeded_db():
+    # enough rows spread over enough bots that a full scan is never the cheapest plan
+    db = get_db()
+    cursor = db.cursor()
+    cursor.execute('SET FOREIGN_KEY_CHECKS = 0')
+    start = datetime(2024, 1, 1)
+    positions = []
+    for bot_id in range(1, BOTS + 1):
+        for index in range(POSITIONS_PER_BOT):
+            buy_date = start + timedelta(hours=index * 12)
+            sold = index % 2 == 0
+            positions.append((
+                bot_id, 'BTC/USDC', 'binance', 100, 0.1, buy_date,
+                buy_date + timedelta(hours=6) if sold else None, 110 if sold else None, 0.1 if sold else None
+            ))
+    cursor.executemany('''
+        INSERT INTO cex_market (
+            bot_id, pair, exchange, buy_value_usdc, buy_fees, buy_date,
+            sell_date, sell_value_usdc, sell_fees
+        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+    ''', positions)
+    cursor.executemany(
+        'INSERT INTO funds (bot_id, last_position_id, funds, amount, created_at) VALUES (%s, %s, %s, %s, %s)',
+        [
+            (bot_id, index, '1000', 1000, start + timedelta(days=index))
+            for bot_id in range(1, BOTS + 1) for index in range(10)
+        ]
+    )
+    cursor.executemany(
+        'INSERT INTO funds_current (bot_id, fund_id, last_position_id, funds) VALUES (%s, %s, %s, %s)',
+        [(bot_id, bot_id, 9, 1000) for bot_id in range(1, BOTS + 1)]
+    )
+    cursor.executemany(
+        'INSERT INTO connection_logs (user, ip_address) VALUES (%s, %s)',
+        [(f'user{user}', '127.0.0.1') for user in range(1, BOTS + 1) for _ in range(10)]
+    )
+    cursor.execute('SET FOREIGN_KEY_CHECKS = 1')
+    db.commit()
+    for table in ('cex_market', 'funds', 'funds_current', 'connection_logs'):
+        cursor.execute(f'ANALYZE TABLE {table}')
+        cursor.fetchall()
+
+    yield db
+
+    cursor.execute('SET FOREIGN_KEY_CHECKS = 0')
+    for table in ('cex_market', 'funds_current', 'funds', 'connection_logs'):
+        cursor.execute(f'DELETE FROM {table}')
+    cursor.execute('SET FOREIGN_KEY_CHECKS = 1')
+    db.commit()
+    cursor.close()
+    db.close()
+
+def test_migrations_are_recorded():
+    db = get_db()
+    cursor = db.cursor()
+    try:
+        # the test schema was migrated at session start, a second run has nothing to do
+        assert migrate(db) == []
+        cursor.execute('SELECT version FROM schema_migrations ORDER BY version')
+        assert [version for version, in cursor.fetchall()] == [version for version, _, _ in MIGRATIONS]
+    finally:
+        cursor.close()
+        db.close()
+
+@pytest.mark.parametrize('name', HOT_QUERIES)
+def test_hot_query_uses_index(seeded_db, name):
+    query, params = HOT_QUERIES[name]
+    cursor = seeded_db.cursor(dictionary=True)
+    try:
+        cursor.execute(f'EXPLAIN {query}', params)
+        plan = cursor.fetchall()
+    finally:
+        cursor.close()
+
+    full_scans = [row['table'] for row in plan if row['type'] == 'ALL']
+    assert not full_scans, f'{name} scans {", ".join(full_scans)}: {plan}'
+    # sorted listings read their rows in index order
+    sorts = [row['table'] for row in plan if 'filesort' in (row['Extra'] or '')]
+    assert not sorts, f'{name} sorts {", ".join(sorts)}: {plan}'
+
+def test_non_numeric_funds_are_skipped():
+    db = get_db()
+    cursor = db.cursor(dictionary=True, buffered=True)
+    try:
+        cursor.execute("INSERT INTO bots (bot_name) VALUES ('legacy_funds_bot')")
+        bot_id = cursor.lastrowid
+        cursor.executemany(
+            'INSERT INTO funds (bot_id, last_position_id, funds) VALUES (%s, %s, %s)',
+            [(bot_id, 1, ' 250.5 '), (bot_id, 2, 'n/a')]
+        )
+        db.commit()
+
+        # strict SQL mode would abort both on a CAST of 'n/a'
+        _add_fund_history_columns(cursor)
+        backfill_current_funds(cursor)
+        db.commit()
+
+        cursor.execute('SELECT funds, amount FROM funds WHERE bot_id = %s ORDER BY id', (bot_id,))
+        assert [row['amount'] for row in cursor.fetchall()] == [Decimal('250.5'), None]
+        cursor.execute('SELECT funds FROM funds_current WHERE bot_id = %s', (bot_id,))
+        assert cursor.fetchone()['funds'] == Decimal('250.5')
+    finally:
+        cursor.execute('DELETE FROM funds_current WHERE bot_id IN (SELECT bot_id FROM bots WHERE bot_name = %s)', ('legacy_funds_bot',))
+        cursor.execute('DELETE FROM funds WHERE bot_id IN (SELECT bot_id FROM bots WHERE bot_name = %s)', ('legacy_funds_bot',))
+        cursor.execute('DELETE FROM bots WHERE bot_name = %s', ('legacy_funds_bot',))
+        db.commit()
+        cursor.close()
+        db.close()
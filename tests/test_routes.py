@@ -1,7 +1,22 @@
+import math
 import pytest
+import statistics
 from run import app
 from api.database import get_db
+from api.routes.dashboard import MAX_PERFORMANCE_BUCKETS
 from api.utils.auth import generate_token
+from api.utils.archive import archive_chunk
+from api.utils.pnl_rollup import rebuild
+from api.utils.versioning import bump_bot_versions
+from datetime import date, datetime, timedelta
+
+# (sell date, profit) of closed trades bought for 100 USDC six hours before, without fees
+CLOSED_TRADES = [
+    (datetime(2024, 1, 1, 12), 100),
+    (datetime(2024, 1, 2, 12), -50),
+    (datetime(2024, 1, 3, 12), 30),
+    (datetime(2024, 1, 4, 12), -100)
+]
 
 @pytest.fixture(autouse=True)
 def cleanup():
@@ -10,7 +25,13 @@ def cleanup():
         cursor = db.cursor()
         cursor.execute('SET FOREIGN_KEY_CHECKS = 0')
         cursor.execute('DELETE FROM app')
+        cursor.execute('DELETE FROM connection_logs')
+        cursor.execute('DELETE FROM app_archive')
+        cursor.execute('DELETE FROM cex_market_archive')
+        cursor.execute('DELETE FROM bot_daily_pnl')
+        cursor.execute('DELETE FROM bot_data_versions')
         cursor.execute('DELETE FROM cex_market')
+        cursor.execute('DELETE FROM funds_current')
         cursor.execute('DELETE FROM funds')
         cursor.execute('DELETE FROM wallets_access')
         cursor.execute('DELETE FROM bots')
@@ -22,6 +43,28 @@ def cleanup():
         db.close()
     yield
 
+@pytest.fixture
+def closed_trades(test_bot):
+    # sell dates in the past cannot be sent through the API, the trades are written directly
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    try:
+        cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', (test_bot,))
+        bot_id = cursor.fetchone()['bot_id']
+        cursor.executemany('''
+            INSERT INTO cex_market (
+                bot_id, pair, exchange, buy_value_usdc, buy_fees, buy_date,
+                sell_date, sell_value_usdc, sell_fees
+            ) VALUES (%s, 'BTC/USDC', 'binance', 100, 0, %s, %s, %s, 0)
+        ''', [(bot_id, sell_date - timedelta(hours=6), sell_date, 100 + profit) for sell_date, profit in CLOSED_TRADES])
+        rebuild(cursor, bot_id)
+        bump_bot_versions(cursor, [bot_id])
+        db.commit()
+    finally:
+        cursor.close()
+        db.close()
+    return test_bot
+
 @pytest.fixture
 def client():
     app.config['TESTING'] = True
@@ -185,4 +228,540 @@ def test_get_fund(client, auth_token, test_bot):
 def test_delete_wallet(client, auth_token, test_wallet):
     headers = {'Authorization': f'Bearer {auth_token}'}
     response = client.delete(f'/api/wallets/{test_wallet}', headers=headers)
-    assert response.status_code in [200, 403, 404] 
\ No newline at end of file
+    assert response.status_code in [200, 403, 404] 
+
+@pytest.mark.run(order=14)
+def test_sell_position_updates_overview(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    data = {
+        'buy_order_id': 123457,
+        'buy_price': 100.0,
+        'buy_quantity': 1.0,
+        'buy_fees': 0.1,
+        'buy_value_usdc': 100.0,
+        'exchange': 'binance',
+        'pair': 'BTC/USDC',
+        'bot_name': test_bot
+    }
+    response = client.post('/api/positions/', json=data, headers=headers)
+    assert response.status_code == 201
+    position_id = response.json['position_id']
+
+    sell_data = {
+        'sell_order_id': 654321,
+        'sell_price': 110.0,
+        'sell_quantity': 1.0,
+        'sell_fees': 0.1,
+        'sell_value_usdc': 110.0
+    }
+    response = client.put(f'/api/positions/{position_id}/sell', json=sell_data, headers=headers)
+    assert response.status_code == 200
+
+    response = client.get(f'/api/dashboard/overview/{test_bot}', headers=headers)
+    assert response.status_code == 200
+    assert response.json['win_rate']['all_time'] == 100
+
+@pytest.mark.run(order=15)
+def test_recent_trades_cursor(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    for order_id in range(3):
+        data = {
+            'buy_order_id': order_id,
+            'buy_price': 100.0,
+            'buy_quantity': 1.0,
+            'buy_fees': 0.1,
+            'buy_value_usdc': 100.0,
+            'exchange': 'binance',
+            'pair': 'BTC/USDC',
+            'bot_name': test_bot
+        }
+        client.post('/api/positions/', json=data, headers=headers)
+
+    response = client.get(f'/api/dashboard/recent-trades/{test_bot}?limit=2', headers=headers)
+    assert response.status_code == 200
+    first_page = response.json
+    assert len(first_page['trades']) == 2
+    assert first_page['pagination']['next_cursor']
+
+    response = client.get(
+        f"/api/dashboard/recent-trades/{test_bot}?limit=2&cursor={first_page['pagination']['next_cursor']}",
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert len(response.json['trades']) == 1
+    assert response.json['pagination']['next_cursor'] is None
+
+    response = client.get(f'/api/dashboard/recent-trades/{test_bot}?cursor=garbage', headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.run(order=16)
+def test_fund_etag(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    client.post('/api/funds/', json={'bot_name': test_bot, 'funds': 1000.0}, headers=headers)
+
+    response = client.get(f'/api/funds/{test_bot}', headers=headers)
+    assert response.status_code == 200
+    etag = response.headers['ETag']
+
+    response = client.get(f'/api/funds/{test_bot}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 304
+
+    client.post('/api/funds/', json={'bot_name': test_bot, 'funds': 1500.0}, headers=headers)
+    response = client.get(f'/api/funds/{test_bot}', headers={**headers, 'If-None-Match': etag})
+    assert response.status_code == 200
+
+@pytest.mark.run(order=17)
+def test_get_portfolio(client, auth_token, closed_trades):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    data = {
+        'name': 'otherbot',
+        'exchange_name': 'Binance',
+        'pairs': '["ETH/USDC"]',
+        'strategy': 'test_strategy',
+        'invest_capital': 500.00,
+        'timeframe': '1h',
+        'simulation': True
+    }
+    response = client.post('/api/bots/', json=data, headers=headers)
+    assert response.status_code == 201
+
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    try:
+        cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', ('otherbot',))
+        bot_id = cursor.fetchone()['bot_id']
+        cursor.execute('''
+            INSERT INTO cex_market (
+                bot_id, pair, exchange, buy_value_usdc, buy_fees, buy_date,
+                sell_date, sell_value_usdc, sell_fees
+            ) VALUES (%s, 'ETH/USDC', 'binance', 100, 0, %s, %s, 150, 0)
+        ''', (bot_id, datetime(2024, 1, 5, 6), datetime(2024, 1, 5, 12)))
+        rebuild(cursor, bot_id)
+        bump_bot_versions(cursor, [bot_id])
+        db.commit()
+    finally:
+        cursor.close()
+        db.close()
+
+    response = client.get('/api/dashboard/portfolio', headers=headers)
+    assert response.status_code == 200
+    bots = {bot['bot_name']: bot for bot in response.json['bots']}
+    assert set(bots) == {closed_trades, 'otherbot'}
+    assert float(bots[closed_trades]['total_profit']['all_time']) == -20
+    assert bots[closed_trades]['win_rate']['all_time'] == 50
+    assert float(bots['otherbot']['total_profit']['all_time']) == 50
+    assert bots['otherbot']['win_rate']['all_time'] == 100
+
+    # the total sums the trades of every bot, its win rate is not an average of the bots' rates
+    total = response.json['total']
+    assert float(total['total_profit']['all_time']) == 30
+    assert float(total['total_balance']['amount']) == 30
+    assert total['win_rate']['all_time'] == 60
+    assert float(total['total_profit']['week']['amount']) == 0
+
+@pytest.mark.run(order=18)
+def test_get_risk(client, auth_token, closed_trades):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    response = client.get(f'/api/dashboard/risk/{closed_trades}?window=2', headers=headers)
+    assert response.status_code == 200
+    risk = response.json
+
+    # equity from the 1000 USDC capital: 1000, 1100, 1050, 1080, 980
+    assert risk['trades'] == 4
+    assert risk['max_drawdown']['amount'] == pytest.approx(120)
+    assert risk['max_drawdown']['percentage'] == pytest.approx(120 / 1100 * 100)
+
+    returns = [100 / 1000, -50 / 1100, 30 / 1050, -100 / 1080]
+    mean = statistics.mean(returns)
+    downside = math.sqrt(statistics.mean(min(value, 0) ** 2 for value in returns))
+    assert risk['sharpe_ratio'] == pytest.approx(mean / statistics.stdev(returns) * math.sqrt(365))
+    assert risk['sortino_ratio'] == pytest.approx(mean / downside * math.sqrt(365))
+
+    assert risk['profit_factor'] == pytest.approx(130 / 150)
+    assert risk['expectancy'] == pytest.approx(-5)
+    assert risk['average_win'] == pytest.approx(65)
+    assert risk['average_loss'] == pytest.approx(-75)
+    assert risk['average_holding_seconds'] == pytest.approx(6 * 3600)
+    assert risk['rolling_win_rate'] == {'window': 2, 'current': 50, 'min': 50, 'max': 50}
+
+    response = client.get(f'/api/dashboard/risk/{closed_trades}?window=0', headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.run(order=19)
+def test_performance_range(client, auth_token, closed_trades):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    response = client.get(
+        f'/api/dashboard/performance/{closed_trades}?interval=hourly&from=2024-01-01T00:00:00&to=2024-01-03T00:00:00',
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json['data']
+    assert len(data) == 48
+    assert [(period['date'], float(period['profit'])) for period in data if period['trades']] == [
+        ('2024-01-01 12:00', 100), ('2024-01-02 12:00', -50)
+    ]
+    assert float(data[-1]['balance']) == 50
+
+    # whole days are read from the rollup, a day bucket from the trades, both agree
+    expected = [
+        ('2024-01-02', -50, 50, 1),
+        ('2024-01-03', 30, 80, 1),
+        ('2024-01-04', -100, -20, 1)
+    ]
+    for query in ('interval=daily', 'bucket_seconds=86400'):
+        response = client.get(
+            f'/api/dashboard/performance/{closed_trades}?{query}&from=2024-01-02&to=2024-01-05', headers=headers
+        )
+        assert response.status_code == 200
+        assert [
+            (period['date'][:10], float(period['profit']), float(period['balance']), period['trades'])
+            for period in response.json['data']
+        ] == expected
+
+    response = client.get(f'/api/dashboard/performance/{closed_trades}?from=2024-01-03&to=2024-01-01', headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.run(order=20)
+def test_event_stream(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    response = client.get(f'/api/dashboard/stream/{test_bot}', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/event-stream'
+    response.close()
+
+    response = client.get('/api/dashboard/stream/unknown_bot', headers=headers)
+    assert response.status_code == 404
+
+@pytest.mark.run(order=21)
+def test_performance_max_points(client, auth_token, closed_trades):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    response = client.get(
+        f'/api/dashboard/performance/{closed_trades}?interval=hourly&from=2024-01-01T00:00:00&to=2024-01-05T00:00:00&max_points=10',
+        headers=headers
+    )
+    assert response.status_code == 200
+    data = response.json['data']
+    assert len(data) == 10
+    # the first and last of the 96 hours are kept, skipped hours are folded into the next kept one
+    assert data[0]['date'] == '2024-01-01 00:00'
+    assert data[-1]['date'] == '2024-01-04 23:00'
+    assert float(data[-1]['balance']) == -20
+    assert sum(float(period['profit']) for period in data) == -20
+    assert sum(period['trades'] for period in data) == 4
+
+    response = client.get(f'/api/dashboard/performance/{closed_trades}?max_points=2', headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.run(order=22)
+def test_trade_details_batch(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    data = {
+        'buy_order_id': 123458,
+        'buy_price': 100.0,
+        'buy_quantity': 1.0,
+        'buy_fees': 0.1,
+        'buy_value_usdc': 100.0,
+        'exchange': 'binance',
+        'pair': 'BTC/USDC',
+        'bot_name': test_bot
+    }
+    response = client.post('/api/positions/', json=data, headers=headers)
+    position_id = response.json['position_id']
+
+    response = client.post('/api/dashboard/trades/batch', json={'position_ids': [position_id, 999999]}, headers=headers)
+    assert response.status_code == 200
+    assert [trade['position_id'] for trade in response.json['trades']] == [position_id]
+    assert response.json['not_found'] == [999999]
+
+    response = client.post('/api/dashboard/trades/batch', json={'position_ids': list(range(501))}, headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.run(order=23)
+def test_create_positions_bulk(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    position = {
+        'buy_price': 100.0,
+        'buy_quantity': 1.0,
+        'buy_fees': 0.1,
+        'buy_value_usdc': 100.0,
+        'exchange': 'binance',
+        'pair': 'BTC/USDC',
+        'bot_name': test_bot
+    }
+    positions = [{**position, 'buy_order_id': order_id} for order_id in range(3)]
+    positions.append({**position, 'buy_order_id': 4, 'bot_name': 'unknown_bot'})
+    positions.append({'pair': 'BTC/USDC'})
+    positions.append({**position, 'buy_order_id': 5, 'buy_price': 'abc'})
+
+    created = client.post('/api/positions/bulk', json={'positions': positions}, headers=headers)
+    assert created.status_code == 201
+    assert len(created.json['positions']) == 3
+    assert [error['index'] for error in created.json['errors']] == [3, 4, 5]
+    assert created.json['errors'][2]['message'] == 'buy_price must be a number'
+
+    response = client.post('/api/positions/bulk', json={'positions': positions[5:]}, headers=headers)
+    assert response.status_code == 400
+    assert response.json['errors'] == [{'index': 0, 'message': 'buy_price must be a number'}]
+
+    position_ids = [item['position_id'] for item in created.json['positions']]
+    response = client.post('/api/dashboard/trades/batch', json={'position_ids': position_ids}, headers=headers)
+    assert [trade['buy_order_id'] for trade in response.json['trades']] == [0, 1, 2]
+
+@pytest.mark.run(order=24)
+def test_sell_positions_bulk(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    position = {
+        'buy_price': 100.0,
+        'buy_quantity': 1.0,
+        'buy_fees': 0.1,
+        'buy_value_usdc': 100.0,
+        'exchange': 'binance',
+        'pair': 'BTC/USDC',
+        'bot_name': test_bot
+    }
+    response = client.post(
+        '/api/positions/bulk',
+        json={'positions': [{**position, 'buy_order_id': order_id} for order_id in range(3)]},
+        headers=headers
+    )
+    *position_ids, unsold_id = [item['position_id'] for item in response.json['positions']]
+
+    sell = {
+        'sell_order_id': 654322,
+        'sell_price': 110.0,
+        'sell_quantity': 1.0,
+        'sell_fees': 0.1,
+        'sell_value_usdc': 110.0,
+        'sell_log': True
+    }
+    sells = [{**sell, 'position_id': position_id} for position_id in position_ids + [999999]]
+    sells.append({**sell, 'position_id': unsold_id, 'sell_price': None})
+    response = client.put('/api/positions/bulk/sell', json={'positions': sells}, headers=headers)
+    assert response.status_code == 200
+    assert response.json['updated'] == sorted(position_ids)
+    assert response.json['not_found'] == [999999]
+    assert response.json['errors'] == [{'index': 3, 'message': 'sell_price must be a number'}]
+
+    response = client.post('/api/dashboard/trades/batch', json={'position_ids': position_ids}, headers=headers)
+    assert all(trade['sell_date'] for trade in response.json['trades'])
+    response = client.get(f'/api/dashboard/trades/{unsold_id}', headers=headers)
+    assert response.json['sell_date'] is None
+
+@pytest.mark.run(order=25)
+def test_get_positions_filtered(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    position = {
+        'buy_price': 100.0,
+        'buy_quantity': 1.0,
+        'buy_fees': 0.1,
+        'buy_value_usdc': 100.0,
+        'exchange': 'binance',
+        'pair': 'ETH/USDC',
+        'bot_name': test_bot
+    }
+    client.post(
+        '/api/positions/bulk',
+        json={'positions': [{**position, 'buy_order_id': order_id} for order_id in range(3)]},
+        headers=headers
+    )
+
+    response = client.get(
+        f'/api/positions/?bot_name={test_bot}&pair=ETH/USDC&status=open&fields=position_id,buy_price&limit=2',
+        headers=headers
+    )
+    assert response.status_code == 200
+    assert len(response.json['positions']) == 2
+    assert set(response.json['positions'][0]) == {'position_id', 'buy_price'}
+    assert response.json['pagination']['next_cursor']
+
+    response = client.get(f'/api/positions/?fields=buy_signals,password', headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.run(order=26)
+def test_export_positions(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    response = client.get(f'/api/positions/export?format=csv&bot_name={test_bot}&fields=position_id,pair', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'text/csv'
+    assert response.get_data(as_text=True).splitlines()[0] == 'position_id,pair'
+
+    response = client.get(f'/api/positions/export?bot_name={test_bot}', headers=headers)
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    response.get_data()
+
+    response = client.get('/api/positions/export?format=xml', headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.run(order=27)
+def test_stream_lists(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    for url in (f'/api/positions/?bot_name={test_bot}', '/api/funds/', '/api/bots/'):
+        buffered = client.get(url, headers=headers)
+        streamed = client.get(f"{url}{'&' if '?' in url else '?'}stream=true", headers=headers)
+        assert streamed.status_code == buffered.status_code
+        assert streamed.json == buffered.json
+
+@pytest.mark.run(order=28)
+def test_write_behind_positions(client, auth_token, test_bot, monkeypatch):
+    monkeypatch.setattr('api.routes.positions.POSITION_WRITE_BEHIND', True)
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    position_data = {
+        'buy_order_id': 123456,
+        'buy_price': 100.0,
+        'buy_quantity': 1.0,
+        'buy_fees': 0.1,
+        'buy_value_usdc': 100.0,
+        'exchange': 'binance',
+        'pair': 'BTC/USDC',
+        'bot_name': test_bot
+    }
+    response = client.post('/api/positions/', json=position_data, headers=headers)
+    assert response.status_code == 201
+    position_id = response.json['position_id']
+
+    sell_data = {
+        'sell_order_id': 654321,
+        'sell_price': 110.0,
+        'sell_quantity': 1.0,
+        'sell_fees': 0.1,
+        'sell_value_usdc': 110.0
+    }
+    response = client.put(f'/api/positions/{position_id}/sell', json=sell_data, headers=headers)
+    assert response.status_code == 200
+
+    response = client.put('/api/positions/999999/sell', json=sell_data, headers=headers)
+    assert response.status_code == 404
+
+@pytest.mark.run(order=29)
+def test_archived_positions(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    position_data = {
+        'buy_order_id': 123456,
+        'buy_price': 100.0,
+        'buy_quantity': 1.0,
+        'buy_fees': 0.1,
+        'buy_value_usdc': 100.0,
+        'exchange': 'binance',
+        'pair': 'BTC/USDC',
+        'bot_name': test_bot
+    }
+    response = client.post('/api/positions/', json=position_data, headers=headers)
+    position_id = response.json['position_id']
+    client.put(f'/api/positions/{position_id}/sell', json={
+        'sell_order_id': 654321,
+        'sell_price': 110.0,
+        'sell_quantity': 1.0,
+        'sell_fees': 0.1,
+        'sell_value_usdc': 110.0
+    }, headers=headers)
+    bot_id = client.get(f'/api/dashboard/trades/{position_id}', headers=headers).json['bot_id']
+
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    assert archive_chunk(cursor, bot_id, date.today() + timedelta(days=1), 100) == 1
+    db.commit()
+    cursor.close()
+    db.close()
+
+    response = client.get(f'/api/positions/?bot_name={test_bot}', headers=headers)
+    assert response.json['positions'] == []
+    response = client.get(f'/api/positions/?bot_name={test_bot}&include_archived=true', headers=headers)
+    assert [position['position_id'] for position in response.json['positions']] == [position_id]
+
+    response = client.get(f'/api/dashboard/trades/{position_id}', headers=headers)
+    assert response.status_code == 404
+    response = client.get(f'/api/dashboard/trades/{position_id}?include_archived=true', headers=headers)
+    assert response.status_code == 200
+
+    # daily rollup, hourly trades and the approximate count agree on what is archived
+    for query in ('interval=daily', 'bucket_seconds=3600'):
+        response = client.get(f'/api/dashboard/performance/{test_bot}?{query}', headers=headers)
+        assert sum(period['trades'] for period in response.json['data']) == 0
+        response = client.get(f'/api/dashboard/performance/{test_bot}?{query}&include_archived=true', headers=headers)
+        assert sum(period['trades'] for period in response.json['data']) == 1
+    response = client.get(f'/api/dashboard/recent-trades/{test_bot}?total=approx', headers=headers)
+    assert response.json['pagination']['total'] == 0
+    response = client.get(f'/api/dashboard/recent-trades/{test_bot}?total=approx&include_archived=true', headers=headers)
+    assert response.json['pagination']['total'] == 1
+
+@pytest.mark.run(order=30)
+def test_current_funds(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    client.post('/api/funds/', json={'bot_name': test_bot, 'funds': 1000.0}, headers=headers)
+    client.post('/api/funds/', json={'bot_name': test_bot, 'funds': 1500.5}, headers=headers)
+
+    response = client.get(f'/api/funds/{test_bot}', headers=headers)
+    assert response.status_code == 200
+    assert float(response.json['funds']) == 1500.5
+
+    response = client.get('/api/funds/', headers=headers)
+    funds = [fund for fund in response.json['funds'] if fund['bot_name'] == test_bot]
+    assert len(funds) == 1
+    assert float(funds[0]['funds']) == 1500.5
+
+@pytest.mark.run(order=31)
+def test_fund_history(client, auth_token, test_bot):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    for funds in (1000.0, 900.0, 1200.0):
+        client.post('/api/funds/', json={'bot_name': test_bot, 'funds': funds}, headers=headers)
+
+    response = client.get(f'/api/funds/{test_bot}/history?agg=max&bucket_seconds=3600', headers=headers)
+    assert response.status_code == 200
+    assert len(response.json['data']) >= 1
+    assert max(float(point['funds']) for point in response.json['data']) == 1200.0
+
+    response = client.get(f'/api/funds/{test_bot}/history?agg=last', headers=headers)
+    assert float(response.json['data'][-1]['funds']) == 1200.0
+
+    response = client.get(f'/api/funds/{test_bot}/history?agg=avg', headers=headers)
+    assert response.status_code == 400
+
+@pytest.mark.run(order=32)
+def test_unknown_wallet(client, auth_token, test_wallet):
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    # unknown wallets are reported missing, wallets of other users are denied
+    for response in (
+        client.get('/api/wallets/unknown_wallet', headers=headers),
+        client.delete('/api/wallets/unknown_wallet', headers=headers),
+        client.delete('/api/wallets/access/testuser/unknown_wallet', headers=headers)
+    ):
+        assert response.status_code == 404
+        assert response.json['message'] == 'Wallet not found'
+
+    other_headers = {'Authorization': f"Bearer {generate_token({'user': 'otheruser'})}"}
+    response = client.get(f'/api/wallets/{test_wallet}', headers=other_headers)
+    assert response.status_code == 403
+    response = client.delete(f'/api/wallets/{test_wallet}', headers=other_headers)
+    assert response.status_code == 403
+
+@pytest.mark.run(order=33)
+def test_performance_unbounded_hourly(client, auth_token, closed_trades):
+    db = get_db()
+    cursor = db.cursor(dictionary=True)
+    try:
+        cursor.execute('SELECT bot_id FROM bots WHERE bot_name = %s', (closed_trades,))
+        bot_id = cursor.fetchone()['bot_id']
+        cursor.execute('''
+            INSERT INTO cex_market (
+                bot_id, pair, exchange, buy_value_usdc, buy_fees, buy_date,
+                sell_date, sell_value_usdc, sell_fees
+            ) VALUES (%s, 'BTC/USDC', 'binance', 100, 0, %s, %s, 110, 0)
+        ''', (bot_id, datetime(2022, 1, 1, 6), datetime(2022, 1, 1, 12)))
+        rebuild(cursor, bot_id)
+        bump_bot_versions(cursor, [bot_id])
+        db.commit()
+    finally:
+        cursor.close()
+        db.close()
+
+    # two years of hours keep the most recent buckets, the older trade opens the balance
+    headers = {'Authorization': f'Bearer {auth_token}'}
+    response = client.get(f'/api/dashboard/performance/{closed_trades}?interval=hourly', headers=headers)
+    assert response.status_code == 200
+    data = response.json['data']
+    assert len(data) == MAX_PERFORMANCE_BUCKETS
+    assert data[-1]['date'] == '2024-01-04 12:00'
+    assert float(data[0]['balance']) == 10
+    assert float(data[-1]['balance']) == -10
+    assert sum(period['trades'] for period in data) == 4